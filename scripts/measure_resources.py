@@ -3,22 +3,16 @@ import csv, time, threading
 from pathlib import Path
 import os, sys
 import psutil
-from PIL import Image
 
 ROOT = Path(__file__).resolve().parents[1]
 SRC = ROOT / "src"
 sys.path.append(str(SRC))
 import batch as batch_mod  # noqa: E402
+import corpus  # noqa: E402
 
 def make_synth_images(tmp_dir: Path, n: int, size=(2560, 1440)):
-    tmp_dir.mkdir(exist_ok=True, parents=True)
-    paths = []
-    for i in range(n):
-        p = tmp_dir / f"res_{i:03d}.jpg"
-        if not p.exists():
-            Image.new("RGB", size, (120, 120, 160)).save(p, "JPEG", quality=90, optimize=True)
-        paths.append(str(p))
-    return paths
+    # photo-like, seeded and cached (see src/corpus.py)
+    return corpus.corpus(n, cache_dir=str(tmp_dir), size=size)
 
 def sample_resources(csv_path: Path, interval=0.2, stop_flag: list = None):
     proc = psutil.Process(os.getpid())
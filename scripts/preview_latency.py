@@ -0,0 +1,77 @@
+# scripts/preview_latency.py
+# Headless GUI preview latency (src/preview.py), no display needed.
+#   python scripts/preview_latency.py
+#   python scripts/preview_latency.py --sizes 1920x1080,8000x6000 --modes RGB,RGBA --csv preview.csv
+#
+# first_ms: set_image + fitted render (what a user waits for after loading or an edit)
+# pan_ms:   median redraw after a 40 px pan at 100% (a few new tiles, the rest cached)
+# zoom_ms:  median redraw after a 1.25x wheel step (all tiles new)
+
+from __future__ import annotations
+import argparse
+import csv
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT / "src"))
+import corpus  # noqa: E402
+import preview  # noqa: E402
+
+CANVAS = (900, 600)
+
+
+def _ms(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return (time.perf_counter() - t0) * 1000
+
+
+def measure(img, canvas=CANVAS, steps: int = 10) -> dict:
+    r = preview.PreviewRenderer(canvas)
+    try:
+        first = _ms(lambda: (r.set_image(img), r.render_sync()))
+        r.actual()
+        r.render_sync()
+        pans = []
+        for i in range(steps):
+            r.pan(40 if i % 4 < 2 else -40, 40 if i % 2 else -40)
+            pans.append(_ms(r.render_sync))
+        r.fit()
+        zooms = []
+        for _ in range(steps):
+            r.zoom_at(1.25, canvas[0] / 2, canvas[1] / 2)
+            zooms.append(_ms(r.render_sync))
+        return {"first_ms": first, "pan_ms": statistics.median(pans), "zoom_ms": statistics.median(zooms)}
+    finally:
+        r.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure headless preview latency")
+    ap.add_argument("--sizes", default="1920x1080,4000x3000,8000x6000")
+    ap.add_argument("--modes", default="RGB,RGBA,L,P")
+    ap.add_argument("--steps", type=int, default=10)
+    ap.add_argument("--csv", help="also write the rows here")
+    args = ap.parse_args()
+
+    rows = []
+    print(f"{'size':>11s} {'mode':>5s} {'first ms':>9s} {'pan ms':>8s} {'zoom ms':>8s}")
+    for size_txt in args.sizes.split(","):
+        size = tuple(int(v) for v in size_txt.lower().split("x"))
+        for mode in args.modes.split(","):
+            img = corpus.make_image(1, size, mode)
+            res = measure(img, steps=args.steps)
+            rows.append({"size": size_txt, "mode": mode, **{k: round(v, 2) for k, v in res.items()}})
+            print(f"{size_txt:>11s} {mode:>5s} {res['first_ms']:9.1f} {res['pan_ms']:8.1f} {res['zoom_ms']:8.1f}")
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            wr = csv.DictWriter(f, fieldnames=list(rows[0]))
+            wr.writeheader()
+            wr.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
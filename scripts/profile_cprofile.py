@@ -1,16 +1,16 @@
 # scripts/profile_cprofile.py
 import cProfile, pstats, io, argparse, time
 from pathlib import Path
-from PIL import Image
 import os, sys
 
 SRC = Path(__file__).resolve().parents[1] / "src"
 sys.path.append(str(SRC))
 import image_ops
 import batch as batch_mod
+import corpus
 
-def make_img(w=3840, h=2160, color="#446688"):
-    return Image.new("RGB", (w, h), color)
+def make_img(w=3840, h=2160, seed=0):
+    return corpus.make_image(seed, (w, h))
 
 def profile_single():
     """Profile individual operations to see their cost."""
@@ -24,13 +24,7 @@ def profile_single():
 
 def profile_pipeline(n=50, width=800, workers=0):
     """Profile batch pipeline over n synthetic images."""
-    tmp = Path("tmp_imgs"); tmp.mkdir(exist_ok=True)
-    paths = []
-    for i in range(n):
-        p = tmp / f"img_{i:03d}.jpg"
-        if not p.exists():
-            Image.new("RGB", (2560, 1440), (120, 120, 160)).save(p, "JPEG", quality=90)
-        paths.append(str(p))
+    paths = corpus.corpus(n, cache_dir="tmp_imgs", size=(2560, 1440))
     steps = [("resize", {"width": width}),
              ("blur", {"radius": 1.5}),
              ("sharpen", {}),
@@ -11,7 +11,6 @@ import time
 from pathlib import Path
 
 import psutil
-from PIL import Image
 
 # --- Make src/ importable (so "import batch" works) ---
 HERE = Path(__file__).resolve().parent
@@ -21,22 +20,15 @@ if str(SRC) not in sys.path:
     sys.path.insert(0, str(SRC))
 
 import batch as batch_mod  # noqa: E402
+import corpus  # noqa: E402
 
 
 def make_inputs(n: int, w: int, h: int, input_dir: Path) -> list[str]:
-    """Create n synthetic images for reproducible tests and return their paths."""
-    input_dir.mkdir(parents=True, exist_ok=True)
-    paths: list[str] = []
-    for i in range(n):
-        p = input_dir / f"in_{i:04d}.jpg"
-        if not p.exists():
-            img = Image.new("RGB", (w, h), (120, 120, 160))
-            img.save(p, "JPEG", quality=85, optimize=True)
-        paths.append(str(p))
-    return paths
-
-
-def run_pipeline(paths: list[str], out_dir: Path, workers: int) -> float:
+    """n photo-like synthetic images (seeded, cached under input_dir); returns their paths."""
+    return corpus.corpus(n, cache_dir=str(input_dir), size=(w, h), quality=85)
+
+
+def run_pipeline(paths: list[str], out_dir: Path, workers: int, staged: bool = False) -> float:
     """Run a representative pipeline and return elapsed seconds."""
     steps = [
         ("resize", {"width": 1920}),      # maintain aspect ratio inside image_ops
@@ -46,7 +38,15 @@ def run_pipeline(paths: list[str], out_dir: Path, workers: int) -> float:
     ]
     out_dir.mkdir(parents=True, exist_ok=True)
     t0 = time.perf_counter()
-    batch_mod.apply_pipeline(paths, str(out_dir), steps, workers=workers)
+    if staged:
+        metrics: dict = {}
+        batch_mod.apply_pipeline_staged(paths, str(out_dir), steps, compute=workers, metrics=metrics)
+        for name, st in metrics["stages"].items():
+            print(f"[stages] {name:8s} workers={st['workers']} util={st['utilization']:.2f} "
+                  f"queue mean={st['queue_depth_mean']} max={st['queue_depth_max']}")
+        print(f"[stages] bottleneck: {metrics['bottleneck']}")
+    else:
+        batch_mod.apply_pipeline(paths, str(out_dir), steps, workers=workers)
     return time.perf_counter() - t0
 
 
@@ -109,6 +109,7 @@ def main():
     ap.add_argument("--width", type=int, default=1920, help="synthetic input width")
     ap.add_argument("--height", type=int, default=1080, help="synthetic input height")
     ap.add_argument("--workers", type=int, default=0, help="parallel workers (0 = single-threaded)")
+    ap.add_argument("--staged", action="store_true", help="use the staged read/compute/write executor")
     ap.add_argument("--interval", type=float, default=0.25, help="sampling interval (seconds)")
     ap.add_argument("--csv", type=str, default="perf_resources.csv", help="output CSV filename")
     ap.add_argument("--outdir", type=str, default="tmp_metrics_out", help="output images directory")
@@ -140,7 +141,7 @@ def main():
 
     # Run workload
     try:
-        elapsed = run_pipeline(paths, out_dir, workers=args.workers)
+        elapsed = run_pipeline(paths, out_dir, workers=args.workers, staged=args.staged)
     finally:
         # stop sampling and join
         sampling = False
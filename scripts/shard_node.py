@@ -0,0 +1,49 @@
+# scripts/shard_node.py
+# Join a sharded batch on shared storage; start the same command on every node.
+#   python scripts/shard_node.py /mnt/in /mnt/out --job /mnt/jobs/nightly --width 1920
+# --simulate N runs N local processes as separate nodes (single-machine test).
+
+from __future__ import annotations
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# --- Make src/ importable (so "import shard" works) ---
+HERE = Path(__file__).resolve().parent
+SRC = HERE.parent / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+import batch  # noqa: E402
+import shard  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Run one node of a sharded batch")
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--job", required=True, help="shared job folder (manifest, leases)")
+    ap.add_argument("--width", type=int, help="resize to this width (keeps aspect)")
+    ap.add_argument("--unit-size", type=int, default=16)
+    ap.add_argument("--lease", type=float, default=30.0, help="seconds before a silent node's unit is reclaimed")
+    ap.add_argument("--workers", type=int, default=0, help="worker processes per node")
+    ap.add_argument("--simulate", type=int, default=0, help="run N local nodes")
+    args = ap.parse_args()
+
+    steps = [("resize", {"width": args.width})] if args.width else []
+    paths = batch.list_images(args.input)
+    kw = dict(unit_size=args.unit_size, lease_s=args.lease, workers=args.workers)
+    if args.simulate:
+        with ProcessPoolExecutor(max_workers=args.simulate) as ex:
+            futs = [ex.submit(shard.run_node, args.job, paths, args.output, steps, node_id=f"sim{i}", **kw)
+                    for i in range(args.simulate)]
+            results = [f.result() for f in futs]
+    else:
+        results = [shard.run_node(args.job, paths, args.output, steps, **kw)]
+    for r in results:
+        print(f"[shard] {r['node']}: {len(r['units'])} units, {r['images']} images, {r['lost']} lost leases")
+
+
+if __name__ == "__main__":
+    main()
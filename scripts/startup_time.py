@@ -0,0 +1,71 @@
+# scripts/startup_time.py
+# Cold-start cost of the entry points, from `python -X importtime`.
+#   python scripts/startup_time.py            # table of median import times
+#   python scripts/startup_time.py --check    # exit 1 if a module is over budget
+
+from __future__ import annotations
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+
+# Median cumulative import time per entry module, in milliseconds. About
+# twice what a quiet machine measures; Pillow alone is ~30 ms of each.
+# Before deferring imports: batch ~150 ms (numpy alone ~70), gui ~900 ms cold.
+BUDGET_MS = {
+    "image_ops": 90.0,
+    "batch": 120.0,
+    "gui": 120.0,
+    "watch": 160.0,
+}
+
+_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\S+)")
+
+
+def import_time_ms(module: str) -> tuple[float, float]:
+    """(cumulative import time of `module`, wall time of the whole interpreter) in ms."""
+    env = dict(os.environ, PYTHONPATH=str(SRC))
+    t0 = time.perf_counter()
+    res = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                         env=env, capture_output=True, text=True, check=True)
+    wall = (time.perf_counter() - t0) * 1000
+    for line in reversed(res.stderr.splitlines()):
+        m = _LINE.match(line)
+        if m and m.group(2) == module:
+            return int(m.group(1)) / 1000, wall
+    raise RuntimeError(f"No importtime line for {module}")
+
+
+def measure(module: str, runs: int = 5) -> tuple[float, float]:
+    samples = [import_time_ms(module) for _ in range(runs)]
+    return statistics.median(s[0] for s in samples), statistics.median(s[1] for s in samples)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Measure entry-point import time")
+    ap.add_argument("modules", nargs="*", default=list(BUDGET_MS))
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--check", action="store_true", help="exit 1 when over budget")
+    args = ap.parse_args()
+
+    over = []
+    print(f"{'module':12s} {'import ms':>10s} {'process ms':>11s} {'budget':>8s}")
+    for mod in args.modules:
+        imp, wall = measure(mod, args.runs)
+        budget = BUDGET_MS.get(mod)
+        flag = "  OVER" if budget is not None and imp > budget else ""
+        print(f"{mod:12s} {imp:10.1f} {wall:11.1f} {budget or 0:8.0f}{flag}")
+        if flag:
+            over.append(mod)
+    if args.check and over:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
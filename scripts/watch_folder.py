@@ -0,0 +1,54 @@
+# scripts/watch_folder.py
+# Keep processing images as they are dropped into a folder (Ctrl+C to stop).
+#   python scripts/watch_folder.py inbox outbox --width 1280 --grayscale
+
+from __future__ import annotations
+import argparse
+import sys
+import threading
+from pathlib import Path
+
+# --- Make src/ importable (so "import watch" works) ---
+HERE = Path(__file__).resolve().parent
+SRC = HERE.parent / "src"
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+import watch  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Process images as they land in a folder")
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--width", type=int, help="resize to this width (keeps aspect)")
+    ap.add_argument("--grayscale", action="store_true")
+    ap.add_argument("--workers", type=int, default=0)
+    ap.add_argument("--poll", action="store_true", help="poll instead of inotify")
+    ap.add_argument("--settle", type=float, default=0.2, help="seconds a file must be unchanged")
+    ap.add_argument("--quarantine", help="folder for inputs that fail")
+    args = ap.parse_args()
+
+    steps = []
+    if args.width:
+        steps.append(("resize", {"width": args.width}))
+    if args.grayscale:
+        steps.append(("grayscale", {}))
+
+    def report(src, out, err):
+        print(f"[watch] {src} -> {out}" if err is None else f"[watch] {src} FAILED: {err}", flush=True)
+
+    w = watch.FolderWatcher(args.input, args.output, steps, workers=args.workers,
+                            settle_s=args.settle, inotify=not args.poll,
+                            quarantine_dir=args.quarantine, on_result=report)
+    print(f"[watch] {args.input} ({w.mode}), {w.workers} workers", flush=True)
+    stop = threading.Event()
+    try:
+        w.run(stop)
+    except KeyboardInterrupt:
+        pass
+    print(f"[watch] {w.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# src/admission.py
+"""
+Memory-aware admission for concurrent batch runs.
+
+probe_image reads only the file header (size, mode, frame count), and
+estimate_peak_bytes walks the step list to find the largest pair of images
+alive at once. A MemoryBudget then admits work while the running total
+stays under the limit. A single image bigger than the whole budget is not
+refused: it waits until nothing else is running and then runs alone.
+"""
+from __future__ import annotations
+import math
+import threading
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+from PIL import Image
+import image_ops
+
+Step = Tuple[str, Dict[str, Any]]
+
+
+class ImageProbe(NamedTuple):
+    path: str
+    width: int
+    height: int
+    mode: str
+    frames: int
+
+
+def probe_image(path: str) -> ImageProbe:
+    """Header-only look at `path`; no pixel data is decoded."""
+    if path.lower().endswith(image_ops.RAW_EXT):
+        mode, (w, h), _ = image_ops.read_raw_header(path)
+        return ImageProbe(path, w, h, mode, 1)
+    with Image.open(path) as img:
+        w, h = img.size
+        if image_ops.transpose_swaps_axes(image_ops.orientation_transpose(img)):
+            w, h = h, w
+        return ImageProbe(path, w, h, img.mode, getattr(img, "n_frames", 1))
+
+
+def pixel_bytes(mode: str) -> int:
+    """Bytes per pixel in Pillow's in-memory layout (RGB is padded to 4)."""
+    if mode in ("1", "L", "P"):
+        return 1
+    if mode.startswith("I;16"):
+        return 2
+    return 4
+
+
+def _step_shape(op: str, kwargs: Dict[str, Any], mode: str,
+                size: Tuple[int, int]) -> Tuple[str, Tuple[int, int]]:
+    """(mode, size) after one step; unknown steps keep both."""
+    w, h = size
+    if op == "resize":
+        return mode, image_ops.resize_target(size, **kwargs)
+    if op == "grayscale":
+        return "L", size
+    if op == "sepia":
+        return "RGB", size
+    if op in ("lut", "color_matrix"):
+        return ("RGBA" if "A" in mode else "RGB"), size
+    if op == "levels":
+        return ("RGB" if mode == "L" and len(kwargs.get("table", ())) == 768
+                else mode if mode in ("L", "RGB", "RGBA") else "RGBA" if "A" in mode else "RGB"), size
+    if op == "overlay":
+        return (mode if mode in ("RGB", "RGBA", "L") else "RGBA" if "A" in mode else "RGB"), size
+    if op == "crop":
+        l, t, r, b = kwargs["box"]
+        return mode, (max(1, min(abs(r - l), w)), max(1, min(abs(b - t), h)))
+    if op == "lazy":
+        for inner, kw in kwargs["steps"]:
+            mode, size = _step_shape(inner, kw, mode, size)
+        return mode, size
+    if op == "transpose":
+        return mode, (h, w) if image_ops.transpose_swaps_axes(kwargs.get("method")) else size
+    if op == "rotate":
+        exact, method = image_ops.rotation_transpose(kwargs.get("degrees", 0))
+        if exact:
+            return mode, (h, w) if image_ops.transpose_swaps_axes(method) else size
+        a = math.radians(kwargs.get("degrees", 0))
+        c, s = abs(math.cos(a)), abs(math.sin(a))
+        return mode, (math.ceil(w * c + h * s), math.ceil(w * s + h * c))
+    return mode, size
+
+
+def estimate_peak_bytes(probe: ImageProbe, steps: Iterable[Step]) -> int:
+    """
+    Largest input + output footprint over the step list, i.e. the most
+    memory one image needs at any moment while it is being processed.
+    """
+    mode, size = probe.mode, (probe.width, probe.height)
+    cur = size[0] * size[1] * pixel_bytes(mode)
+    peak = cur
+    for op, kwargs in steps:
+        mode, size = _step_shape(op, kwargs, mode, size)
+        out = size[0] * size[1] * pixel_bytes(mode)
+        peak = max(peak, cur + out)
+        cur = out
+    return peak
+
+
+class MemoryBudget:
+    """Counting admission gate in bytes; thread safe."""
+
+    def __init__(self, limit_bytes: int):
+        if limit_bytes <= 0:
+            raise ValueError(f"Memory budget must be positive: {limit_bytes}")
+        self.limit = int(limit_bytes)
+        self.used = 0
+        self.peak_used = 0
+        self._oversized_waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def close(self) -> None:
+        """Wake every waiter; later acquires fail (used when a run aborts)."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def oversized(self, nbytes: int) -> bool:
+        return nbytes > self.limit
+
+    def fits(self, nbytes: int) -> bool:
+        """Would `nbytes` be admitted right now without waiting?"""
+        with self._cond:
+            return self._admissible(nbytes)
+
+    def _admissible(self, nbytes: int) -> bool:
+        if self.oversized(nbytes):
+            return self.used == 0
+        return not self._oversized_waiting and self.used + nbytes <= self.limit
+
+    def acquire(self, nbytes: int, timeout: Optional[float] = None) -> bool:
+        """
+        Block until `nbytes` fits. Oversized requests wait for an empty
+        budget and hold back new admissions meanwhile, so they cannot starve.
+        """
+        with self._cond:
+            big = self.oversized(nbytes)
+            if big:
+                self._oversized_waiting += 1
+            try:
+                if big:
+                    ok = self._cond.wait_for(lambda: self._closed or self.used == 0, timeout)
+                else:
+                    ok = self._cond.wait_for(lambda: self._closed or self._admissible(nbytes), timeout)
+            finally:
+                if big:
+                    self._oversized_waiting -= 1
+                    self._cond.notify_all()
+            if self._closed:
+                raise RuntimeError("Memory budget closed")
+            if ok:
+                self.used += nbytes
+                self.peak_used = max(self.peak_used, self.used)
+            return ok
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
@@ -0,0 +1,174 @@
+# src/archives.py
+"""
+Process images straight out of zip/tar archives into a zip, with no
+extraction to disk.
+
+Members are streamed in archive order as in-memory buffers (tar archives,
+compressed or not, are read as a stream without seeking). The stage queues
+bound how many members are held at once, so memory does not grow with the
+archive. Workers decode, process and encode in parallel; one writer
+appends finished entries to the output zip, which is itself written
+sequentially. Entries go under a folder named after their archive
+("photos.tar.gz" member "a/b.png" -> "photos/a/processed_b.png"), so
+members of different archives never overwrite each other. Animated and
+multipage members keep all their frames when the output format can
+hold them (see frames.py). Raw frames
+(.ipraw) are skipped: they are mapped from disk and cannot come from a
+stream.
+"""
+from __future__ import annotations
+import io
+import os
+import posixpath
+import tarfile
+import threading
+import time
+import zipfile
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+import batch
+import image_ops
+import stages
+from lazy_import import lazy_import
+
+frames = lazy_import("frames")  # only animated members need it
+
+
+class Member(NamedTuple):
+    name: str    # path inside the archive, "/"-separated
+    data: bytes
+    archive: str = ""  # stem of the archive it came from
+
+
+_ARCHIVE_EXTS = (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".tbz2", ".txz", ".zip", ".tar")
+
+
+def archive_stem(path: str) -> str:
+    """File name of an archive without its (possibly double) extension."""
+    base = os.path.basename(path)
+    for e in _ARCHIVE_EXTS:
+        if base.lower().endswith(e) and len(base) > len(e):
+            return base[:-len(e)]
+    return os.path.splitext(base)[0]
+
+
+def _wanted(name: str) -> bool:
+    return batch.is_image(name) and not name.lower().endswith(image_ops.RAW_EXT)
+
+
+def iter_members(path: str) -> Iterator[Member]:
+    """Image members of a zip or tar archive, in archive order (raw frames are skipped)."""
+    stem = archive_stem(path)
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir() and _wanted(info.filename):
+                    yield Member(info.filename, zf.read(info), stem)
+    elif tarfile.is_tarfile(path):
+        with tarfile.open(path, "r|*") as tf:  # stream mode: no seeks, any compression
+            for info in tf:
+                if info.isfile() and _wanted(info.name):
+                    yield Member(info.name, tf.extractfile(info).read(), stem)
+    else:
+        raise ValueError(f"Not a zip or tar archive: {path}")
+
+
+# Formats that are compressed already; deflating them again only costs CPU
+_STORED = (".jpg", ".jpeg", ".png", ".webp")
+
+
+class ZipSink:
+    """Zip writer that worker threads can share; entries land as they finish."""
+
+    def __init__(self, path: str):
+        self._zf = zipfile.ZipFile(path, "w")
+        self._lock = threading.Lock()
+        self.names: List[str] = []
+
+    def __enter__(self) -> "ZipSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, name: str, data: bytes) -> None:
+        info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED if name.lower().endswith(_STORED) else zipfile.ZIP_DEFLATED
+        with self._lock:
+            self._zf.writestr(info, data)
+            self.names.append(name)
+
+    def close(self) -> None:
+        self._zf.close()
+
+
+def _output_name(member: Member, ext: Optional[str]) -> str:
+    folder, base = posixpath.split(member.name)
+    parts = [p for p in folder.split("/") if p not in ("", ".")]  # "/x/a.png" stays under the archive
+    if ".." in parts:
+        raise ValueError(f"Member path leaves the archive: {member.name}")
+    stem, src_ext = posixpath.splitext(base)
+    return posixpath.join(member.archive, *parts, f"processed_{stem}{ext or src_ext}")
+
+
+def process_member(member: Member, steps: List[batch.Step], ext: Optional[str],
+                   save: Dict[str, Any]) -> Member:
+    """Decode, run `steps` and encode one member, all in memory."""
+    img, plan = batch.load_planned(io.BytesIO(member.data), steps)
+    name = _output_name(member, ext)
+    out_ext = posixpath.splitext(name)[1]
+    if batch._keeps_frames(img, name):
+        return Member(name, frames.encode_image(img, out_ext, plan, save))
+    return Member(name, image_ops.encode_image(batch.run_steps(img, plan), out_ext, **save))
+
+
+def apply_pipeline_archive(
+    archives: Iterable[str],
+    output_zip: str,
+    steps: List[batch.Step],
+    ext: Optional[str] = None,
+    workers: int = 0,
+    processes: bool = False,
+    queue_size: int = 8,
+    save: Optional[Dict[str, Any]] = None,
+    metrics: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """
+    Run `steps` over every image member of `archives` and write the results
+    into `output_zip`, one folder per archive. Returns the entry names in
+    input order; raises ValueError if two archives share a stem.
+
+    workers: compute threads (0 -> os.cpu_count()).
+    processes: do the decode/compute/encode in a process pool instead.
+    queue_size: members buffered between stages; bounds memory use.
+    metrics: optional dict filled by stages.run_stages.
+    """
+    archives = list(archives)
+    seen: Dict[str, str] = {}
+    for a in archives:  # also catches one archive listed twice
+        stem = archive_stem(a)
+        if stem in seen:
+            raise ValueError(f"{seen[stem]} and {a} would both be written to {stem}/")
+        seen[stem] = a
+    save = save or {}
+    workers = workers or os.cpu_count() or 1
+    members = chain.from_iterable(iter_members(a) for a in archives)
+    pool = batch._process_pool(workers) if processes else None
+
+    def work(member: Member) -> Member:
+        if pool is None:
+            return process_member(member, steps, ext, save)
+        return pool.submit(process_member, member, steps, ext, save).result()
+
+    try:
+        with ZipSink(output_zip) as sink:
+            def write(member: Member) -> str:
+                sink.write(member.name, member.data)
+                return member.name
+            return stages.run_stages(
+                members, [("compute", work, workers), ("write", write, 1)],
+                queue_size=queue_size, metrics=metrics,
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
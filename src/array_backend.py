@@ -0,0 +1,221 @@
+# src/array_backend.py
+"""
+Optional NumPy backend: run point and geometric steps over a whole group of
+same-shape images in one vectorized call.
+
+Images are stacked into an N x H x W (x C) array and each step is a single
+NumPy operation over the stack, instead of one Pillow call per image.
+Scratch and output arrays come from a BufferPool and are reused from group
+to group. Only the steps in SUPPORTED have array versions; supports()
+tells callers when to stay on the per-image Pillow path.
+
+Pillow runs all of these in C per image (sepia is a colour-matrix
+convert), so the stacked calls mainly save per-call overhead on small
+images; see tests/perf/test_array_backend_benchmark.py.
+
+Requires numpy (pip install numpy).
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Tuple
+from PIL import Image
+import image_ops
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+Step = Tuple[str, Dict[str, Any]]
+
+SUPPORTED = ("grayscale", "sepia", "flip_h", "flip_v", "rotate", "transpose", "crop")
+MODES = ("L", "RGB", "RGBA")
+
+# ITU-R 601-2 luma in the fixed point Pillow's convert("L") uses
+_LUMA = (19595, 38470, 7471)
+# image_ops.SEPIA_MATRIX; summed in float32 and rounded like Pillow's matrix convert
+_SEPIA = ((0.393, 0.769, 0.189), (0.349, 0.686, 0.168), (0.272, 0.534, 0.131))
+
+
+def available() -> bool:
+    return np is not None
+
+
+def _require() -> None:
+    if np is None:
+        raise RuntimeError("The array backend needs numpy (pip install numpy)")
+
+
+def supports(steps: Iterable[Step], mode: str = "RGB") -> bool:
+    if mode not in MODES:
+        return False
+    for op, kwargs in steps:
+        if op not in SUPPORTED:
+            return False
+        if op == "rotate" and not image_ops.rotation_transpose(kwargs.get("degrees", 0))[0]:
+            return False
+    return True
+
+
+class BufferPool:
+    """Arrays keyed by (shape, dtype, tag), handed out again for the next group."""
+
+    def __init__(self):
+        self._bufs: Dict[Tuple, Any] = {}
+
+    def get(self, shape: Tuple[int, ...], dtype, tag: str = "") -> "np.ndarray":
+        key = (tuple(shape), np.dtype(dtype).str, tag)
+        buf = self._bufs.get(key)
+        if buf is None:
+            buf = self._bufs[key] = np.empty(shape, dtype=dtype)
+        return buf
+
+    def nbytes(self) -> int:
+        return sum(b.nbytes for b in self._bufs.values())
+
+
+def stack(images: List[Image.Image], pool: BufferPool) -> "np.ndarray":
+    """Copy same-shape images into one N x H x W (x C) pooled array."""
+    _require()
+    first = np.asarray(images[0])
+    out = pool.get((len(images),) + first.shape, first.dtype, "stack")
+    out[0] = first
+    for i, img in enumerate(images[1:], 1):
+        out[i] = np.asarray(img)
+    return out
+
+
+def _fresh(pool: BufferPool, shape, dtype, tag: str, src: "np.ndarray") -> "np.ndarray":
+    """Pooled output buffer that does not overlap `src` (ping-pongs between two)."""
+    out = pool.get(shape, dtype, tag + ":a")
+    if np.may_share_memory(out, src):
+        out = pool.get(shape, dtype, tag + ":b")
+    return out
+
+
+def _materialize(view: "np.ndarray", pool: BufferPool, tag: str) -> "np.ndarray":
+    out = _fresh(pool, view.shape, view.dtype, tag, view)
+    np.copyto(out, view)
+    return out
+
+
+def _grayscale(arr: "np.ndarray", pool: BufferPool) -> "np.ndarray":
+    if arr.ndim == 3:  # already L
+        return arr
+    acc = pool.get(arr.shape[:3], np.uint32, "acc")
+    tmp = pool.get(arr.shape[:3], np.uint32, "tmp")
+    np.multiply(arr[..., 0], _LUMA[0], out=acc, dtype=np.uint32)
+    for c in (1, 2):
+        np.multiply(arr[..., c], _LUMA[c], out=tmp, dtype=np.uint32)
+        acc += tmp
+    acc += 0x8000
+    acc >>= 16
+    out = _fresh(pool, arr.shape[:3], np.uint8, "gray", arr)
+    np.copyto(out, acc, casting="unsafe")
+    return out
+
+
+def _sepia(arr: "np.ndarray", pool: BufferPool) -> "np.ndarray":
+    if arr.ndim == 3:  # L -> RGB, as convert("RGB") would
+        arr = np.repeat(arr[..., None], 3, axis=3)
+    out = _fresh(pool, arr.shape[:3] + (3,), np.uint8, "sepia", arr)
+    acc = pool.get(arr.shape[:3], np.float32, "facc")
+    tmp = pool.get(arr.shape[:3], np.float32, "ftmp")
+    for c, (kr, kg, kb) in enumerate(_SEPIA):
+        np.multiply(arr[..., 0], np.float32(kr), out=acc)
+        np.multiply(arr[..., 1], np.float32(kg), out=tmp)
+        acc += tmp
+        np.multiply(arr[..., 2], np.float32(kb), out=tmp)
+        acc += tmp
+        acc += np.float32(0.5)
+        np.floor(acc, out=acc)
+        np.minimum(acc, 255, out=acc)
+        np.copyto(out[..., c], acc, casting="unsafe")
+    return out
+
+
+# Transposes as numpy views over the (N, H, W, ...) stack
+_T = image_ops.Transpose
+_VIEWS = {
+    _T.FLIP_LEFT_RIGHT: lambda a: a[:, :, ::-1],
+    _T.FLIP_TOP_BOTTOM: lambda a: a[:, ::-1],
+    _T.ROTATE_90: lambda a: np.rot90(a, 1, axes=(1, 2)),
+    _T.ROTATE_180: lambda a: a[:, ::-1, ::-1],
+    _T.ROTATE_270: lambda a: np.rot90(a, 3, axes=(1, 2)),
+    _T.TRANSPOSE: lambda a: np.swapaxes(a, 1, 2),
+    _T.TRANSVERSE: lambda a: np.swapaxes(a, 1, 2)[:, ::-1, ::-1],
+}
+
+
+def _transpose(arr: "np.ndarray", method, pool: BufferPool) -> "np.ndarray":
+    if method is None:
+        return arr
+    return _materialize(_VIEWS[method](arr), pool, "geom")
+
+
+def _crop(arr: "np.ndarray", box, pool: BufferPool) -> "np.ndarray":
+    """Same as image_ops.crop_box: parts of the box outside the image are zero-filled."""
+    h, w = arr.shape[1:3]
+    l, t, r, b = (int(round(v)) for v in box)  # Image.crop rounds float boxes
+    if r < l or b < t:
+        raise ValueError(f"Invalid crop area: ({l},{t},{r},{b})")
+    cl, cr = max(0, min(l, w)), max(0, min(r, w))
+    ct, cb = max(0, min(t, h)), max(0, min(b, h))
+    if (cl, ct, cr, cb) == (l, t, r, b):
+        return _materialize(arr[:, t:b, l:r], pool, "geom")
+    out = _fresh(pool, (arr.shape[0], b - t, r - l) + arr.shape[3:], arr.dtype, "geom", arr)
+    out.fill(0)
+    if cr > cl and cb > ct:
+        out[:, ct - t:cb - t, cl - l:cr - l] = arr[:, ct:cb, cl:cr]
+    return out
+
+
+def run_array_steps(arr: "np.ndarray", steps: Iterable[Step], pool: BufferPool) -> "np.ndarray":
+    """Apply `steps` to a stacked group; the result may alias pooled buffers."""
+    for op, kwargs in steps:
+        if op == "grayscale":
+            arr = _grayscale(arr, pool)
+        elif op == "sepia":
+            arr = _sepia(arr, pool)
+        elif op == "flip_h":
+            arr = _transpose(arr, _T.FLIP_LEFT_RIGHT, pool)
+        elif op == "flip_v":
+            arr = _transpose(arr, _T.FLIP_TOP_BOTTOM, pool)
+        elif op == "rotate":
+            exact, method = image_ops.rotation_transpose(kwargs.get("degrees", 0))
+            if not exact:
+                raise ValueError(f"Array backend only rotates by multiples of 90: {kwargs}")
+            arr = _transpose(arr, method, pool)
+        elif op == "transpose":
+            arr = _transpose(arr, kwargs.get("method"), pool)
+        elif op == "crop":
+            arr = _crop(arr, kwargs["box"], pool)
+        else:
+            raise ValueError(f"Unknown step for array backend: {op}")
+    return arr
+
+
+def _to_image(arr: "np.ndarray", mode: str) -> Image.Image:
+    # copy out: the pooled array is overwritten by the next group
+    if arr.ndim == 2:
+        mode = "L"
+    elif arr.shape[2] == 3:
+        mode = "RGB"
+    return Image.frombytes(mode, (arr.shape[1], arr.shape[0]), arr.tobytes())
+
+
+def apply_group(images: List[Image.Image], steps: List[Step], pool: BufferPool) -> List[Image.Image]:
+    """Run `steps` over same-mode, same-size images with one call per step."""
+    _require()
+    mode, size = images[0].mode, images[0].size
+    if any(im.mode != mode or im.size != size for im in images):
+        raise ValueError("apply_group needs images of one mode and size")
+    out = run_array_steps(stack(images, pool), steps, pool)
+    return [_to_image(out[i], mode) for i in range(len(images))]
+
+
+def group_by_shape(images: List[Image.Image]) -> Dict[Tuple[str, Tuple[int, int]], List[int]]:
+    """Indices of `images` grouped by (mode, size), in first-seen order."""
+    groups: Dict[Tuple[str, Tuple[int, int]], List[int]] = {}
+    for i, img in enumerate(images):
+        groups.setdefault((img.mode, img.size), []).append(i)
+    return groups
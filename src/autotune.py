@@ -0,0 +1,139 @@
+# src/autotune.py
+"""
+Pick the worker count for a batch from measured throughput.
+
+The pool is sized for the most workers allowed; the tuner only changes how
+many images are in flight, so trying a new level costs nothing. Results are
+measured over windows ("chunks") of completed images. Concurrency starts
+low and doubles while images/sec keeps improving, CPU is not saturated and
+free memory stays above a reserve; it then bisects on both sides of the
+best level seen and settles there. A level only counts as better when it
+beats the best so far by `min_gain`, so ties go to fewer workers.
+
+Chunk size follows throughput so each measurement window lasts about
+`window_s` seconds.
+"""
+from __future__ import annotations
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+
+def _rss_bytes(proc) -> int:
+    """RSS of this process and its worker processes."""
+    import psutil
+    total = 0
+    for p in [proc] + proc.children(recursive=True):
+        try:
+            total += p.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+    return total
+
+
+class WorkerTuner:
+    """
+    Hill-climbing controller for batch concurrency. Call record() once per
+    finished image; read `workers` to know how many may run now.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 0,
+        start: int = 1,
+        min_gain: float = 0.05,
+        cpu_saturation: float = 90.0,
+        reserve_mb: float = 512.0,
+        window_s: float = 1.0,
+        min_chunk: int = 4,
+        max_chunk: int = 256,
+    ):
+        import psutil  # measured only while tuning; keeps psutil out of plain runs
+        self._psutil = psutil
+        self._proc = psutil.Process(os.getpid())
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.workers = max(1, min(start, self.max_workers))
+        self.chunk = min_chunk
+        self.min_gain, self.cpu_saturation = min_gain, cpu_saturation
+        self.reserve = int(reserve_mb * 1024 * 1024)
+        self.window_s, self.min_chunk, self.max_chunk = window_s, min_chunk, max_chunk
+        self.best_workers: Optional[int] = None
+        self.best_ips = 0.0
+        self.settled = False
+        self.history: List[Dict[str, Any]] = []
+        self._tried: Dict[int, float] = {}      # level -> images/sec
+        self._cap = self.max_workers + 1       # levels >= cap ran short of memory
+        self._growing = True
+        self._t0: Optional[float] = None
+        self._done = 0
+
+    def record(self, n: int = 1) -> None:
+        """Count finished images; closes a window every `chunk` images."""
+        now = time.perf_counter()
+        if self._t0 is None:  # first result: pool start-up is not throughput
+            self._t0 = now
+            self._psutil.cpu_percent(interval=None)
+            return
+        self._done += n
+        if self._done >= self.chunk:
+            self._close_window(self._done / (now - self._t0))
+            self._t0, self._done = now, 0
+
+    def _close_window(self, ips: float) -> None:
+        cpu = self._psutil.cpu_percent(interval=None)
+        available = self._psutil.virtual_memory().available
+        rss = _rss_bytes(self._proc)
+        # room for another worker's share on top of the reserve
+        mem_ok = available > self.reserve + rss / max(1, self.workers)
+        self.history.append({
+            "workers": self.workers, "chunk": self.chunk, "images_per_s": round(ips, 2),
+            "cpu_percent": cpu, "rss_mb": round(rss / 2**20, 1),
+            "available_mb": round(available / 2**20, 1),
+        })
+        self.chunk = max(self.min_chunk, min(self.max_chunk, round(ips * self.window_s)))
+        self.observe(ips, cpu, mem_ok)
+
+    def observe(self, ips: float, cpu_percent: float, memory_ok: bool = True) -> int:
+        """Take one window's measurements at the current level; returns the next level."""
+        if not self.settled:
+            self.workers = self._advance(self.workers, ips, cpu_percent, memory_ok)
+        return self.workers
+
+    def _advance(self, w: int, ips: float, cpu: float, mem_ok: bool) -> int:
+        self._tried[w] = ips
+        if not mem_ok:
+            self._cap = min(self._cap, w)
+        if cpu >= self.cpu_saturation or not mem_ok:
+            self._growing = False
+        allowed = sorted(level for level in self._tried if level < self._cap)
+        if not allowed:  # even the lowest level tried ran short of memory
+            self.best_workers = max(1, self._cap - 1)
+            self.settled = self.best_workers in self._tried or self._cap <= 1
+            return self.best_workers
+        # more workers have to earn their keep: min_gain over the best so far
+        best = allowed[0]
+        for level in allowed[1:]:
+            if self._tried[level] > self._tried[best] * (1 + self.min_gain):
+                best = level
+        self.best_workers, self.best_ips = best, self._tried[best]
+        top = min(self.max_workers, self._cap - 1)
+        if self._growing and w == best and w < top:
+            return min(top, w * 2)
+        self._growing = False
+        # bisect on both sides of the best level
+        ceiling = min(min((lv for lv in self._tried if lv > best), default=best + 1), self._cap)
+        floor = max((lv for lv in allowed if lv < best), default=best)
+        for cand in ((floor + best) // 2, (best + ceiling) // 2):
+            if floor < cand < ceiling and cand != best and cand not in self._tried:
+                return cand
+        self.settled = True
+        return best
+
+    def report(self) -> Dict[str, Any]:
+        """Chosen settings plus the measurement history."""
+        return {
+            "workers": self.best_workers or self.workers,
+            "chunk": self.chunk,
+            "settled": self.settled,
+            "history": self.history,
+        }
@@ -1,53 +1,661 @@
 # src/batch.py
 from __future__ import annotations
 import os
-from typing import Callable, Iterable, List, Tuple, Dict, Any
+import time
+from collections import deque
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
 from PIL import Image
+import admission
 import image_ops
+import lazy
+import stages
+from lazy_import import lazy_import
+
+# Loaded on first use: numpy, process pools and shared memory are slow to
+# import and most runs never touch them
+array_backend = lazy_import("array_backend")
+autotune = lazy_import("autotune")
+frames = lazy_import("frames")
+guard = lazy_import("guard")
+shm_frames = lazy_import("shm_frames")
+
+Step = Tuple[str, Dict[str, Any]]
+
+# Step name -> callable(img, **kwargs) returning a new image
+OPS: Dict[str, Callable[..., Image.Image]] = {
+    "resize": image_ops.resize_aspect,
+    "grayscale": image_ops.filter_grayscale,
+    "blur": image_ops.filter_blur,
+    "sharpen": image_ops.filter_sharpen,
+    "sepia": image_ops.filter_sepia,
+    "lut": image_ops.apply_lut,
+    "color_matrix": image_ops.color_matrix,
+    "overlay": image_ops.overlay,
+    "levels": image_ops.apply_levels,
+    "rotate": image_ops.rotate,
+    "flip_h": image_ops.flip_horizontal,
+    "flip_v": image_ops.flip_vertical,
+    "crop": image_ops.crop_box,
+    "transpose": image_ops.transpose,
+}
+# Metadata that survives a trip through a worker process
+_CARRIED_INFO = ("exif", "icc_profile")
+# With a process pool a frame is alive in the parent and in a worker
+_POOL_COPIES = 2
 
 def ensure_dir(path: str) -> None:
     os.makedirs(path, exist_ok=True)
 
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp", ".gif", image_ops.RAW_EXT)
+
+def is_image(name: str) -> bool:
+    return name.lower().endswith(IMAGE_EXTS)
+
 def list_images(folder: str) -> List[str]:
-    exts = (".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".webp")
-    return [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(exts)]
+    return [os.path.join(folder, f) for f in os.listdir(folder) if is_image(f)]
+
+def _output_path(output_folder: str, src: str, suffix: str = "", ext: Optional[str] = None) -> str:
+    stem, src_ext = os.path.splitext(os.path.basename(src))
+    return os.path.join(output_folder, f"processed_{stem}{suffix}{ext or src_ext}")
+
+def _crops_after_work(steps: List[Step]) -> bool:
+    return any(op == "crop" for op, _ in steps[1:])
+
+def run_lazy(img: Image.Image, steps: List[Step]) -> Image.Image:
+    """The ("lazy", {"steps": [...]}) step: evaluate `steps` as one lazy graph (see lazy.py)."""
+    return lazy.from_steps(lazy.wrap(img), steps, fallback=OPS).compute()
+
+OPS["lazy"] = run_lazy
+
+def lazy_steps(steps: List[Step]) -> List[Step]:
+    """
+    Wrap `steps` in one "lazy" step when a crop follows other work, so the
+    earlier steps only compute the region the crop keeps. Results match
+    eager evaluation except that a resize inside the graph may differ by
+    one level per channel (see lazy._Resize).
+    """
+    steps = list(steps)
+    return [("lazy", {"steps": steps})] if _crops_after_work(steps) else steps
+
+def run_steps(img: Image.Image, steps: Iterable[Step]) -> Image.Image:
+    """Apply a step list to an already decoded image."""
+    for op, kwargs in steps:
+        fn = OPS.get(op)
+        if fn is None:
+            raise ValueError(f"Unknown step: {op}")
+        img = fn(img, **kwargs)
+    return img
+
+# --- Orientation planning ---
+def _as_transpose(op: str, kwargs: Dict[str, Any]) -> Tuple[bool, Optional[image_ops.Transpose]]:
+    """(True, transpose) for steps that are lossless transposes."""
+    if op == "transpose":
+        return True, kwargs.get("method")
+    if op == "flip_h":
+        return True, image_ops.Transpose.FLIP_LEFT_RIGHT
+    if op == "flip_v":
+        return True, image_ops.Transpose.FLIP_TOP_BOTTOM
+    if op == "rotate":
+        return image_ops.rotation_transpose(kwargs.get("degrees", 0))
+    return False, None
+
+def plan_orientation(steps: List[Step], method: Optional[image_ops.Transpose]) -> List[Step]:
+    """
+    Fold an EXIF orientation transpose into `steps` so it costs no extra
+    full-size pass. Leading rotate/flip steps merge with it into one
+    transpose; if a resize comes next it runs first on the unrotated pixels
+    (width/height swapped as needed) and the transpose touches the smaller
+    result.
+    """
+    steps = list(steps)
+    i = 0
+    while i < len(steps):
+        ok, m = _as_transpose(*steps[i])
+        if not ok:
+            break
+        method = image_ops.compose_transpose(method, m)
+        i += 1
+    rest = steps[i:]
+    if method is None:
+        return rest
+    if rest and rest[0][0] == "resize":
+        kw = dict(rest[0][1])
+        if image_ops.transpose_swaps_axes(method):
+            kw = {"width": kw.get("height"), "height": kw.get("width")}
+        return [("resize", kw), ("transpose", {"method": method})] + rest[1:]
+    return [("transpose", {"method": method})] + rest
+
+def load_planned(path: Union[str, BinaryIO], steps: List[Step]) -> Tuple[Image.Image, List[Step]]:
+    """Open `path` (or a file object) without orienting it; returns the image and its own plan."""
+    img = image_ops.load_image(path, orient=False)
+    method = image_ops.orientation_transpose(img)
+    if method is not None:
+        image_ops.clear_orientation(img)
+    return img, plan_orientation(steps, method)
 
 def apply_pipeline(
     input_paths: Iterable[str],
     output_folder: str,
-    steps: List[Tuple[str, Dict[str, Any]]]
+    steps: List[Tuple[str, Dict[str, Any]]],
+    ext: Optional[str] = None,
+    workers: Union[int, str] = 0,
+    transport: str = "shm",
+    save: Optional[Dict[str, Any]] = None,
+    backend: str = "pillow",
+    group_size: int = 32,
+    memory_budget_mb: Optional[float] = None,
+    summary: Optional[Dict[str, Any]] = None,
+    lazy: bool = False,
 ) -> List[str]:
     """
     steps: list of (operation_name, kwargs)
-      operation_name in {"resize","grayscale","blur","sharpen","sepia","rotate","flip_h","flip_v","crop"}
+      operation_name in {"resize","grayscale","blur","sharpen","sepia","rotate","flip_h","flip_v","crop",
+      "lut","color_matrix","overlay"}; ("lut", {"path": "grade.cube"}) parses the file once per process,
+      ("color_matrix", {"preset": "sepia"}) or {"matrix": (12 values)} runs a 3x4 matrix,
+      ("overlay", {"path": "logo.png", "position": "bottom-right", "opacity": 0.6, "scale": 0.15})
+      stamps a watermark, rescaled once per output size, and ("levels", {"table": [...]}) is
+      a point remap (see normalize.py for shoot-wide auto-contrast)
+    ext: output extension (default: the input's). Use image_ops.RAW_EXT to
+      write uncompressed intermediates for a following batch pass.
+    workers: 0 runs in-process; N > 0 runs the steps in N worker processes
+      while this process decodes and saves; "auto" picks N while the batch
+      runs from measured images/sec, CPU load and free memory (autotune.py).
+    transport: how pixels reach the workers, "shm" (shared memory) or "pickle".
+    save: keyword arguments for save_image, e.g. {"quality": 85, "metadata": "strip"}
+    backend: "pillow" runs each image on its own; "array" stacks up to
+      `group_size` same-shape images and runs supported steps as one NumPy
+      call per step (see array_backend.py; needs numpy). "array" runs in
+      this process and raises ValueError with workers or memory_budget_mb.
+    memory_budget_mb: with workers, admit images only while their estimated
+      working sets (from a header probe) fit the budget; images larger
+      than the whole budget run alone in-process after the pool drains.
+    summary: optional dict filled with images, elapsed_s and workers (with
+      "auto", also the chosen chunk size and the tuning history).
+    lazy: when a crop follows other steps, evaluate the list lazily so they
+      only compute the cropped region (see lazy_steps; off by default).
+    EXIF orientation is folded into the steps (see plan_orientation).
+    Animated GIF/WebP and multipage TIFF inputs keep every frame when the
+    output format can hold them; with workers their frames share the pool
+    (see frames.py).
+    """
+    t0 = time.perf_counter()
+    if lazy:
+        steps = lazy_steps(steps)
+    outputs = _apply_pipeline(input_paths, output_folder, steps, ext, workers, transport,
+                              save or {}, backend, group_size, memory_budget_mb, summary)
+    if summary is not None:
+        summary.setdefault("workers", workers)
+        summary["images"] = len(outputs)
+        summary["elapsed_s"] = round(time.perf_counter() - t0, 4)
+    return outputs
+
+def _apply_pipeline(
+    input_paths: Iterable[str],
+    output_folder: str,
+    steps: List[Step],
+    ext: Optional[str],
+    workers: Union[int, str],
+    transport: str,
+    save: Dict[str, Any],
+    backend: str,
+    group_size: int,
+    memory_budget_mb: Optional[float],
+    summary: Optional[Dict[str, Any]],
+) -> List[str]:
+    ensure_dir(output_folder)
+    if backend not in ("pillow", "array"):
+        raise ValueError(f"Unknown backend: {backend}")
+    if backend == "array":
+        # groups run in this process; there is no pool to bound or tune
+        if workers or memory_budget_mb is not None:
+            raise ValueError('backend="array" runs in-process; it takes neither workers nor memory_budget_mb')
+        return _apply_grouped(list(input_paths), output_folder, steps, ext, save, group_size)
+    if workers == "auto":
+        tuner = autotune.WorkerTuner()
+        try:
+            return _apply_parallel(list(input_paths), output_folder, steps, ext, tuner.max_workers,
+                                   transport, save, _budget(memory_budget_mb), tuner)
+        finally:
+            if summary is not None:
+                summary.update(tuner.report())
+    if workers > 0:
+        budget = _budget(memory_budget_mb)
+        return _apply_parallel(list(input_paths), output_folder, steps, ext, workers, transport, save, budget)
+    return [process_file(p, output_folder, steps, ext, save) for p in input_paths]
+
+def _keeps_frames(img: Image.Image, out_path: str) -> bool:
+    """Animated/multipage input going to a format that can hold all its frames."""
+    return getattr(img, "is_animated", False) and frames.supports(out_path)
+
+def process_file(path: str, output_folder: str, steps: List[Step], ext: Optional[str] = None,
+                 save: Optional[Dict[str, Any]] = None) -> str:
+    """Load, run `steps` and save one input in this process; returns the output path."""
+    img, plan = load_planned(path, steps)
+    out_path = _output_path(output_folder, path, ext=ext)
+    if _keeps_frames(img, out_path):
+        return frames.process_image(img, out_path, plan, save=save)
+    image_ops.save_image(run_steps(img, plan), out_path, **(save or {}))
+    return out_path
+
+# --- Array backend ---
+def _apply_grouped(
+    paths: List[str],
+    output_folder: str,
+    steps: List[Step],
+    ext: Optional[str],
+    save: Dict[str, Any],
+    group_size: int,
+) -> List[str]:
+    pool = array_backend.BufferPool()  # reused by every group of the run
+    outputs: List[str] = []
+    for start in range(0, len(paths), max(1, group_size)):
+        chunk = paths[start:start + group_size]
+        loaded = [load_planned(p, steps) for p in chunk]
+        out_paths = [_output_path(output_folder, p, ext=ext) for p in chunk]
+        animated = {i for i, (img, _) in enumerate(loaded) if _keeps_frames(img, out_paths[i])}
+        groups: Dict[Tuple, List[int]] = {}
+        for i, (img, plan) in enumerate(loaded):
+            if i in animated:  # frame by frame, never stacked with stills
+                frames.process_image(img, out_paths[i], plan, save=save)
+                continue
+            groups.setdefault((img.mode, img.size, repr(plan)), []).append(i)
+        results: List[Optional[Image.Image]] = [None] * len(chunk)
+        for idxs in groups.values():
+            imgs = [loaded[i][0] for i in idxs]
+            plan = loaded[idxs[0]][1]
+            if len(imgs) > 1 and array_backend.supports(plan, imgs[0].mode):
+                outs = array_backend.apply_group(imgs, plan, pool)
+                for src, out in zip(imgs, outs):
+                    out.info.update({k: src.info[k] for k in _CARRIED_INFO if k in src.info})
+            else:
+                outs = [run_steps(img, plan) for img in imgs]
+            for i, out in zip(idxs, outs):
+                results[i] = out
+        for i, (img, out_path) in enumerate(zip(results, out_paths)):
+            if i not in animated:
+                image_ops.save_image(img, out_path, **save)
+            outputs.append(out_path)
+    return outputs
+
+# --- Process pool ---
+def _budget(memory_budget_mb: Optional[float]) -> Optional[admission.MemoryBudget]:
+    if memory_budget_mb is None:
+        return None
+    return admission.MemoryBudget(int(memory_budget_mb * 1024 * 1024))
+
+def _estimate(path: str, steps: List[Step], copies: int = 1) -> int:
+    return admission.estimate_peak_bytes(admission.probe_image(path), steps) * copies
+
+def _process_pool(workers: int) -> "ProcessPoolExecutor":
+    """Process pool that is safe to grow from worker threads."""
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers, mp_context=guard.worker_context())
+
+def _shm_task(desc: shm_frames.FrameDesc, steps: List[Step]) -> shm_frames.FrameDesc:
+    """Worker side: read the input frame, run the steps, publish the result."""
+    img = run_steps(shm_frames.get_image(desc), steps)
+    shm, out = shm_frames.put_image(img)
+    shm.close()  # the parent unlinks it after reading
+    return out
+
+def _apply_parallel(
+    paths: List[str],
+    output_folder: str,
+    steps: List[Step],
+    ext: Optional[str],
+    workers: int,
+    transport: str,
+    save: Dict[str, Any],
+    budget: Optional[admission.MemoryBudget] = None,
+    tuner: Optional["autotune.WorkerTuner"] = None,
+) -> List[str]:
+    if transport not in ("shm", "pickle"):
+        raise ValueError(f"Unknown transport: {transport}")
+    outputs: Dict[int, str] = {}
+    # [index, future (or (fn, args) until submitted), input segment or None, metadata, bytes], in input order
+    pending: deque = deque()
+
+    def running_limit() -> int:
+        # a tuner's level is how many images run at once; the pool is sized for its maximum
+        return tuner.workers if tuner is not None else workers
+
+    def window() -> int:
+        # decoded images in flight: those running plus as many decoded ahead
+        return 2 * running_limit()
+
+    def dispatch(running: int = 0) -> None:
+        """Submit decoded images in order while fewer than running_limit() run."""
+        for item in pending:
+            if not isinstance(item[1], tuple):
+                running += not item[1].done()
+            elif running < running_limit():
+                fn, args = item[1]
+                item[1] = ex.submit(fn, *args)
+                running += 1
+            else:
+                return
+    oversized: List[int] = []  # serial lane: run alone once the pool is idle
+
+    def finish(item):
+        # `item` has left `pending`; submitted items are a prefix, so if it was not
+        # submitted yet nothing else runs
+        if isinstance(item[1], tuple):
+            fn, args = item[1]
+            item[1] = ex.submit(fn, *args)
+        dispatch(running=1)
+        i, fut, seg, meta, need = item
+        try:
+            res = fut.result()
+        finally:
+            if seg is not None:
+                shm_frames.release(seg)
+        img = shm_frames.get_image(res, unlink=True) if seg is not None else res
+        img.info.update(meta)
+        out_path = _output_path(output_folder, paths[i], ext=ext)
+        image_ops.save_image(img, out_path, **save)
+        outputs[i] = out_path
+        if budget is not None:
+            budget.release(need)
+        if tuner is not None:
+            tuner.record()
+
+    with _process_pool(workers) as ex:
+        try:
+            for i, p in enumerate(paths):
+                need = 0
+                if budget is not None:
+                    need = _estimate(p, steps, _POOL_COPIES)
+                    if budget.oversized(need):
+                        oversized.append(i)
+                        continue
+                    while pending and not budget.fits(need):
+                        finish(pending.popleft())
+                    budget.acquire(need)
+                img, plan = load_planned(p, steps)
+                out_path = _output_path(output_folder, p, ext=ext)
+                if _keeps_frames(img, out_path):
+                    # frames of one animation take the whole pool, in order
+                    while pending:
+                        finish(pending.popleft())
+                    outputs[i] = frames.process_image(img, out_path, plan, ex, running_limit(), save)
+                    if budget is not None:
+                        budget.release(need)
+                    continue
+                meta = {k: img.info[k] for k in _CARRIED_INFO if k in img.info}
+                if transport == "shm":
+                    seg, desc = shm_frames.put_image(img)
+                    pending.append([i, (_shm_task, (desc, plan)), seg, meta, need])
+                else:
+                    img.load()
+                    pending.append([i, (run_steps, (img, plan)), None, meta, need])
+                dispatch()
+                while len(pending) >= window():
+                    finish(pending.popleft())
+            while pending:
+                finish(pending.popleft())
+        finally:
+            # on error: drop queued tasks and reclaim output segments of running ones
+            for _, fut, seg, _, _ in pending:
+                if isinstance(fut, tuple):  # never submitted
+                    pass
+                elif not fut.cancel() and seg is not None and fut.exception() is None:
+                    shm_frames.discard(fut.result())
+                if seg is not None:
+                    shm_frames.release(seg)
+    for i in oversized:
+        outputs[i] = process_file(paths[i], output_folder, steps, ext, save)
+    return [outputs[i] for i in sorted(outputs)]
+
+# --- Staged executor: overlapped decode / compute / encode ---
+def apply_pipeline_staged(
+    input_paths: Iterable[str],
+    output_folder: str,
+    steps: List[Step],
+    ext: Optional[str] = None,
+    readers: int = 2,
+    compute: int = 0,
+    writers: int = 2,
+    queue_size: int = 8,
+    compute_processes: bool = False,
+    metrics: Optional[Dict[str, Any]] = None,
+    save: Optional[Dict[str, Any]] = None,
+    memory_budget_mb: Optional[float] = None,
+) -> List[str]:
+    """
+    Like apply_pipeline, but reading, computing and saving run as separate
+    thread stages joined by bounded queues, so disk and CPU work overlap.
+
+    readers/compute/writers: threads per stage (compute=0 -> os.cpu_count()).
+    compute_processes: run the steps in a process pool (pixels move through
+      shared memory); compute threads then only dispatch to it.
+    metrics: optional dict filled with per-stage queue depth, busy/wait
+      time and utilization, plus the name of the bottleneck stage.
+    save: keyword arguments for save_image.
+    memory_budget_mb: readers wait before decoding until the image's
+      estimated working set fits; it is released once the output is saved.
+    """
+    ensure_dir(output_folder)
+    compute = compute or os.cpu_count() or 1
+    save = save or {}
+    budget = _budget(memory_budget_mb)
+
+    def guarded(fn):
+        # a failed item never reaches write(); wake readers parked on the budget
+        def run(item):
+            try:
+                return fn(item)
+            except BaseException:
+                if budget is not None:
+                    budget.close()
+                raise
+        return run
+
+    def read(p: str):
+        need = 0
+        if budget is not None:
+            need = _estimate(p, steps, _POOL_COPIES if compute_processes else 1)
+            budget.acquire(need)
+        img, plan = load_planned(p, steps)
+        img.load()  # decode here, not lazily in the compute stage
+        return p, img, plan, need
+
+    def write(item) -> str:
+        p, img, need = item
+        out_path = _output_path(output_folder, p, ext=ext)
+        if img is not None:  # None: frames were written by the compute stage
+            image_ops.save_image(img, out_path, **save)
+        if budget is not None:
+            budget.release(need)
+        return out_path
+
+    pool = _process_pool(compute) if compute_processes else None
+
+    def work(item):
+        p, img, plan, need = item
+        out_path = _output_path(output_folder, p, ext=ext)
+        if _keeps_frames(img, out_path):
+            # every frame, streamed to the encoder from this compute thread
+            frames.process_image(img, out_path, plan, pool, 2, save)
+            return p, None, need
+        if pool is None:
+            return p, run_steps(img, plan), need
+        meta = {k: img.info[k] for k in _CARRIED_INFO if k in img.info}
+        seg, desc = shm_frames.put_image(img)
+        try:
+            out = pool.submit(_shm_task, desc, plan).result()
+        finally:
+            shm_frames.release(seg)
+        out_img = shm_frames.get_image(out, unlink=True)
+        out_img.info.update(meta)
+        return p, out_img, need
+
+    try:
+        return stages.run_stages(
+            input_paths,
+            [("read", guarded(read), readers), ("compute", guarded(work), compute),
+             ("write", guarded(write), writers)],
+            queue_size=queue_size,
+            metrics=metrics,
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+# --- Guarded runs: untrusted inputs ---
+def _partial_path(out_path: str) -> str:
+    """Where a guarded task writes before renaming; same folder and extension as `out_path`."""
+    folder, name = os.path.split(out_path)
+    stem, ext = os.path.splitext(name)
+    return os.path.join(folder, f".{stem}.part{ext}")
+
+def _guarded_task(path: str, steps: List[Step], out_path: str,
+                  save: Dict[str, Any], max_pixels: Optional[int]) -> str:
+    """
+    Worker side: size check, decode, steps and save for one input. The
+    output is written under _partial_path and renamed over `out_path` when
+    complete, so a killed worker never leaves a truncated output.
+    """
+    guard.check_pixels(path, max_pixels)
+    if max_pixels:
+        Image.MAX_IMAGE_PIXELS = max_pixels  # per-frame backstop inside the decoder
+    img, plan = load_planned(path, steps)
+    tmp = _partial_path(out_path)
+    try:
+        if _keeps_frames(img, out_path):
+            frames.process_image(img, tmp, plan, save=save)
+        else:
+            image_ops.save_image(run_steps(img, plan), tmp, **save)
+        os.replace(tmp, out_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return out_path
+
+def apply_pipeline_guarded(
+    input_paths: Iterable[str],
+    output_folder: str,
+    steps: List[Step],
+    ext: Optional[str] = None,
+    workers: int = 0,
+    timeout_s: Optional[float] = 60.0,
+    max_pixels: Optional[int] = None,
+    quarantine_dir: Optional[str] = None,
+    save: Optional[Dict[str, Any]] = None,
+    failures: Optional[List[Dict[str, str]]] = None,
+) -> List[str]:
+    """
+    Like apply_pipeline, for inputs that may be corrupt or hostile. Each
+    image is checked, decoded, processed and saved inside a supervised
+    worker process, so a bad file costs at most `timeout_s` and never stops
+    the run.
+
+    workers: worker processes (0 -> os.cpu_count()).
+    max_pixels: refuse images larger than this before decoding
+      (default: Pillow's Image.MAX_IMAGE_PIXELS).
+    quarantine_dir: move failed inputs here, with reasons in quarantine.log.
+    failures: optional list that receives {"path", "reason", "detail"} per
+      failed input. Outputs are renamed into place only once complete, so
+      a failed input leaves any earlier output untouched.
+    Returns the outputs of the inputs that succeeded, in input order.
+    """
+    ensure_dir(output_folder)
+    paths = list(input_paths)
+    workers = workers or os.cpu_count() or 1
+    max_pixels = max_pixels or Image.MAX_IMAGE_PIXELS
+    save = save or {}
+    quarantine = guard.Quarantine(quarantine_dir) if quarantine_dir else None
+    out_paths = [_output_path(output_folder, p, ext=ext) for p in paths]
+    done: Dict[int, str] = {}
+    tasks = ((_guarded_task, (p, steps, out, save, max_pixels)) for p, out in zip(paths, out_paths))
+    with guard.SupervisedPool(min(workers, max(1, len(paths)))) as pool:
+        for i, ok, value in pool.run(tasks, timeout=timeout_s):
+            if ok:
+                done[i] = value
+                continue
+            reason, detail = value
+            partial = _partial_path(out_paths[i])
+            if os.path.exists(partial):  # left by a killed worker
+                os.remove(partial)
+            if failures is not None:
+                failures.append({"path": paths[i], "reason": reason, "detail": detail})
+            if quarantine is not None:
+                quarantine.add(paths[i], reason, detail)
+    return [done[i] for i in sorted(done)]
+
+# --- Fan-out: one decode, many renditions ---
+def _nearest_larger(candidates: List[Image.Image], target: Tuple[int, int]) -> Optional[Image.Image]:
+    """Smallest candidate that is at least `target` in both dimensions, or None."""
+    tw, th = target
+    fits = [c for c in candidates if c.size[0] >= tw and c.size[1] >= th]
+    if not fits:
+        return None
+    return min(fits, key=lambda c: c.size[0] * c.size[1])
+
+def _area(size: Optional[Tuple[int, int]]) -> int:
+    return size[0] * size[1] if size else 0
+
+def _render_branches(base: Image.Image, branches: List[Dict[str, Any]]) -> Dict[str, Image.Image]:
+    """
+    Run every branch on `base`. Branches that start with a resize are rendered
+    largest-first, each downscaling from the nearest larger intermediate
+    instead of from the full-size base.
+    """
+    targets: Dict[str, Tuple[int, int]] = {}
+    for br in branches:
+        steps = br.get("steps", [])
+        if steps and steps[0][0] == "resize":
+            targets[br["name"]] = image_ops.resize_target(base.size, **steps[0][1])
+
+    order = sorted(branches, key=lambda br: -_area(targets.get(br["name"])))
+    intermediates = [base]
+    results: Dict[str, Image.Image] = {}
+    for br in order:
+        steps = br.get("steps", [])
+        target = targets.get(br["name"])
+        img = base
+        if target is not None:
+            src = _nearest_larger(intermediates, target) or base
+            img = src if src.size == target else src.resize(target)
+            intermediates.append(img)
+            steps = steps[1:]
+        results[br["name"]] = run_steps(img, steps)
+    return results
+
+def apply_fanout(
+    input_paths: Iterable[str],
+    output_folder: str,
+    shared_steps: List[Step],
+    branches: List[Dict[str, Any]],
+) -> Dict[str, List[str]]:
+    """
+    Decode each input once, run `shared_steps`, then branch into named outputs.
+
+    branches: list of dicts with keys
+      name   -- required, unique branch name
+      steps  -- step list run after the shared prefix (default: none)
+      suffix -- appended to the output file stem (default: "_<name>")
+      ext    -- output extension, e.g. ".webp" (default: the input's)
+      save   -- keyword arguments for save_image, e.g. {"quality": 80}
+    Returns {branch name: [output paths]}.
     """
+    names = [br["name"] for br in branches]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Duplicate branch names: {names}")
     ensure_dir(output_folder)
-    outputs = []
+    outputs: Dict[str, List[str]] = {n: [] for n in names}
     for p in input_paths:
-        img = image_ops.load_image(p)
-        for op, kwargs in steps:
-            if op == "resize":
-                img = image_ops.resize_aspect(img, **kwargs)
-            elif op == "grayscale":
-                img = image_ops.filter_grayscale(img)
-            elif op == "blur":
-                img = image_ops.filter_blur(img, **kwargs)
-            elif op == "sharpen":
-                img = image_ops.filter_sharpen(img)
-            elif op == "sepia":
-                img = image_ops.filter_sepia(img)
-            elif op == "rotate":
-                img = image_ops.rotate(img, **kwargs)
-            elif op == "flip_h":
-                img = image_ops.flip_horizontal(img)
-            elif op == "flip_v":
-                img = image_ops.flip_vertical(img)
-            elif op == "crop":
-                img = image_ops.crop_box(img, **kwargs)
+        img, plan = load_planned(p, shared_steps)
+        animated = getattr(img, "is_animated", False)
+        base = run_steps(img, plan)
+        rendered = _render_branches(base, branches)
+        for br in branches:
+            name = br["name"]
+            out_path = _output_path(output_folder, p, br.get("suffix", f"_{name}"), br.get("ext"))
+            if animated and frames.supports(out_path):
+                # every frame, each through the shared and branch steps
+                frames.process_image(img, out_path, plan + br.get("steps", []), save=br.get("save", {}))
             else:
-                raise ValueError(f"Unknown step: {op}")
-        base = os.path.basename(p)
-        out_path = os.path.join(output_folder, f"processed_{base}")
-        image_ops.save_image(img, out_path)
-        outputs.append(out_path)
+                image_ops.save_image(rendered[name], out_path, **br.get("save", {}))
+            outputs[name].append(out_path)
     return outputs
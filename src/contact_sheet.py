@@ -0,0 +1,235 @@
+# src/contact_sheet.py
+"""
+Contact sheets of thousands of thumbnails without holding the sheet.
+
+Thumbnails come from reduced decodes (image_ops.load_reduced), in a
+process pool when workers > 0, and only about two strips' worth are in
+flight at a time. The sheet is built one horizontal strip of
+`rows_per_strip` rows at a time and streamed out:
+
+- .png: one file, written row by row through a streaming encoder
+  (PngStripWriter), so a 50k x 200k px sheet never exists in memory;
+- other formats need rows_per_page: each page is assembled from its
+  strips and saved with image_ops.save_image.
+
+Peak memory is set by the strip (or page) height, not the sheet size.
+
+    contact_sheet.make_contact_sheet(batch.list_images("shoot"), "sheet.png", columns=12)
+"""
+from __future__ import annotations
+import os
+import struct
+import zlib
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from PIL import Image, ImageDraw, ImageFont
+import batch
+import image_ops
+import preview
+
+BACKGROUND = "#202830"
+FOREGROUND = "#ffffff"
+MISSING = "#804040"          # outline of cells whose file could not be read
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_COLOR_TYPE = {"L": 0, "RGB": 2}
+
+
+class PngStripWriter:
+    """
+    Write a PNG of known size from top to bottom, one strip at a time.
+    Rows are deflated as they arrive (filter type 0), so memory holds one
+    strip plus the zlib window whatever the image height.
+    """
+
+    def __init__(self, path: str, size: Tuple[int, int], mode: str = "RGB", level: int = 6):
+        if mode not in _PNG_COLOR_TYPE:
+            raise ValueError(f"Unsupported mode for strip writing: {mode}")
+        self.path, self.size, self.mode = path, size, mode
+        self.rows = 0
+        self._z = zlib.compressobj(level)
+        self._f = open(path, "wb")
+        self._f.write(_PNG_SIGNATURE)
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", size[0], size[1], 8, _PNG_COLOR_TYPE[mode], 0, 0, 0))
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self._f.write(struct.pack(">I", len(data)) + kind + data)
+        self._f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    def write(self, strip: Image.Image) -> None:
+        if strip.width != self.size[0] or strip.mode != self.mode:
+            raise ValueError(f"Strip is {strip.mode} {strip.width} px wide, sheet is {self.mode} {self.size[0]}")
+        if self.rows + strip.height > self.size[1]:
+            raise ValueError("Strip runs past the bottom of the image")
+        data = strip.tobytes()
+        stride = len(data) // strip.height
+        rows = b"".join(b"\0" + data[i:i + stride] for i in range(0, len(data), stride))
+        out = self._z.compress(rows)
+        if out:
+            self._chunk(b"IDAT", out)
+        self.rows += strip.height
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        try:
+            if self.rows != self.size[1]:
+                raise ValueError(f"Wrote {self.rows} of {self.size[1]} rows to {self.path}")
+            self._chunk(b"IDAT", self._z.flush())
+            self._chunk(b"IEND", b"")
+        finally:
+            self._f.close()
+
+    def abort(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "PngStripWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.abort() if exc[0] is not None else self.close()
+
+
+class _PageWriter:
+    """Assemble one page from strips and save it whole (formats that cannot stream)."""
+
+    def __init__(self, path: str, size: Tuple[int, int], mode: str, save: Dict[str, Any]):
+        self.path, self.save = path, save
+        self.page = Image.new(mode, size)
+        self.rows = 0
+
+    def write(self, strip: Image.Image) -> None:
+        self.page.paste(strip, (0, self.rows))
+        self.rows += strip.height
+
+    def close(self) -> None:
+        image_ops.save_image(self.page, self.path, **self.save)
+        self.page = None
+
+    def abort(self) -> None:
+        self.page = None
+
+
+def thumbnail(path: str, thumb: int, background: str = BACKGROUND) -> Optional[Image.Image]:
+    """Reduced decode of `path` fitted in thumb x thumb, flattened to RGB; None if unreadable."""
+    try:
+        img = image_ops.load_reduced(path, thumb)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return preview.flatten(img, background).convert("RGB")
+
+
+def _label(draw: ImageDraw.ImageDraw, font, text: str, width: int) -> str:
+    if draw.textlength(text, font=font) <= width:
+        return text
+    while text and draw.textlength(text + "...", font=font) > width:
+        text = text[:-1]
+    return text + "..."
+
+
+def _pages(out_path: str, n_pages: int) -> List[str]:
+    if n_pages == 1:
+        return [out_path]
+    stem, ext = os.path.splitext(out_path)
+    return [f"{stem}_{i + 1:03d}{ext}" for i in range(n_pages)]
+
+
+def make_contact_sheet(
+    paths: List[str],
+    out_path: str,
+    columns: int = 8,
+    thumb: int = 192,
+    gap: int = 8,
+    labels: bool = True,
+    rows_per_strip: int = 4,
+    rows_per_page: int = 0,
+    workers: Union[int, str] = 0,
+    background: str = BACKGROUND,
+    save: Optional[Dict[str, Any]] = None,
+    summary: Optional[Dict[str, Any]] = None,
+) -> List[str]:
+    """
+    Grid of `columns` thumbnails (thumb px cells, file names underneath
+    when labels) in input order. rows_per_page > 0 splits the sheet into
+    pages out_001.png, out_002.png, ...; formats other than PNG require it.
+    save: keyword arguments for save_image (paged non-PNG output only).
+    workers: thumbnail processes; "auto" means one per CPU.
+    Returns the written paths; summary receives sizes and unreadable files.
+    """
+    if not paths:
+        raise ValueError("No images for the contact sheet")
+    streamed = out_path.lower().endswith(".png")
+    if not streamed and rows_per_page <= 0:
+        raise ValueError("Only .png sheets can be written in strips; set rows_per_page for other formats")
+
+    font = ImageFont.load_default()
+    label_h = font.getbbox("Ag")[3] + 4 if labels else 0
+    cell_w, cell_h = thumb + gap, thumb + label_h + gap
+    rows = -(-len(paths) // columns)
+    page_rows = rows_per_page if rows_per_page > 0 else rows
+    sheet_w = columns * cell_w + gap
+    out_paths = _pages(out_path, -(-rows // page_rows))
+
+    if not isinstance(workers, int):
+        workers = os.cpu_count() or 1
+    # thumbnails in flight: the strip being drawn plus the next one
+    window = 2 * rows_per_strip * columns
+    pending: Deque = deque()
+    pool = batch._process_pool(workers) if workers > 0 and len(paths) > 1 else None
+    queued = iter(paths)
+
+    def fill() -> None:
+        for p in queued:
+            pending.append(pool.submit(thumbnail, p, thumb, background) if pool else p)
+            if len(pending) >= window:
+                return
+
+    def take() -> Optional[Image.Image]:
+        item = pending.popleft()
+        return item.result() if pool else thumbnail(item, thumb, background)
+
+    missing: List[str] = []
+    index = 0
+    try:
+        fill()
+        for page, page_path in enumerate(out_paths):
+            n_rows = min(page_rows, rows - page * page_rows)
+            size = (sheet_w, n_rows * cell_h + gap)
+            writer = PngStripWriter(page_path, size) if streamed else \
+                _PageWriter(page_path, size, "RGB", save or {})
+            try:
+                for first in range(0, n_rows, rows_per_strip):
+                    strip_rows = min(rows_per_strip, n_rows - first)
+                    last = first + strip_rows == n_rows
+                    strip = Image.new("RGB", (sheet_w, strip_rows * cell_h + (gap if last else 0)), background)
+                    d = ImageDraw.Draw(strip)
+                    for r in range(strip_rows):
+                        for c in range(columns):
+                            if index == len(paths):
+                                break
+                            x, y = gap + c * cell_w, gap + r * cell_h
+                            img = take()
+                            fill()
+                            if img is None:
+                                missing.append(paths[index])
+                                d.rectangle([x, y, x + thumb - 1, y + thumb - 1], outline=MISSING, width=2)
+                            else:
+                                strip.paste(img, (x + (thumb - img.width) // 2, y + (thumb - img.height) // 2))
+                            if labels:
+                                name = _label(d, font, os.path.basename(paths[index]), thumb)
+                                d.text((x, y + thumb + 2), name, fill=FOREGROUND, font=font)
+                            index += 1
+                    writer.write(strip)
+            except BaseException:
+                writer.abort()
+                raise
+            writer.close()
+    finally:
+        if pool is not None:
+            for f in pending:
+                f.cancel()
+            pool.shutdown()
+
+    if summary is not None:
+        summary.update({"images": len(paths), "pages": len(out_paths), "sheet_size": (sheet_w, rows * cell_h + gap),
+                        "unreadable": missing})
+    return out_paths
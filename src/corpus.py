@@ -0,0 +1,173 @@
+# src/corpus.py
+"""
+Seeded, photo-like synthetic images for benchmarks.
+
+Flat-colour frames decode, filter and compress far faster than real photos,
+so timings taken on them do not carry over. make_image layers the things
+that cost codecs and filters real work: smooth gradients, sensor-like
+noise, hard-edged and blurred shapes, and text. The same seed always gives
+the same pixels.
+
+corpus() writes a whole set of images (mixed sizes, aspect ratios, modes
+and EXIF orientations, as configured) and caches it on disk under a key
+derived from the spec, so repeated benchmark runs skip generation:
+
+    paths = corpus.corpus(50, seed=1, size=(2560, 1440))
+    paths = corpus.corpus(200, megapixels=(0.5, 12), modes=(("RGB", 8), ("RGBA", 1), ("L", 1)))
+"""
+from __future__ import annotations
+import hashlib
+import json
+import math
+import os
+import random
+import tempfile
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+from PIL import Image, ImageChops, ImageDraw, ImageFilter, ImageFont
+import image_ops
+
+# Bump when make_image changes, so stale caches are not reused
+VERSION = 1
+
+ASPECTS = ((4, 3), (3, 2), (16, 9), (1, 1), (3, 4), (2, 3), (9, 16))
+_WORDS = ("harbour", "north", "gate", "delta", "report", "sample", "2024", "lot 17",
+          "ISO 400", "f/2.8", "EXIT", "Rue de la Paix", "batch", "proof", "ok")
+
+
+class CorpusSpec(NamedTuple):
+    count: int
+    seed: int = 0
+    size: Optional[Tuple[int, int]] = None          # fixed size; else drawn from megapixels/aspects
+    megapixels: Tuple[float, float] = (0.3, 4.0)    # log-uniform range
+    aspects: Sequence[Tuple[int, int]] = ASPECTS
+    modes: Sequence[Tuple[str, float]] = (("RGB", 1.0),)  # (mode, weight)
+    orientation_rate: float = 0.0                   # share of JPEGs with an EXIF rotation
+    quality: int = 90
+
+    def key(self) -> str:
+        raw = json.dumps([VERSION] + [list(f) if isinstance(f, (tuple, list)) else f for f in self])
+        return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+
+def _gradient(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    """Three independently rotated gradients as R, G, B."""
+    chans = []
+    for _ in range(3):
+        g = Image.linear_gradient("L") if rng.random() < 0.7 else Image.radial_gradient("L")
+        g = g.rotate(rng.uniform(0, 360), resample=Image.Resampling.BICUBIC, fillcolor=rng.randint(0, 255))
+        lo, hi = sorted((rng.randint(0, 255), rng.randint(0, 255)))
+        chans.append(g.point(lambda v, lo=lo, hi=hi: lo + v * (hi - lo) // 255).resize(size, Image.Resampling.BICUBIC))
+    return Image.merge("RGB", chans)
+
+
+def _shapes(rng: random.Random, img: Image.Image, n: int) -> None:
+    w, h = img.size
+    d = ImageDraw.Draw(img)
+    for _ in range(n):
+        x0, y0 = rng.uniform(-0.1, 1.0) * w, rng.uniform(-0.1, 1.0) * h
+        x1, y1 = x0 + rng.uniform(0.02, 0.5) * w, y0 + rng.uniform(0.02, 0.5) * h
+        fill = tuple(rng.randint(0, 255) for _ in range(3))
+        kind = rng.random()
+        if kind < 0.4:
+            d.ellipse([x0, y0, x1, y1], fill=fill)
+        elif kind < 0.7:
+            d.rectangle([x0, y0, x1, y1], fill=fill, outline=(0, 0, 0), width=max(1, w // 400))
+        elif kind < 0.9:
+            pts = [(rng.uniform(x0, x1), rng.uniform(y0, y1)) for _ in range(rng.randint(3, 6))]
+            d.polygon(pts, fill=fill)
+        else:
+            d.line([x0, y0, x1, y1], fill=fill, width=max(1, int(rng.uniform(1, 8) * w / 1000)))
+
+
+def _text(rng: random.Random, img: Image.Image) -> None:
+    w, h = img.size
+    d = ImageDraw.Draw(img)
+    for _ in range(rng.randint(1, 4)):
+        font = ImageFont.load_default(size=max(10, int(h * rng.uniform(0.02, 0.08))))
+        words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(1, 4)))
+        fill = tuple(rng.randint(0, 255) for _ in range(3))
+        d.text((rng.uniform(0, 0.8) * w, rng.uniform(0, 0.9) * h), words, fill=fill, font=font)
+
+
+def make_image(seed: int, size: Tuple[int, int], mode: str = "RGB") -> Image.Image:
+    """Deterministic photo-like image of `size` in `mode` (RGB, RGBA, L or P)."""
+    rng = random.Random(seed)
+    img = _gradient(rng, size)
+    _shapes(rng, img, rng.randint(6, 16))
+    img = img.filter(ImageFilter.GaussianBlur(rng.uniform(0.8, 3.0) * max(size) / 1000))  # depth of field
+    _shapes(rng, img, rng.randint(3, 10))  # sharp foreground edges
+    _text(rng, img)
+    # sensor-like grain; Image.effect_noise cannot be seeded, so draw it from rng
+    noise = Image.frombytes("L", size, rng.randbytes(size[0] * size[1])).filter(ImageFilter.GaussianBlur(0.6))
+    img = ImageChops.add(img, Image.merge("RGB", (noise,) * 3).point(lambda v: v // 8), scale=1.0, offset=-16)
+    if mode == "L":
+        return img.convert("L")
+    if mode == "RGBA":
+        alpha = Image.radial_gradient("L").resize(size).point(lambda v: 255 - v // 2)
+        img.putalpha(alpha)
+        return img
+    if mode == "P":
+        return img.convert("P", palette=Image.Palette.ADAPTIVE, colors=rng.choice((16, 64, 256)))
+    if mode != "RGB":
+        raise ValueError(f"Unsupported corpus mode: {mode}")
+    return img
+
+
+def _pick_size(rng: random.Random, spec: CorpusSpec) -> Tuple[int, int]:
+    if spec.size is not None:
+        return spec.size
+    lo, hi = spec.megapixels
+    mp = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+    aw, ah = rng.choice(list(spec.aspects))
+    h = math.sqrt(mp * 1e6 * ah / aw)
+    return max(8, round(h * aw / ah)), max(8, round(h))
+
+
+def generate(folder: str, spec: CorpusSpec) -> List[str]:
+    """Write the images of `spec` into `folder`; returns their paths."""
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(spec.seed)
+    modes = [m for m, _ in spec.modes]
+    weights = [wt for _, wt in spec.modes]
+    paths = []
+    for i in range(spec.count):
+        size = _pick_size(rng, spec)
+        mode = rng.choices(modes, weights)[0]
+        orient = rng.randint(2, 8) if rng.random() < spec.orientation_rate else None
+        img = make_image(rng.getrandbits(32), size, mode)
+        ext = ".png" if mode in ("RGBA", "P") else ".jpg"
+        path = os.path.join(folder, f"corpus_{i:05d}_{size[0]}x{size[1]}_{mode}{ext}")
+        params = {"quality": spec.quality} if ext == ".jpg" else {}
+        if orient is not None and ext == ".jpg":
+            exif = img.getexif()
+            exif[image_ops.ORIENTATION_TAG] = orient
+            params["exif"] = exif.tobytes()
+        img.save(path, **params)
+        paths.append(path)
+    return paths
+
+
+def default_cache_dir() -> str:
+    return os.environ.get("IPA_CORPUS_CACHE", os.path.join(tempfile.gettempdir(), "ipa_corpus"))
+
+
+def corpus(count: int, cache_dir: Optional[str] = None, **spec) -> List[str]:
+    """
+    Paths of a cached corpus for CorpusSpec(count, **spec); generated on the
+    first call and reused afterwards (keyed by the spec and VERSION).
+    """
+    s = CorpusSpec(count, **spec)
+    folder = os.path.join(cache_dir or default_cache_dir(), s.key())
+    index = os.path.join(folder, "index.json")
+    if os.path.exists(index):
+        with open(index) as f:
+            names = json.load(f)
+        paths = [os.path.join(folder, n) for n in names]
+        if all(os.path.exists(p) for p in paths):
+            return paths
+    paths = generate(folder, s)
+    tmp = index + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump([os.path.basename(p) for p in paths], f)
+    os.replace(tmp, index)  # index last: an interrupted run is regenerated
+    return paths
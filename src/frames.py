@@ -0,0 +1,225 @@
+# src/frames.py
+"""
+Multi-frame inputs: animated GIF/WebP and multipage TIFF.
+
+Frames are decoded one at a time (seek + copy), run through the step list
+and handed to the encoder as they arrive, so only a window of frames is
+alive whatever the length of the animation. With a process pool the
+steps run on up to `window` frames at once, passed through shared memory
+like batch images (see shm_frames.py); results are re-encoded in order.
+
+Per-frame durations and GIF disposal methods are carried over, as is the
+loop count. Pillow's GIF loader already composites frames, so every frame
+is written whole:
+
+- GIF is streamed frame by frame with Pillow's getheader/getdata, each
+  frame with its own palette (Pillow's save_all would keep every frame
+  until the end to compute deltas);
+- WebP and TIFF go through save_all with the frames behind a lazily
+  seeking image (FrameFeed), which the encoders read in order.
+
+    frames.process_file("in.gif", "out.gif", [("resize", {"width": 320})], workers=4)
+"""
+from __future__ import annotations
+import io
+import os
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from PIL import GifImagePlugin, Image
+import batch
+import image_ops
+from lazy_import import lazy_import
+
+shm_frames = lazy_import("shm_frames")  # only the pool path needs shared memory
+
+ANIMATED_EXTS = (".gif", ".webp", ".tif", ".tiff")
+
+Frame = Tuple[Image.Image, Dict[str, Any]]   # (pixels, {"duration", "disposal"})
+
+
+def is_multiframe(img: Image.Image) -> bool:
+    """True when `img` has more than one frame (cheap: no frame is decoded)."""
+    return bool(getattr(img, "is_animated", False))
+
+
+def supports(path: str) -> bool:
+    """Whether frames can be written to `path` (judged by extension)."""
+    return path.lower().endswith(ANIMATED_EXTS)
+
+
+def iter_frames(img: Image.Image) -> Iterator[Frame]:
+    """Decode the frames of `img` in order, one at a time; palette frames come back RGB(A)."""
+    for i in range(getattr(img, "n_frames", 1)):
+        img.seek(i)
+        frame = img.copy()
+        meta = {"duration": img.info.get("duration", 0), "disposal": getattr(img, "disposal_method", 0)}
+        if frame.mode in ("P", "PA"):
+            frame = frame.convert("RGBA" if frame.mode == "PA" or "transparency" in frame.info else "RGB")
+        yield frame, meta
+
+
+def _finish(item) -> Frame:
+    fut, seg, meta = item
+    try:
+        res = fut.result()
+    finally:
+        shm_frames.release(seg)
+    return shm_frames.get_image(res, unlink=True), meta
+
+
+def process_frames(img: Image.Image, steps: List[batch.Step], pool: Optional[Executor] = None,
+                   window: int = 4) -> Iterator[Frame]:
+    """
+    Run `steps` on every frame of `img`, yielding results in frame order.
+    With a process pool up to `window` frames are in flight; without one
+    each frame is processed here as it is decoded.
+    """
+    if pool is None:
+        for frame, meta in iter_frames(img):
+            yield batch.run_steps(frame, steps), meta
+        return
+    pending: deque = deque()   # (future, input segment, metadata), in frame order
+    try:
+        for frame, meta in iter_frames(img):
+            seg, desc = shm_frames.put_image(frame)
+            pending.append((pool.submit(batch._shm_task, desc, steps), seg, meta))
+            while len(pending) >= window:
+                yield _finish(pending.popleft())
+        while pending:
+            yield _finish(pending.popleft())
+    finally:
+        # stopped early or failed: drop queued frames, reclaim segments of running ones
+        for fut, seg, _ in pending:
+            if not fut.cancel() and fut.exception() is None:
+                shm_frames.discard(fut.result())
+            shm_frames.release(seg)
+
+
+class FrameFeed(Image.Image):
+    """
+    Multi-frame image whose frames come from an iterator, for save_all's
+    append_images. Encoders seek 0, 1, 2, ... in order; each seek pulls
+    the next frame and appends its duration/disposal to the lists handed
+    to the encoder, which reads entry k only after seeking to frame k.
+    """
+
+    def __init__(self, frames: Iterator[Frame], n_frames: int,
+                 durations: List[int], disposals: List[int]):
+        super().__init__()
+        self._frames, self.n_frames = frames, n_frames
+        self._durations, self._disposals = durations, disposals
+        self._index = -1
+        self.seek(0)
+
+    @property
+    def is_animated(self) -> bool:
+        return self.n_frames > 1
+
+    def tell(self) -> int:
+        return self._index
+
+    def seek(self, frame: int) -> None:
+        if frame == self._index:
+            return
+        if frame != self._index + 1:
+            raise ValueError(f"Frames are read in order; asked for {frame} after {self._index}")
+        if frame >= self.n_frames:
+            raise EOFError("no more frames")
+        img, meta = next(self._frames)
+        self.im, self._mode, self._size = img.im, img.mode, img.size
+        self.palette, self.info = img.palette, dict(img.info)
+        self._durations.append(meta["duration"])
+        self._disposals.append(meta["disposal"])
+        self._index = frame
+
+
+def _gif_frame(img: Image.Image) -> Tuple[Image.Image, Optional[int]]:
+    """Palette version of a frame and its transparent index (alpha < 128), if any."""
+    if img.mode not in ("RGBA", "LA") and "transparency" not in img.info:
+        return img.convert("RGB").quantize(256), None
+    rgba = img.convert("RGBA")
+    p = rgba.convert("RGB").quantize(255)
+    p.putpalette(p.getpalette()[:765] + [0, 0, 0])    # index 255 is free for transparency
+    p.paste(255, mask=rgba.getchannel("A").point(lambda a: 255 if a < 128 else 0))
+    return p, 255
+
+
+def _save_gif(frames: Iterator[Frame], f: BinaryIO, loop: Optional[int]) -> None:
+    for i, (img, meta) in enumerate(frames):
+        p, transparency = _gif_frame(img)
+        params = {"duration": meta["duration"], "disposal": meta["disposal"], "include_color_table": True}
+        if transparency is not None:
+            params["transparency"] = transparency
+        if i == 0:
+            info = {"loop": loop} if loop is not None else {}
+            if transparency is not None:
+                info["transparency"] = transparency
+            header, _ = GifImagePlugin.getheader(p, info=info)
+            f.writelines(header)
+        f.writelines(GifImagePlugin.getdata(p, **params))
+    f.write(b";")
+
+
+def _save_all_params(frames: Iterator[Frame], n_frames: int, ext: str, loop: Optional[int],
+                     save: Optional[Dict[str, Any]]) -> Tuple[Image.Image, Dict[str, Any]]:
+    """First frame and save_all parameters, the rest of the frames behind a FrameFeed."""
+    first, meta = next(frames)
+    durations, disposals = [meta["duration"]], [meta["disposal"]]
+    params = dict(save or {})
+    if ext.lower().endswith(".webp"):
+        params.update(duration=durations, loop=loop or 0)
+    if n_frames > 1:
+        params.update(save_all=True, append_images=[FrameFeed(frames, n_frames - 1, durations, disposals)])
+    return first, params
+
+
+def save_frames(frames: Iterator[Frame], n_frames: int, path: str, loop: Optional[int] = None,
+                save: Optional[Dict[str, Any]] = None) -> None:
+    """Encode `n_frames` frames from an iterator to `path` (.gif, .webp, .tif/.tiff)."""
+    if not supports(path):
+        raise ValueError(f"Cannot write frames to {os.path.splitext(path)[1] or path}")
+    if path.lower().endswith(".gif"):
+        with open(path, "wb") as f:
+            _save_gif(frames, f, loop)
+        return
+    first, params = _save_all_params(frames, n_frames, path, loop, save)
+    image_ops.save_image(first, path, **params)
+
+
+def encode_frames(frames: Iterator[Frame], n_frames: int, ext: str, loop: Optional[int] = None,
+                  save: Optional[Dict[str, Any]] = None) -> bytes:
+    """save_frames into memory; the format follows `ext` (".gif", ".webp", ".tif", ...)."""
+    if not supports(ext):
+        raise ValueError(f"Cannot write frames to {ext}")
+    if ext.lower().endswith(".gif"):
+        buf = io.BytesIO()
+        _save_gif(frames, buf, loop)
+        return buf.getvalue()
+    first, params = _save_all_params(frames, n_frames, ext, loop, save)
+    return image_ops.encode_image(first, ext, **params)
+
+
+def process_image(img: Image.Image, out_path: str, steps: List[batch.Step], pool: Optional[Executor] = None,
+                  window: int = 4, save: Optional[Dict[str, Any]] = None) -> str:
+    """Run `steps` on every frame of an opened image and write the result to `out_path`."""
+    n = getattr(img, "n_frames", 1)
+    save_frames(process_frames(img, steps, pool, window), n, out_path, img.info.get("loop"), save)
+    return out_path
+
+
+def encode_image(img: Image.Image, ext: str, steps: List[batch.Step],
+                 save: Optional[Dict[str, Any]] = None) -> bytes:
+    """In-memory process_image: every frame of `img` through `steps`, encoded as `ext`."""
+    n = getattr(img, "n_frames", 1)
+    return encode_frames(process_frames(img, steps), n, ext, img.info.get("loop"), save)
+
+
+def process_file(path: str, out_path: str, steps: List[batch.Step], workers: int = 0,
+                 save: Optional[Dict[str, Any]] = None) -> str:
+    """Multi-frame counterpart of batch.process_file; workers > 0 runs frames in a process pool."""
+    img, plan = batch.load_planned(path, steps)
+    if workers <= 0:
+        return process_image(img, out_path, plan, save=save)
+    with batch._process_pool(workers) as pool:
+        return process_image(img, out_path, plan, pool, 2 * workers, save)
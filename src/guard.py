@@ -0,0 +1,205 @@
+# src/guard.py
+"""
+Isolation for untrusted inputs.
+
+check_pixels refuses images whose header announces more pixels than a limit,
+before anything is decoded. SupervisedPool runs tasks in a few long-lived
+worker processes and keeps a deadline per task: a worker that overruns is
+killed and replaced, so a hung decode costs its timeout and the remaining
+tasks carry on. Quarantine moves failed files aside and logs why.
+"""
+from __future__ import annotations
+import json
+import multiprocessing
+import os
+import shutil
+import time
+from multiprocessing.connection import wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from PIL import Image
+import admission
+
+Task = Tuple[Callable[..., Any], Tuple[Any, ...]]  # (picklable fn, args)
+
+
+class PoisonImage(Exception):
+    """An input that must not be processed; `reason` is a short keyword."""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(reason, detail)  # both args, so it pickles across processes
+        self.reason = reason
+        self.detail = detail
+
+    def __str__(self) -> str:
+        return f"{self.reason}: {self.detail}" if self.detail else self.reason
+
+
+def check_pixels(path: str, max_pixels: Optional[int]) -> admission.ImageProbe:
+    """Header-only size check; raises PoisonImage instead of decoding a bomb."""
+    try:
+        probe = admission.probe_image(path)
+    except Exception as e:
+        raise PoisonImage("unreadable", f"{type(e).__name__}: {e}") from e
+    if max_pixels and probe.width * probe.height > max_pixels:
+        raise PoisonImage("too_many_pixels", f"{probe.width}x{probe.height} > {max_pixels}")
+    return probe
+
+
+def classify(exc: BaseException) -> Tuple[str, str]:
+    """(reason, detail) for a failed task."""
+    if isinstance(exc, PoisonImage):
+        return exc.reason, exc.detail
+    detail = f"{type(exc).__name__}: {exc}"
+    if isinstance(exc, Image.DecompressionBombError):
+        return "too_many_pixels", detail
+    if isinstance(exc, MemoryError):
+        return "out_of_memory", detail
+    if isinstance(exc, (Image.UnidentifiedImageError, SyntaxError, EOFError)):
+        return "unreadable", detail
+    return "error", detail
+
+
+# --- Supervised workers ---
+def _serve(conn) -> None:
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        idx, fn, args = msg
+        try:
+            conn.send((idx, True, fn(*args)))
+        except BaseException as e:  # reported to the parent, never fatal here
+            conn.send((idx, False, classify(e)))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_serve, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def kill(self) -> None:
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+
+def worker_context():
+    """forkserver where available: forking a threaded process can deadlock the child."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class SupervisedPool:
+    """Worker processes with a wall-clock limit per task."""
+
+    def __init__(self, workers: int):
+        self._ctx = worker_context()
+        self._workers = [_Worker(self._ctx) for _ in range(max(1, workers))]
+        self.replaced = 0
+
+    def __enter__(self) -> "SupervisedPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _replace(self, w: _Worker) -> _Worker:
+        w.kill()
+        fresh = _Worker(self._ctx)
+        self._workers[self._workers.index(w)] = fresh
+        self.replaced += 1
+        return fresh
+
+    def run(self, tasks: Iterable[Task], timeout: Optional[float] = None) -> Iterator[Tuple[int, bool, Any]]:
+        """
+        Yield (index, ok, value) as tasks finish, in completion order. value
+        is the task's return value, or (reason, detail) when it failed, timed
+        out ("timeout") or took its worker down ("crashed").
+        """
+        todo = enumerate(tasks)
+        idle = list(self._workers)
+        busy: Dict[Any, Tuple[_Worker, int, Optional[float]]] = {}  # conn -> (worker, index, deadline)
+        exhausted = False
+        while True:
+            while idle and not exhausted:
+                nxt = next(todo, None)
+                if nxt is None:
+                    exhausted = True
+                    break
+                i, (fn, args) = nxt
+                w = idle.pop()
+                w.conn.send((i, fn, args))
+                busy[w.conn] = (w, i, time.monotonic() + timeout if timeout else None)
+            if not busy:
+                return
+            deadlines = [d for _, _, d in busy.values() if d is not None]
+            wait_s = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            for conn in wait(list(busy), wait_s):
+                w, i, _ = busy.pop(conn)
+                try:
+                    _, ok, value = conn.recv()
+                except (EOFError, OSError):
+                    code = w.proc.exitcode
+                    idle.append(self._replace(w))
+                    yield i, False, ("crashed", f"worker exited with code {code}")
+                    continue
+                idle.append(w)
+                yield i, ok, value
+            now = time.monotonic()
+            for conn, (w, i, d) in list(busy.items()):
+                if d is not None and now >= d:
+                    del busy[conn]
+                    idle.append(self._replace(w))
+                    yield i, False, ("timeout", f"exceeded {timeout}s")
+
+    def close(self) -> None:
+        for w in self._workers:
+            try:
+                w.conn.send(None)
+            except OSError:
+                pass
+        for w in self._workers:
+            w.proc.join(1.0)
+            if w.proc.is_alive():
+                w.proc.kill()
+                w.proc.join()
+            w.conn.close()
+
+
+# --- Quarantine ---
+class Quarantine:
+    """Folder of rejected inputs plus a JSON-lines reason log."""
+
+    LOG = "quarantine.log"
+
+    def __init__(self, folder: str):
+        self.folder = folder
+
+    def add(self, path: str, reason: str, detail: str = "") -> str:
+        """Move `path` into the quarantine folder and log why; returns the new path."""
+        os.makedirs(self.folder, exist_ok=True)
+        name = os.path.basename(path)
+        dest = os.path.join(self.folder, name)
+        stem, ext = os.path.splitext(name)
+        n = 1
+        while os.path.exists(dest):
+            dest = os.path.join(self.folder, f"{stem}.{n}{ext}")
+            n += 1
+        shutil.move(path, dest)
+        entry = {"file": os.path.basename(dest), "source": path, "reason": reason,
+                 "detail": detail, "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(os.path.join(self.folder, self.LOG), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return dest
+
+    def entries(self) -> List[Dict[str, str]]:
+        log = os.path.join(self.folder, self.LOG)
+        if not os.path.exists(log):
+            return []
+        with open(log, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
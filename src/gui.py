@@ -1,5 +1,6 @@
 # src/gui.py
 from __future__ import annotations
+import functools
 import os, sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
@@ -9,15 +10,32 @@ THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 if THIS_DIR not in sys.path:
     sys.path.append(THIS_DIR)
 
+import gui_monitor
 import image_ops
-import batch as batch_mod
+import preview
+import scheduler  # loads batch lazily, on the first batch run
 
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image
 
 APP_TITLE = "Image Processing App (Tkinter)"
-PREVIEW_BG = "#2b2b2b"
+PREVIEW_BG = preview.BACKGROUND
 PREVIEW_MAX_W, PREVIEW_MAX_H = 900, 600
 DEFAULT_OUT = os.path.abspath(os.path.join(THIS_DIR, "..", "output"))
+STALL_MS = float(os.environ.get("IPA_GUI_STALL_MS", "250"))
+# Longest an edit should wait behind background batch images (see scheduler.py)
+LATENCY_TARGET_MS = float(os.environ.get("IPA_LATENCY_TARGET_MS", "100"))
+
+# Handlers timed per call; file dialogs are left out so think time is not counted
+TIMED_HANDLERS = (
+    "do_resize", "do_filter", "do_rotate", "do_flip_h", "do_flip_v", "reset_original",
+    "apply_to_batch", "apply_crop_from_selection", "_test_pattern", "_show_img_on_canvas",
+    "_redraw", "_poll_tiles", "zoom_fit", "zoom_actual", "_on_wheel",
+)
+# Full-resolution edits on the Tk thread; background batch images give way while they run
+FOREGROUND_HANDLERS = (
+    "do_resize", "do_filter", "do_rotate", "do_flip_h", "do_flip_v", "reset_original",
+    "apply_crop_from_selection",
+)
 
 
 class App:
@@ -25,21 +43,37 @@ class App:
         self.root = root
         self.root.title(APP_TITLE)
 
+        # Responsiveness: per-handler latency, loop lag and stall stack samples
+        self.monitor = gui_monitor.Monitor(root.after, stall_ms=STALL_MS)
+        for name in TIMED_HANDLERS:
+            setattr(self, name, self.monitor.timed(name)(getattr(self, name)))
+        self.monitor.start()
+
+        # Shared workers: preview tiles > interactive edits > background batches
+        self.scheduler = scheduler.Scheduler(latency_target_ms=LATENCY_TARGET_MS)
+        for name in FOREGROUND_HANDLERS:
+            setattr(self, name, self._in_foreground(getattr(self, name)))
+        self.batch_job: scheduler.BatchJob | None = None
+
         # State
         self.current_img: Image.Image | None = None      # full-res working image
         self.original_img: Image.Image | None = None
         self.current_path: str | None = None
         self.batch_paths: list[str] = []
 
-        # Preview state
-        self.tkimg = None                    # strong reference to keep PhotoImage alive
-        self._img_draw_info = None           # dict with scale, x, y, disp_size, img_size
+        # Preview state (tiled: only visible tiles at the current zoom are rendered)
+        self.renderer = preview.PreviewRenderer((PREVIEW_MAX_W, PREVIEW_MAX_H),
+                                                submit=functools.partial(self.scheduler.submit, scheduler.PREVIEW))
+        self.view = None                     # renderer.view once an image is shown
+        self._photos = {}                    # tile key -> PhotoImage; strong refs for on-screen tiles
+        self._poll_job = None
+        self._pan_last = None
 
         # Crop state (canvas selection)
         self.crop_mode = tk.BooleanVar(value=False)
         self._sel_rect_id = None
-        self._sel_start = None   # (x, y) in canvas coords
-        self._sel_end = None     # (x, y) in canvas coords
+        self._sel_start = None   # (x, y) in image coords, so zoom/pan keep the selection
+        self._sel_end = None     # (x, y) in image coords
 
         # --------- Top bar ---------
         top = tk.Frame(root); top.pack(fill="x", padx=10, pady=8)
@@ -49,6 +83,10 @@ class App:
         tk.Button(top, text="Save As…", command=self.save_current).pack(side="left", padx=6)
         tk.Button(top, text="Apply to Batch → Output", command=self.apply_to_batch).pack(side="left", padx=6)
         tk.Button(top, text="Test Pattern", command=self._test_pattern).pack(side="left", padx=6)
+        tk.Button(top, text="Latency…", command=lambda: gui_monitor.show_window(root, self.monitor))\
+            .pack(side="right")
+        tk.Button(top, text="Fit", command=self.zoom_fit).pack(side="right", padx=6)
+        tk.Button(top, text="100%", command=self.zoom_actual).pack(side="right", padx=6)
 
         # --------- Operations ---------
         opts = tk.LabelFrame(root, text="Operations"); opts.pack(fill="x", padx=10, pady=8)
@@ -65,14 +103,15 @@ class App:
         # Filters
         tk.Label(opts, text="Filter:").grid(row=1, column=0, sticky="w", pady=(6, 0))
         self.filter_choice = ttk.Combobox(
-            opts, values=["grayscale", "blur", "sharpen", "sepia"], width=12, state="readonly"
+            opts, values=["grayscale", "blur", "sharpen", "sepia", "LUT (.cube)"], width=12, state="readonly"
         )
+        self.lut_path: str | None = None    # last .cube chosen; the batch reuses it
         self.filter_choice.current(0)
         self.filter_choice.grid(row=1, column=1, sticky="w", pady=(6, 0))
         tk.Label(opts, text="Blur radius").grid(row=1, column=2, sticky="e", pady=(6, 0))
         self.blur_radius = tk.Entry(opts, width=6); self.blur_radius.insert(0, "2")
         self.blur_radius.grid(row=1, column=3, sticky="w", pady=(6, 0))
-        tk.Button(opts, text="Apply Filter", command=self.do_filter).grid(row=1, column=4, padx=6, pady=(6, 0))
+        tk.Button(opts, text="Apply Filter", command=self.pick_filter).grid(row=1, column=4, padx=6, pady=(6, 0))
 
         # Rotate / Flip
         tk.Label(opts, text="Rotate (deg):").grid(row=2, column=0, sticky="w", pady=(6, 0))
@@ -97,71 +136,110 @@ class App:
         self.preview.pack(fill="both", expand=True, padx=10, pady=8)
         self.preview.bind("<Configure>", lambda e: self._refresh_preview())  # rerender on resize
 
-        # Crop event bindings (enabled/disabled by crop mode toggle)
+        # Zoom with the wheel (X11 sends buttons 4/5), pan with the middle/right button
+        self.preview.bind("<MouseWheel>", lambda e: self._on_wheel(e, e.delta > 0))
+        self.preview.bind("<Button-4>", lambda e: self._on_wheel(e, True))
+        self.preview.bind("<Button-5>", lambda e: self._on_wheel(e, False))
+        for b in (2, 3):
+            self.preview.bind(f"<ButtonPress-{b}>", self._on_pan_start)
+            self.preview.bind(f"<B{b}-Motion>", self._on_pan_drag)
+
+        # Left button: crop selection in crop mode, otherwise pan
         self._bind_crop_events(False)
 
-        os.makedirs(DEFAULT_OUT, exist_ok=True)
+    def _in_foreground(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.scheduler.foreground():
+                return fn(*args, **kwargs)
+        return wrapper
 
     # ====================== Core Preview ======================
-    def _flatten_if_needed(self, img: Image.Image) -> Image.Image:
-        """Flatten transparency to white for display (so RGBA screenshots show)."""
-        needs = (img.mode in ("RGBA", "LA")) or ("transparency" in getattr(img, "info", {}))
-        if not needs:
-            return img
-        bg = Image.new("RGB", img.size, "#ffffff")
-        return Image.alpha_composite(bg.convert("RGBA"), img.convert("RGBA")).convert("RGB")
-
     def _show_img_on_canvas(self, img: Image.Image):
-        """Render current image onto the canvas and record mapping info for crop mapping."""
+        """Show a new or edited image, fitted to the canvas, through a fresh tile pyramid."""
         if img is None:
             return
-        disp_src = self._flatten_if_needed(img)
-        if disp_src.mode not in ("RGB", "RGBA"):
-            disp_src = disp_src.convert("RGB")
-
-        # Canvas size and fit
+        self._photos.clear()
         self.root.update_idletasks()
-        cw = max(self.preview.winfo_width(), 1)
-        ch = max(self.preview.winfo_height(), 1)
-        margin = 10
-        max_w = max(cw - 2 * margin, 1)
-        max_h = max(ch - 2 * margin, 1)
-
-        iw, ih = disp_src.size
-        scale = min(max_w / iw, max_h / ih, 1.0)
-        dw, dh = (int(iw * scale), int(ih * scale))
-        disp = disp_src if scale >= 1.0 else disp_src.resize((dw, dh))
-
-        # Position top-left inside canvas (keep a margin)
-        ox = margin + (max_w - dw) // 2  # center within available area
-        oy = margin + (max_h - dh) // 2
-
-        # Draw
-        tkimg = ImageTk.PhotoImage(disp)
-        self.tkimg = tkimg
-        self.preview.delete("all")
-        self.preview.create_rectangle(0, 0, cw, ch, fill=PREVIEW_BG, outline=PREVIEW_BG)
-        self.preview.create_image(ox, oy, image=tkimg, anchor="nw")
-        self.preview.create_rectangle(ox, oy, ox + dw, oy + dh, outline="#888")
-
-        # Record draw info for mapping canvas->image coords
-        self._img_draw_info = {
-            "scale": scale,
-            "canvas_x": ox,
-            "canvas_y": oy,
-            "disp_size": (dw, dh),
-            "img_size": (iw, ih),
-        }
-
-        # Repaint selection (if any) on top
-        if self._sel_start and self._sel_end:
-            self._draw_selection_rect()
-
-        print(f"[Canvas {cw}x{ch}] image orig={iw}x{ih} disp={dw}x{dh} scale={scale:.3f} at ({ox},{oy})")
+        self.renderer.resize_canvas(self._canvas_size())
+        self.renderer.set_image(img)
+        self.view = self.renderer.view
+        self._redraw()
+        iw, ih = img.size
+        cw, ch = self.renderer.canvas_size
+        print(f"[Canvas {cw}x{ch}] image orig={iw}x{ih} "
+              f"scale={self.view.scale:.3f} at ({self.view.offset_x},{self.view.offset_y})")
+
+    def _canvas_size(self):
+        return max(self.preview.winfo_width(), 1), max(self.preview.winfo_height(), 1)
+
+    def _redraw(self):
+        """Place the visible tiles; those already converted now, the rest as they finish."""
+        self.preview.delete("tile", "frame")
+        frame = self.renderer.frame(have=self._photos)
+        keys = {key for key, _, _ in frame.visible}
+        self._photos = {k: p for k, p in self._photos.items() if k in keys}
+        for key, x, y in frame.visible:
+            if key in self._photos:
+                self.preview.create_image(x, y, image=self._photos[key], anchor="nw", tags="tile")
+        for placed in frame.ready:
+            self._place(placed)
+        self.preview.create_rectangle(*frame.border, outline="#888", tags="frame")
+        self._draw_selection_rect()
+        self._schedule_poll()
+
+    def _place(self, placed: preview.Placed):
+        from PIL import ImageTk  # first preview pays for Tk image support, not startup
+        self._photos[placed.key] = ImageTk.PhotoImage(placed.image)
+        self.preview.create_image(placed.x, placed.y, image=self._photos[placed.key], anchor="nw", tags="tile")
+        self.preview.tag_raise("frame")
+        self.preview.tag_raise("sel")
+
+    def _schedule_poll(self):
+        if self._poll_job is None and self.renderer.busy:
+            self._poll_job = self.root.after(15, self._poll_tiles)
+
+    def _poll_tiles(self):
+        self._poll_job = None
+        for placed in self.renderer.poll():
+            self._place(placed)
+        self._schedule_poll()
 
     def _refresh_preview(self):
-        if self.current_img:
-            self._show_img_on_canvas(self.current_img)
+        if self.view is None:
+            return
+        self.renderer.resize_canvas(self._canvas_size())
+        self._redraw()
+
+    # ====================== Zoom / Pan ======================
+    def zoom_fit(self):
+        if self.view is None:
+            return
+        self.renderer.fit()
+        self._redraw()
+
+    def zoom_actual(self):
+        """100%: one image pixel per screen pixel, centred on the canvas centre."""
+        if self.view is None:
+            return
+        self.renderer.actual()
+        self._redraw()
+
+    def _on_wheel(self, event, zoom_in: bool):
+        if self.view is None:
+            return
+        self.renderer.zoom_at(1.25 if zoom_in else 0.8, event.x, event.y)
+        self._redraw()
+
+    def _on_pan_start(self, event):
+        self._pan_last = (event.x, event.y)
+
+    def _on_pan_drag(self, event):
+        if self.view is None or self._pan_last is None:
+            return
+        self.renderer.pan(event.x - self._pan_last[0], event.y - self._pan_last[1])
+        self._pan_last = (event.x, event.y)
+        self._redraw()
 
     # ====================== Upload / Save / Reset ======================
     def upload_single(self):
@@ -225,6 +303,18 @@ class App:
         self._clear_selection()
         self._show_img_on_canvas(self.current_img)
 
+    def pick_filter(self):
+        """Untimed: the LUT file dialog runs here, then the timed do_filter applies it."""
+        if not self.current_img:
+            return
+        if self.filter_choice.get() == "LUT (.cube)":
+            path = filedialog.askopenfilename(title="Choose a 3D LUT",
+                                              filetypes=[("Cube LUT", "*.cube")])
+            if not path:
+                return
+            self.lut_path = path
+        self.do_filter()
+
     def do_filter(self):
         if not self.current_img:
             return
@@ -242,6 +332,8 @@ class App:
                 self.current_img = image_ops.filter_sharpen(self.current_img)
             elif choice == "sepia":
                 self.current_img = image_ops.filter_sepia(self.current_img)
+            elif choice == "LUT (.cube)" and self.lut_path:
+                self.current_img = image_ops.apply_lut(self.current_img, self.lut_path)
             self._clear_selection()
             self._show_img_on_canvas(self.current_img)
         except Exception as e:
@@ -300,6 +392,8 @@ class App:
             steps.append(("sharpen", {}))
         elif f == "sepia":
             steps.append(("sepia", {}))
+        elif f == "LUT (.cube)" and self.lut_path:
+            steps.append(("lut", {"path": self.lut_path}))
         # Rotate (optional)
         try:
             deg = float(self.rotate_entry.get())
@@ -308,8 +402,23 @@ class App:
         except Exception:
             pass
 
+        if self.batch_job is not None and not self.batch_job.done:
+            messagebox.showinfo("Batch running", "Wait for the current batch to finish.")
+            return
+        # Runs in the background at batch priority; edits and previews go first
+        self.batch_job = self.scheduler.submit_batch(self.batch_paths, DEFAULT_OUT, steps)
+        self._poll_batch()
+
+    def _poll_batch(self):
+        job = self.batch_job
+        done, total = job.progress()
+        self.root.title(f"{APP_TITLE} — batch {done}/{total}")
+        if not job.done:
+            self.root.after(200, self._poll_batch)
+            return
+        self.root.title(APP_TITLE)
         try:
-            outputs = batch_mod.apply_pipeline(self.batch_paths, DEFAULT_OUT, steps)
+            outputs = job.outputs()
             messagebox.showinfo("Batch complete", f"Saved {len(outputs)} files to:\n{DEFAULT_OUT}")
         except Exception as e:
             print("Batch error:", e)
@@ -327,27 +436,27 @@ class App:
             self.preview.bind("<B1-Motion>", self._on_mouse_drag)
             self.preview.bind("<ButtonRelease-1>", self._on_mouse_up)
         else:
-            self.preview.unbind("<Button-1>")
-            self.preview.unbind("<B1-Motion>")
+            self.preview.bind("<Button-1>", self._on_pan_start)
+            self.preview.bind("<B1-Motion>", self._on_pan_drag)
             self.preview.unbind("<ButtonRelease-1>")
 
     def _on_mouse_down(self, event):
-        if not self.current_img or not self._img_draw_info:
+        if not self.current_img or self.view is None:
             return
-        self._sel_start = (event.x, event.y)
-        self._sel_end = (event.x, event.y)
+        self._sel_start = self.view.to_image(event.x, event.y)
+        self._sel_end = self._sel_start
         self._draw_selection_rect()
 
     def _on_mouse_drag(self, event):
         if self._sel_start is None:
             return
-        self._sel_end = (event.x, event.y)
+        self._sel_end = self.view.to_image(event.x, event.y)
         self._draw_selection_rect()
 
     def _on_mouse_up(self, event):
         if self._sel_start is None:
             return
-        self._sel_end = (event.x, event.y)
+        self._sel_end = self.view.to_image(event.x, event.y)
         self._draw_selection_rect()
 
     def _draw_selection_rect(self):
@@ -363,11 +472,11 @@ class App:
         if not (self._sel_start and self._sel_end):
             return
 
-        x0, y0 = self._sel_start
-        x1, y1 = self._sel_end
+        x0, y0 = self.view.to_canvas(*self._sel_start)
+        x1, y1 = self.view.to_canvas(*self._sel_end)
         # draw overlay rect
         self._sel_rect_id = self.preview.create_rectangle(
-            x0, y0, x1, y1, outline="#ff6", width=2
+            x0, y0, x1, y1, outline="#ff6", width=2, tags="sel"
         )
 
     def _clear_selection(self):
@@ -381,37 +490,16 @@ class App:
             self._sel_rect_id = None
 
     def apply_crop_from_selection(self):
-        """Map selection rectangle from canvas coords to image coords and crop safely."""
-        if not self.current_img or not self._img_draw_info:
+        """Crop to the selection rectangle (held in image coords) after clamping it."""
+        if not self.current_img or self.view is None:
             messagebox.showinfo("No Image", "Upload an image first.")
             return
         if not (self._sel_start and self._sel_end):
             messagebox.showinfo("No Selection", "Enable Crop Mode and drag to select an area.")
             return
 
-        x0, y0 = self._sel_start
-        x1, y1 = self._sel_end
-        # Normalize canvas rect
-        cx0, cx1 = sorted((x0, x1))
-        cy0, cy1 = sorted((y0, y1))
-
-        # Map canvas -> image
-        info = self._img_draw_info
-        s = info["scale"]
-        ox, oy = info["canvas_x"], info["canvas_y"]
-        iw, ih = info["img_size"]
-
-        # convert by subtracting image origin and dividing by scale
-        l = int((cx0 - ox) / s)
-        t = int((cy0 - oy) / s)
-        r = int((cx1 - ox) / s)
-        b = int((cy1 - oy) / s)
-
-        # Clamp and validate
-        l = max(0, min(l, iw))
-        r = max(0, min(r, iw))
-        t = max(0, min(t, ih))
-        b = max(0, min(b, ih))
+        # Selection is kept in image coords, so the zoom it was drawn at does not matter
+        l, t, r, b = self.view.image_box(self._sel_start, self._sel_end)
 
         if r <= l or b <= t:
             messagebox.showerror("Crop error", "Selection area is empty or outside the image.")
@@ -427,6 +515,7 @@ class App:
 
     # ====================== Test Pattern ======================
     def _test_pattern(self):
+        from PIL import ImageDraw  # pulls in the font machinery; only used here
         img = Image.new("RGB", (1000, 600), "#202830")
         d = ImageDraw.Draw(img)
         # outer frame
@@ -444,10 +533,12 @@ class App:
 
 
 def main():
-    os.makedirs(DEFAULT_OUT, exist_ok=True)
     root = tk.Tk()
-    App(root)
+    app = App(root)
     root.mainloop()
+    app.scheduler.shutdown()
+    app.monitor.stop()
+    print(app.monitor.format_report())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+# src/gui_monitor.py
+"""
+Responsiveness instrumentation for the Tk GUI.
+
+- Handler latency: Monitor.timed(name) wraps a command; each call's
+  duration goes into that command's LatencyHistogram.
+- Loop lag: a heartbeat scheduled with root.after() every `beat_ms` records
+  how late it fired. Lateness means the main loop was busy with something
+  else.
+- Stalls: a watchdog thread notices when the heartbeat has not run for
+  `stall_ms` and samples the main thread's stack while it is still stuck.
+  The sample is taken during the stall, not after it, so it shows the
+  code that is blocking the loop.
+
+The core has no Tk dependency and works with any schedule(ms, fn) callable.
+show_window() opens the live view.
+"""
+from __future__ import annotations
+import bisect
+import functools
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+# Bucket upper bounds in ms; 16.7 ms is one frame at 60 Hz
+BUCKETS_MS = (1, 2, 4, 8, 16.7, 33, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.n += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, p: float) -> float:
+        """Upper bound of the bucket holding the p-th percentile (max for the open bucket)."""
+        if not self.n:
+            return 0.0
+        rank = p / 100 * self.n
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.n,
+            "mean_ms": round(self.total_ms / self.n, 2) if self.n else 0.0,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "max_ms": round(self.max_ms, 2),
+        }
+
+
+class Stall:
+    """One main-loop stall: when it began, how long it lasted, what was running."""
+
+    def __init__(self, started: float, command: Optional[str], stack: List[str]):
+        self.started = started
+        self.command = command
+        self.stack = stack
+        self.duration_ms: Optional[float] = None   # set once the loop recovers
+
+    def format(self) -> str:
+        took = f"{self.duration_ms:.0f} ms" if self.duration_ms is not None else "ongoing"
+        return f"stall ({took}) in {self.command or '<idle>'}\n" + "".join(self.stack)
+
+
+class Monitor:
+    """
+    Latency and stall recorder for one GUI. Create it on the Tk thread and
+    pass root.after as `schedule`.
+    """
+
+    def __init__(
+        self,
+        schedule: Optional[Callable[[int, Callable[[], None]], Any]] = None,
+        beat_ms: int = 50,
+        stall_ms: float = 250.0,
+        keep_stalls: int = 20,
+        log: Optional[Callable[[str], None]] = print,
+    ):
+        self.schedule = schedule
+        self.beat_ms = beat_ms
+        self.stall_ms = stall_ms
+        self.log = log
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.stalls: Deque[Stall] = deque(maxlen=keep_stalls)
+        self._main = threading.get_ident()
+        self._command: Optional[str] = None  # innermost running handler; one assignment, read by the watchdog
+        self._last_beat = time.perf_counter()
+        self._stall: Optional[Stall] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    # --- handler latency ---
+    def record(self, name: str, ms: float) -> None:
+        self.histograms.setdefault(name, LatencyHistogram()).record(ms)
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        def deco(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                outer, self._command = self._command, name
+                t0 = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.record(name, (time.perf_counter() - t0) * 1000)
+                    self._command = outer
+            return wrapper
+        return deco
+
+    # --- heartbeat and watchdog ---
+    def start(self) -> "Monitor":
+        self._main = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._watchdog = threading.Thread(target=self._watch, name="gui-watchdog", daemon=True)
+        self._watchdog.start()
+        if self.schedule is not None:
+            self.schedule(self.beat_ms, self._tick)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    def _tick(self) -> None:
+        self.beat()
+        if not self._stop.is_set():
+            self.schedule(self.beat_ms, self._tick)
+
+    def beat(self) -> None:
+        """Called on the main thread every beat_ms; records how late it ran."""
+        now = time.perf_counter()
+        self.record("loop_lag", max(0.0, (now - self._last_beat) * 1000 - self.beat_ms))
+        stall = self._stall
+        if stall is not None:
+            stall.duration_ms = (now - stall.started) * 1000
+            self._stall = None
+            if self.log is not None:
+                self.log(f"[gui] {stall.format()}")
+        self._last_beat = now
+
+    def _watch(self) -> None:
+        interval = self.stall_ms / 4000
+        while not self._stop.wait(interval):
+            last = self._last_beat
+            if self._stall is None and (time.perf_counter() - last) * 1000 >= self.stall_ms:
+                frame = sys._current_frames().get(self._main)
+                stack = traceback.format_stack(frame) if frame is not None else []
+                self._stall = Stall(last, self._command, stack)
+                self.stalls.append(self._stall)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "latency": {name: h.as_dict() for name, h in sorted(self.histograms.items())},
+            "stalls": [{"command": s.command, "duration_ms": s.duration_ms} for s in self.stalls],
+        }
+
+    def format_report(self) -> str:
+        lines = [f"{'command':<28}{'count':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}  (ms)"]
+        for name, h in sorted(self.histograms.items()):
+            d = h.as_dict()
+            lines.append(f"{name:<28}{d['count']:>7}{d['mean_ms']:>9.1f}{d['p50_ms']:>9.1f}"
+                         f"{d['p95_ms']:>9.1f}{d['max_ms']:>9.1f}")
+        lag = self.histograms.get("loop_lag")
+        if lag is not None:
+            lines.append("")
+            lines.append("loop lag histogram:")
+            top = max(lag.counts) or 1
+            for bound, count in zip(BUCKETS_MS, lag.counts):
+                if count:
+                    label = f"<= {bound:g}" if bound != float("inf") else f"> {BUCKETS_MS[-2]:g}"
+                    lines.append(f"  {label:>9} ms {count:>7} {'#' * max(1, round(40 * count / top))}")
+        if self.stalls:
+            lines.append("")
+            lines.append(f"last stall of {len(self.stalls)}:")
+            lines.append(self.stalls[-1].format())
+        return "\n".join(lines)
+
+
+def show_window(root, monitor: Monitor, refresh_ms: int = 1000) -> None:
+    """Toplevel window with the live report, refreshed every `refresh_ms`."""
+    import tkinter as tk
+    win = tk.Toplevel(root)
+    win.title("GUI latency")
+    text = tk.Text(win, width=80, height=30, font="TkFixedFont")
+    text.pack(fill="both", expand=True)
+
+    def refresh():
+        if not win.winfo_exists():
+            return
+        text.delete("1.0", "end")
+        text.insert("1.0", monitor.format_report())
+        win.after(refresh_ms, refresh)
+
+    refresh()
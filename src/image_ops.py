@@ -1,14 +1,200 @@
 # src/image_ops.py
 from __future__ import annotations
-from typing import Optional, Tuple
+import functools
+import io
+import mmap
+import os
+import struct
+from typing import BinaryIO, Dict, NamedTuple, Optional, Sequence, Tuple, Union
 from PIL import Image, ImageFilter, ImageOps
 
+Transpose = Image.Transpose
+
 # --- I/O ---
-def load_image(path: str) -> Image.Image:
-    return Image.open(path)
+def load_image(path: Union[str, BinaryIO], orient: bool = True) -> Image.Image:
+    """
+    Open an image from a path or a binary file object. With `orient`, EXIF
+    orientation is applied losslessly so the pixels come back upright; pass
+    orient=False to defer that (see orientation_transpose) and fold it into
+    a later step.
+    """
+    if isinstance(path, str) and path.lower().endswith(RAW_EXT):
+        return load_raw(path)
+    img = Image.open(path)
+    return auto_orient(img) if orient else img
+
+def load_reduced(path: Union[str, BinaryIO], max_side: int, orient: bool = True) -> Image.Image:
+    """
+    Small decode for analysis passes: fits within max_side x max_side.
+    JPEGs are scaled down inside the decoder (draft, 1/2..1/8), so a large
+    photo never exists at full size; other formats are decoded then reduced.
+    """
+    if isinstance(path, str) and path.lower().endswith(RAW_EXT):
+        img = load_raw(path)
+    else:
+        img = Image.open(path)
+        method = orientation_transpose(img) if orient else None
+        img.draft(None, (max_side, max_side))  # JPEG: largest DCT scale still >= max_side
+        img.thumbnail((max_side, max_side))
+        return img if method is None else img.transpose(method)
+    img.thumbnail((max_side, max_side), reducing_gap=2.0)
+    return img
+
+def save_image(img: Image.Image, path: str, metadata: str = "keep", **params) -> None:
+    """
+    Save `img`; extra keyword arguments (quality, optimize, ...) go to Pillow.
+
+    metadata: "keep" writes EXIF and the ICC profile, "icc" only the ICC
+      profile (drops camera/GPS data), "strip" neither. Raw frames carry none.
+    """
+    if path.lower().endswith(RAW_EXT):
+        save_raw(img, path)
+        return
+    img, params = _save_params(img, metadata, params)
+    img.save(path, **params)
+
+def encode_image(img: Image.Image, ext: str, metadata: str = "keep", **params) -> bytes:
+    """save_image into memory; the format follows `ext` (".jpg", ".png", ...)."""
+    fmt = Image.registered_extensions().get(ext.lower())
+    if fmt is None:
+        raise ValueError(f"No encoder for extension: {ext}")
+    img, params = _save_params(img, metadata, params)
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **params)
+    return buf.getvalue()
+
+def _save_params(img: Image.Image, metadata: str, params: Dict) -> Tuple[Image.Image, Dict]:
+    if metadata not in ("keep", "icc", "strip"):
+        raise ValueError(f"Unknown metadata policy: {metadata}")
+    if img.mode == "RGBX":  # codecs expect RGB
+        img = img.convert("RGB")
+    # an explicit None stops encoders (PNG, TIFF) from falling back to img.info
+    params.setdefault("icc_profile", img.info.get("icc_profile") if metadata != "strip" else None)
+    if metadata == "keep" and img.info.get("exif"):
+        params.setdefault("exif", img.info["exif"])
+    return img, params
+
+# --- EXIF orientation ---
+ORIENTATION_TAG = 0x0112
+# EXIF orientation -> transpose that makes the pixels upright
+_ORIENT_TRANSPOSE = {
+    2: Transpose.FLIP_LEFT_RIGHT,
+    3: Transpose.ROTATE_180,
+    4: Transpose.FLIP_TOP_BOTTOM,
+    5: Transpose.TRANSPOSE,
+    6: Transpose.ROTATE_270,
+    7: Transpose.TRANSVERSE,
+    8: Transpose.ROTATE_90,
+}
+# Transposes as (mirror, quarter turns): mirror left-right first, then rotate CCW
+_D4 = {
+    None: (0, 0),
+    Transpose.FLIP_LEFT_RIGHT: (1, 0),
+    Transpose.ROTATE_90: (0, 1),
+    Transpose.ROTATE_180: (0, 2),
+    Transpose.ROTATE_270: (0, 3),
+    Transpose.FLIP_TOP_BOTTOM: (1, 2),
+    Transpose.TRANSPOSE: (1, 1),
+    Transpose.TRANSVERSE: (1, 3),
+}
+_D4_INV = {v: k for k, v in _D4.items()}
+_QUARTER_TURNS = (None, Transpose.ROTATE_90, Transpose.ROTATE_180, Transpose.ROTATE_270)
 
-def save_image(img: Image.Image, path: str) -> None:
-    img.save(path)
+def orientation_transpose(img: Image.Image) -> Optional[Transpose]:
+    """Transpose that brings `img` upright according to its EXIF tag, or None."""
+    try:
+        value = img.getexif().get(ORIENTATION_TAG, 1)
+    except Exception:  # unreadable EXIF: treat as upright
+        return None
+    return _ORIENT_TRANSPOSE.get(value)
+
+def clear_orientation(img: Image.Image) -> None:
+    """Drop the EXIF orientation tag once the pixels have been made upright."""
+    exif = img.getexif()
+    if ORIENTATION_TAG in exif:
+        del exif[ORIENTATION_TAG]
+        img.info["exif"] = exif.tobytes()
+
+def auto_orient(img: Image.Image) -> Image.Image:
+    method = orientation_transpose(img)
+    if method is None:
+        return img
+    out = img.transpose(method)
+    clear_orientation(out)
+    return out
+
+def compose_transpose(first: Optional[Transpose], then: Optional[Transpose]) -> Optional[Transpose]:
+    """Single transpose equal to applying `first` and then `then` (None = identity)."""
+    m1, r1 = _D4[first]
+    m2, r2 = _D4[then]
+    # a left-right mirror reverses the direction of any earlier rotation
+    return _D4_INV[(m1 ^ m2, (r2 + (-r1 if m2 else r1)) % 4)]
+
+def transpose_swaps_axes(method: Optional[Transpose]) -> bool:
+    return _D4[method][1] % 2 == 1
+
+def rotation_transpose(degrees: float) -> Tuple[bool, Optional[Transpose]]:
+    """(True, transpose) when `degrees` is a multiple of 90, else (False, None)."""
+    if float(degrees) % 90:
+        return False, None
+    return True, _QUARTER_TURNS[int(float(degrees) // 90) % 4]
+
+# --- Raw frames (uncompressed intermediates) ---
+# Layout: fixed header padded to RAW_HEADER_SIZE, then rows of packed pixels.
+RAW_EXT = ".ipraw"
+RAW_HEADER_SIZE = 64  # keeps the pixel buffer aligned
+_RAW_MAGIC = b"IPRF"
+_RAW_VERSION = 1
+_RAW_HEADER = struct.Struct("<4sHH8sII")  # magic, version, header size, mode, width, height
+# Modes Pillow can map onto a buffer without copying (Image._MAPMODES minus P)
+_RAW_MAPPED = ("L", "RGBX", "RGBA", "CMYK", "I;16", "I;16L", "I;16B")
+# Modes stored in a layout that maps: RGB is padded to 4 bytes per pixel,
+# palette images are expanded since the format carries no palette
+_RAW_STORE = {"RGB": "RGBX", "P": "RGBA", "PA": "RGBA", "1": "L"}
+
+def save_raw(img: Image.Image, path: str) -> None:
+    """Write `img` as a raw frame that load_raw can memory-map."""
+    mode = _RAW_STORE.get(img.mode, img.mode)
+    if mode != img.mode:
+        img = img.convert(mode)
+    header = _RAW_HEADER.pack(_RAW_MAGIC, _RAW_VERSION, RAW_HEADER_SIZE,
+                              mode.encode("ascii"), img.size[0], img.size[1])
+    with open(path, "wb") as f:
+        f.write(header.ljust(RAW_HEADER_SIZE, b"\0"))
+        f.write(img.tobytes())
+
+def read_raw_header(path: str) -> Tuple[str, Tuple[int, int], int]:
+    """Return (mode, size, pixel data offset) of a raw frame."""
+    with open(path, "rb") as f:
+        head = f.read(_RAW_HEADER.size)
+    if len(head) < _RAW_HEADER.size:
+        raise ValueError(f"Truncated raw frame: {path}")
+    magic, version, offset, mode, w, h = _RAW_HEADER.unpack(head)
+    if magic != _RAW_MAGIC or version != _RAW_VERSION:
+        raise ValueError(f"Not a raw frame (v{_RAW_VERSION}): {path}")
+    return mode.rstrip(b"\0").decode("ascii"), (w, h), offset
+
+def load_raw(path: str) -> Image.Image:
+    """
+    Memory-map a raw frame. Mapped modes come back as read-only images
+    sharing the page cache, with no decode and no copy; other modes are
+    copied out of the mapping. RGB frames (stored as RGBX) come back RGB,
+    unpacked in one pass, so ops and encoders never see the padding.
+    """
+    mode, size, offset = read_raw_header(path)
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # memoryview slicing keeps it zero-copy; the image holds the mapping alive
+    buf = memoryview(mm)[offset:]
+    if mode == "RGBX":
+        img = Image.frombytes("RGB", size, buf, "raw", "RGBX")
+    elif mode in _RAW_MAPPED:
+        return Image.frombuffer(mode, size, buf, "raw", mode, 0, 1)
+    else:
+        img = Image.frombytes(mode, size, buf)
+    buf.release()
+    mm.close()
+    return img
 
 # --- Resize (aspect aware) ---
 def resize_aspect(
@@ -29,6 +215,18 @@ def resize_aspect(
         return img.resize((w, int(height)))
     return img.copy()
 
+def resize_target(size: Tuple[int, int], width: Optional[int] = None,
+                  height: Optional[int] = None) -> Tuple[int, int]:
+    """Output size resize_aspect would produce for an image of `size`."""
+    w0, h0 = size
+    if width and height:
+        return int(width), int(height)
+    if width:
+        return int(width), int((width / w0) * h0)
+    if height:
+        return int((height / h0) * w0), int(height)
+    return w0, h0
+
 # --- Filters ---
 def filter_grayscale(img: Image.Image) -> Image.Image:
     return ImageOps.grayscale(img)
@@ -40,22 +238,218 @@ def filter_sharpen(img: Image.Image) -> Image.Image:
     return img.filter(ImageFilter.SHARPEN)
 
 def filter_sepia(img: Image.Image) -> Image.Image:
-    rgb = img.convert("RGB")
-    px = rgb.load()
-    w, h = rgb.size
-    for y in range(h):
-        for x in range(w):
-            r, g, b = px[x, y]
-            tr = int(0.393*r + 0.769*g + 0.189*b)
-            tg = int(0.349*r + 0.686*g + 0.168*b)
-            tb = int(0.272*r + 0.534*g + 0.131*b)
-            px[x, y] = (min(tr, 255), min(tg, 255), min(tb, 255))
-    return rgb
+    return color_matrix(img.convert("RGB"), SEPIA_MATRIX)
+
+# --- Colour: matrices and 3D LUTs ---
+# 3x4 matrices for Image.convert: one row (r, g, b, offset) per output channel
+SEPIA_MATRIX = (0.393, 0.769, 0.189, 0, 0.349, 0.686, 0.168, 0, 0.272, 0.534, 0.131, 0)
+GRAYSCALE_MATRIX = (0.299, 0.587, 0.114, 0) * 3  # ITU-R 601-2 luma, kept as RGB
+COLOR_PRESETS = {"sepia": SEPIA_MATRIX, "grayscale": GRAYSCALE_MATRIX}
+
+class CubeLUT(NamedTuple):
+    title: str
+    size: int
+    table: Tuple[float, ...]  # size**3 RGB triples, red varying fastest
+    domain_min: Tuple[float, float, float]
+    domain_max: Tuple[float, float, float]
+
+def _with_alpha(img: Image.Image, out: Image.Image) -> Image.Image:
+    if "A" in img.getbands():
+        out.putalpha(img.getchannel("A"))
+    return out
+
+def _rgb_input(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    return img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+def color_matrix(img: Image.Image, matrix: Optional[Tuple[float, ...]] = None,
+                 preset: Optional[str] = None) -> Image.Image:
+    """3x4 colour matrix (or a COLOR_PRESETS name) applied in C; alpha is kept."""
+    if preset is not None:
+        if preset not in COLOR_PRESETS:
+            raise ValueError(f"Unknown colour preset: {preset}")
+        matrix = COLOR_PRESETS[preset]
+    if matrix is None or len(matrix) != 12:
+        raise ValueError("color_matrix needs a 12-value matrix or a preset")
+    src = _rgb_input(img)
+    out = (src if src.mode == "RGB" else src.convert("RGB")).convert("RGB", tuple(matrix))
+    return _with_alpha(src, out)
+
+def parse_cube(text: str) -> CubeLUT:
+    """Parse an Adobe/Resolve .cube 3D LUT."""
+    title, size, rows = "", None, []
+    dmin, dmax = (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+    for n, line in enumerate(text.splitlines(), 1):
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        key, _, rest = line.partition(" ")
+        if key == "TITLE":
+            title = rest.strip().strip('"')
+        elif key == "LUT_3D_SIZE":
+            size = int(rest)
+        elif key == "LUT_1D_SIZE":
+            raise ValueError("1D .cube LUTs are not supported")
+        elif key == "DOMAIN_MIN":
+            dmin = tuple(float(v) for v in rest.split())
+        elif key == "DOMAIN_MAX":
+            dmax = tuple(float(v) for v in rest.split())
+        elif key[0].isdigit() or key[0] in "-.":
+            vals = line.split()
+            if len(vals) != 3:
+                raise ValueError(f"Bad LUT row on line {n}: {line!r}")
+            rows.extend(float(v) for v in vals)
+        # other keywords (e.g. LUT_IN_VIDEO_RANGE) do not change the table
+    if size is None:
+        raise ValueError("Missing LUT_3D_SIZE")
+    if len(rows) != 3 * size ** 3:
+        raise ValueError(f"Expected {size ** 3} LUT rows, found {len(rows) // 3}")
+    return CubeLUT(title, size, tuple(rows), dmin, dmax)
+
+@functools.lru_cache(maxsize=16)
+def _cube_filter(path: str, mtime_ns: int, file_size: int):
+    with open(path, encoding="utf-8") as f:
+        cube = parse_cube(f.read())
+    lut = ImageFilter.Color3DLUT(cube.size, cube.table)
+    prescale = None
+    if cube.domain_min != (0.0, 0.0, 0.0) or cube.domain_max != (1.0, 1.0, 1.0):
+        # map the LUT's input domain onto 0..255 before the table lookup
+        prescale = []
+        for lo, hi in zip(cube.domain_min, cube.domain_max):
+            prescale += [min(255, max(0, round((v / 255 - lo) / (hi - lo) * 255))) for v in range(256)]
+    return lut, prescale
+
+def load_cube(path: str) -> Tuple[ImageFilter.Color3DLUT, Optional[list]]:
+    """Parsed table for a .cube file, cached until the file changes."""
+    st = os.stat(path)
+    return _cube_filter(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+def matrix_lut(matrix: Tuple[float, ...], size: int = 17) -> ImageFilter.Color3DLUT:
+    """A colour matrix as a 3D LUT, e.g. to bake a preset into a .cube."""
+    m = matrix
+
+    def fn(r, g, b):
+        return tuple(min(1.0, max(0.0, m[i] * r + m[i + 1] * g + m[i + 2] * b + m[i + 3] / 255))
+                     for i in (0, 4, 8))
+    return ImageFilter.Color3DLUT.generate(size, fn)
+
+def write_cube(path: str, lut: ImageFilter.Color3DLUT, title: str = "") -> None:
+    size = lut.size[0]
+    with open(path, "w", encoding="utf-8") as f:
+        if title:
+            f.write(f'TITLE "{title}"\n')
+        f.write(f"LUT_3D_SIZE {size}\n")
+        t = lut.table
+        for i in range(0, len(t), 3):
+            f.write(f"{t[i]:.6f} {t[i + 1]:.6f} {t[i + 2]:.6f}\n")
+
+def apply_lut(img: Image.Image, path: Optional[str] = None,
+              lut: Optional[ImageFilter.Color3DLUT] = None) -> Image.Image:
+    """Grade with a .cube file (parsed once, then cached) or a ready Color3DLUT; alpha is kept."""
+    prescale = None
+    if lut is None:
+        if path is None:
+            raise ValueError("apply_lut needs a .cube path or a Color3DLUT")
+        lut, prescale = load_cube(path)
+    src = _rgb_input(img)
+    if prescale is not None:
+        rgb = src.convert("RGB").point(prescale)
+        src = _with_alpha(src, rgb)
+    return src.filter(lut)  # trilinear, in C
+
+def apply_levels(img: Image.Image, table: Sequence[int]) -> Image.Image:
+    """
+    Point remap through a 256-entry table (all colour channels) or a
+    768-entry R, G, B table; alpha is kept.
+    """
+    if len(table) not in (256, 768):
+        raise ValueError("levels table needs 256 or 768 entries")
+    src = img if img.mode in ("L", "RGB", "RGBA") else _rgb_input(img)
+    if len(table) == 768 and src.mode == "L":
+        src = src.convert("RGB")
+    lut = list(table)
+    if src.mode != "L" and len(lut) == 256:
+        lut *= 3
+    if src.mode == "RGBA":
+        lut += list(range(256))
+    return src.point(lut)
+
+# --- Overlay / watermark ---
+# Named anchors as (x, y) fractions of the free space around the overlay
+ANCHORS = {
+    "top-left": (0.0, 0.0), "top": (0.5, 0.0), "top-right": (1.0, 0.0),
+    "left": (0.0, 0.5), "center": (0.5, 0.5), "right": (1.0, 0.5),
+    "bottom-left": (0.0, 1.0), "bottom": (0.5, 1.0), "bottom-right": (1.0, 1.0),
+}
+
+@functools.lru_cache(maxsize=4)
+def _overlay_source(path: str, mtime_ns: int, file_size: int) -> Image.Image:
+    with Image.open(path) as im:
+        return im.convert("RGBA")
+
+@functools.lru_cache(maxsize=32)
+def _scaled_overlay(path: str, mtime_ns: int, file_size: int, size: Tuple[int, int],
+                    opacity: float) -> Tuple[Image.Image, Image.Image]:
+    """
+    (RGB, mask) of the overlay at `size` with `opacity` folded into the mask.
+    Built once per output size: Pillow resizes RGBA premultiplied (via RGBa),
+    so edges do not pick up dark fringes, and pasting through the mask is
+    then a single C call per image.
+    """
+    src = _overlay_source(path, mtime_ns, file_size)
+    scaled = src if src.size == size else src.resize(size, Image.Resampling.LANCZOS)
+    mask = scaled.getchannel("A")
+    if opacity < 1.0:
+        mask = mask.point(lambda v: round(v * opacity))
+    return scaled.convert("RGB"), mask
+
+def overlay_geometry(img_size: Tuple[int, int], overlay_size: Tuple[int, int], scale: float,
+                     position: Union[str, Tuple[float, float]], margin: float) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+    """(size, top-left) of the overlay on an image of `img_size`."""
+    w, h = img_size
+    ow, oh = overlay_size
+    tw = max(1, round(w * scale))
+    th = max(1, round(oh * tw / ow))
+    fx, fy = ANCHORS[position] if isinstance(position, str) else position
+    m = round(margin * min(w, h))
+    x = m + round((w - tw - 2 * m) * fx)
+    y = m + round((h - th - 2 * m) * fy)
+    return (tw, th), (x, y)
+
+def overlay(img: Image.Image, path: str, position: Union[str, Tuple[float, float]] = "bottom-right",
+            opacity: float = 1.0, scale: float = 0.2, margin: float = 0.02) -> Image.Image:
+    """
+    Composite the image at `path` (e.g. a logo PNG with alpha) onto `img`.
+    scale: overlay width as a fraction of the image width.
+    position: a name from ANCHORS or (x, y) fractions of the free space.
+    margin: inset from the edges, as a fraction of the shorter image side.
+    The scaled overlay is cached per output size (see _scaled_overlay).
+    """
+    if isinstance(position, str) and position not in ANCHORS:
+        raise ValueError(f"Unknown overlay position: {position}")
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    size, (x, y) = overlay_geometry(img.size, _overlay_source(*key).size, scale, position, margin)
+    rgb, mask = _scaled_overlay(*key, size, max(0.0, min(1.0, float(opacity))))
+    out = img if img.mode == "L" else _rgb_input(img)
+    out = out.copy() if out is img else out
+    if out.mode == "RGBA":  # "over" for transparent targets, not a blend of the alpha channel
+        out.alpha_composite(Image.merge("RGBA", (*rgb.split(), mask)), dest=(x, y))
+    else:
+        out.paste(rgb, (x, y), mask)
+    return out
 
 # --- Transforms ---
 def rotate(img: Image.Image, degrees: float) -> Image.Image:
+    exact, method = rotation_transpose(degrees)
+    if exact:  # lossless and no resampling
+        return transpose(img, method)
     return img.rotate(degrees, expand=True)
 
+def transpose(img: Image.Image, method: Optional[Transpose]) -> Image.Image:
+    return img.copy() if method is None else img.transpose(method)
+
 def flip_horizontal(img: Image.Image) -> Image.Image:
     return ImageOps.mirror(img)
 
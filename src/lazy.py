@@ -0,0 +1,252 @@
+# src/lazy.py
+"""
+Lazy image expressions with region-of-interest propagation.
+
+Ops build a small graph instead of computing pixels. compute(box) walks the
+graph backwards, turning the requested box into the box each input has to
+supply (grown by the op's kernel halo, clamped to the input), so a
+blur -> sharpen -> crop chain only filters the pixels the crop keeps.
+
+    out = lazy.load("scan.png").blur(2).sharpen().crop((100, 100, 400, 300))
+    img = out.compute()
+"""
+from __future__ import annotations
+import math
+from typing import Callable, Dict, Iterable, Optional, Tuple, Any
+from PIL import Image
+import image_ops
+
+Box = Tuple[int, int, int, int]
+
+
+def _clamp(box: Box, size: Tuple[int, int]) -> Box:
+    w, h = size
+    l, t, r, b = box
+    return max(0, l), max(0, t), min(w, r), min(h, b)
+
+
+def _grow(box: Box, halo: int, size: Tuple[int, int]) -> Box:
+    l, t, r, b = box
+    return _clamp((l - halo, t - halo, r + halo, b + halo), size)
+
+
+class Node:
+    """One value in the expression graph. Subclasses implement _region."""
+
+    size: Tuple[int, int]
+
+    def compute(self, box: Optional[Box] = None) -> Image.Image:
+        """Pixels of `box` (default: the whole output)."""
+        box = (0, 0) + self.size if box is None else _clamp(box, self.size)
+        if box[2] <= box[0] or box[3] <= box[1]:
+            raise ValueError(f"Empty region: {box}")
+        return self._region(box)
+
+    def _region(self, box: Box) -> Image.Image:
+        raise NotImplementedError
+
+    # --- op builders (names follow batch steps) ---
+    def resize(self, width: Optional[int] = None, height: Optional[int] = None) -> "Node":
+        return _Resize(self, width, height)
+
+    def grayscale(self) -> "Node":
+        return _Point(self, image_ops.filter_grayscale)
+
+    def sepia(self) -> "Node":
+        return _Point(self, image_ops.filter_sepia)
+
+    def levels(self, table) -> "Node":
+        return _Point(self, lambda img: image_ops.apply_levels(img, table))
+
+    def lut(self, path: str) -> "Node":
+        return _Point(self, lambda img: image_ops.apply_lut(img, path))
+
+    def color_matrix(self, matrix: Optional[Tuple[float, ...]] = None, preset: Optional[str] = None) -> "Node":
+        return _Point(self, lambda img: image_ops.color_matrix(img, matrix, preset))
+
+    def blur(self, radius: float = 2.0) -> "Node":
+        # Pillow's Gaussian is three box passes reaching about radius*3 pixels
+        return _Kernel(self, lambda img: image_ops.filter_blur(img, radius), math.ceil(radius * 3) + 3)
+
+    def sharpen(self) -> "Node":
+        return _Kernel(self, image_ops.filter_sharpen, 2)
+
+    def crop(self, box: Box) -> "Node":
+        return _Crop(self, box)
+
+    def transpose(self, method: Optional[image_ops.Transpose]) -> "Node":
+        return self if method is None else _Transpose(self, method)
+
+    def flip_h(self) -> "Node":
+        return _Transpose(self, image_ops.Transpose.FLIP_LEFT_RIGHT)
+
+    def flip_v(self) -> "Node":
+        return _Transpose(self, image_ops.Transpose.FLIP_TOP_BOTTOM)
+
+    def rotate(self, degrees: float) -> "Node":
+        exact, method = image_ops.rotation_transpose(degrees)
+        if exact:
+            return self.transpose(method)
+        return _Whole(self, lambda img: image_ops.rotate(img, degrees))
+
+
+class _Source(Node):
+    """Leaf node; decodes at most once and only on the first request."""
+
+    def __init__(self, img: Image.Image):
+        self._img = img
+        self.size = img.size
+        self.pixels_read = 0  # for tests and profiling
+
+    def _region(self, box: Box) -> Image.Image:
+        self.pixels_read += (box[2] - box[0]) * (box[3] - box[1])
+        # mapped raw frames only fault in the rows the crop touches
+        return self._img.crop(box)
+
+
+class _Point(Node):
+    def __init__(self, src: Node, fn: Callable[[Image.Image], Image.Image]):
+        self.src, self.fn, self.size = src, fn, src.size
+
+    def _region(self, box: Box) -> Image.Image:
+        return self.fn(self.src.compute(box))
+
+
+class _Kernel(Node):
+    """Neighbourhood filter: needs `halo` extra pixels around the request."""
+
+    def __init__(self, src: Node, fn: Callable[[Image.Image], Image.Image], halo: int):
+        self.src, self.fn, self.halo, self.size = src, fn, halo, src.size
+
+    def _region(self, box: Box) -> Image.Image:
+        outer = _grow(box, self.halo, self.size)
+        out = self.fn(self.src.compute(outer))
+        l, t = box[0] - outer[0], box[1] - outer[1]
+        return out.crop((l, t, l + box[2] - box[0], t + box[3] - box[1]))
+
+
+class _Crop(Node):
+    """Same result as image_ops.crop_box: parts of the box outside the input are zero-filled."""
+
+    def __init__(self, src: Node, box: Box):
+        l, t, r, b = (int(v) for v in box)
+        if r <= l or b <= t:
+            raise ValueError(f"Invalid crop area: ({l},{t},{r},{b})")
+        self.src, self.origin, self.size = src, (l, t), (r - l, b - t)
+
+    def _region(self, box: Box) -> Image.Image:
+        ox, oy = self.origin
+        want = (box[0] + ox, box[1] + oy, box[2] + ox, box[3] + oy)
+        inner = _clamp(want, self.src.size)
+        if inner == want:
+            return self.src.compute(want)
+        if inner[2] <= inner[0] or inner[3] <= inner[1]:
+            inner = (0, 0, 1, 1)  # nothing of the input is inside; only its mode matters
+        part = self.src.compute(inner)
+        return part.crop((want[0] - inner[0], want[1] - inner[1], want[2] - inner[0], want[3] - inner[1]))
+
+
+# Output edge coordinate -> input edge coordinate, for an input of size (w, h)
+_T = image_ops.Transpose
+_INVERSE: Dict[Any, Callable[[float, float, int, int], Tuple[float, float]]] = {
+    _T.FLIP_LEFT_RIGHT: lambda x, y, w, h: (w - x, y),
+    _T.FLIP_TOP_BOTTOM: lambda x, y, w, h: (x, h - y),
+    _T.ROTATE_90: lambda x, y, w, h: (w - y, x),
+    _T.ROTATE_180: lambda x, y, w, h: (w - x, h - y),
+    _T.ROTATE_270: lambda x, y, w, h: (y, h - x),
+    _T.TRANSPOSE: lambda x, y, w, h: (y, x),
+    _T.TRANSVERSE: lambda x, y, w, h: (w - y, h - x),
+}
+
+
+class _Transpose(Node):
+    def __init__(self, src: Node, method: image_ops.Transpose):
+        self.src, self.method = src, method
+        w, h = src.size
+        self.size = (h, w) if image_ops.transpose_swaps_axes(method) else (w, h)
+
+    def _region(self, box: Box) -> Image.Image:
+        w, h = self.src.size
+        inv = _INVERSE[self.method]
+        x0, y0 = inv(box[0], box[1], w, h)
+        x1, y1 = inv(box[2], box[3], w, h)
+        inner = (int(min(x0, x1)), int(min(y0, y1)), int(max(x0, x1)), int(max(y0, y1)))
+        return self.src.compute(inner).transpose(self.method)
+
+
+class _Resize(Node):
+    """
+    Resamples only the source area behind the request (Image.resize box=).
+    Float rounding in Pillow's coefficients can move a pixel by one level
+    compared with resizing the whole image.
+    """
+
+    def __init__(self, src: Node, width: Optional[int], height: Optional[int]):
+        self.src = src
+        self.size = image_ops.resize_target(src.size, width, height)
+
+    def _region(self, box: Box) -> Image.Image:
+        w0, h0 = self.src.size
+        sx, sy = w0 / self.size[0], h0 / self.size[1]
+        # source area in float coords, plus the filter's support around it
+        fx0, fy0, fx1, fy1 = box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy
+        halo = math.ceil(2 * max(sx, sy, 1.0)) + 1
+        outer = _grow((int(fx0), int(fy0), math.ceil(fx1), math.ceil(fy1)), halo, self.src.size)
+        region = self.src.compute(outer)
+        return region.resize(
+            (box[2] - box[0], box[3] - box[1]),
+            box=(fx0 - outer[0], fy0 - outer[1], fx1 - outer[0], fy1 - outer[1]),
+        )
+
+
+class _Whole(Node):
+    """Op without a region mapping: computes its whole input once, then crops."""
+
+    def __init__(self, src: Node, fn: Callable[[Image.Image], Image.Image]):
+        self.src, self.fn = src, fn
+        self._out: Optional[Image.Image] = None
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._full().size
+
+    def _full(self) -> Image.Image:
+        if self._out is None:
+            self._out = self.fn(self.src.compute())
+        return self._out
+
+    def _region(self, box: Box) -> Image.Image:
+        return self._full().crop(box)
+
+
+def wrap(img: Image.Image) -> Node:
+    return _Source(img)
+
+
+def load(path: str) -> Node:
+    """Lazy source for `path`; only the header is read until compute()."""
+    return _Source(image_ops.load_image(path))
+
+
+STEP_OPS = ("resize", "grayscale", "sepia", "levels", "lut", "color_matrix", "blur", "sharpen", "crop",
+            "transpose", "flip_h", "flip_v", "rotate")
+
+
+def from_steps(
+    src: Node,
+    steps: Iterable[Tuple[str, Dict[str, Any]]],
+    fallback: Optional[Dict[str, Callable[..., Image.Image]]] = None,
+) -> Node:
+    """
+    Build a graph from a batch step list. Steps without a region mapping
+    are looked up in `fallback` (e.g. batch.OPS) and run on their whole input.
+    """
+    node = src
+    for op, kwargs in steps:
+        if op in STEP_OPS:
+            node = getattr(node, op)(**kwargs)
+        elif fallback and op in fallback:
+            node = _Whole(node, lambda img, fn=fallback[op], kw=kwargs: fn(img, **kw))
+        else:
+            raise ValueError(f"Unknown step: {op}")
+    return node
@@ -0,0 +1,54 @@
+# src/lazy_import.py
+"""
+Deferred imports for slow-to-load modules.
+
+    array_backend = lazy_import("array_backend")  # nothing loaded yet
+    array_backend.available()                     # imported here, once
+
+Entry points that only sometimes need numpy, process pools or Tk image
+support use this so short runs do not pay for them at startup.
+
+The first load holds a lock: stage, scheduler and frame threads often
+touch a module together, and importlib's LazyLoader (Python 3.11) lets
+the others see the module empty while one thread is still running it.
+"""
+from __future__ import annotations
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+_lock = threading.RLock()
+_loading = set()  # names whose code is running right now
+
+
+class _Deferred(ModuleType):
+    """Module whose code has not run yet; the first missing attribute runs it."""
+
+    def __getattr__(self, attr: str):
+        name = self.__name__
+        with _lock:
+            if type(self) is _Deferred:
+                if name in _loading:  # asked for by its own code, or a circular import
+                    raise AttributeError(f"partially initialized module {name!r} has no attribute {attr!r}")
+                _loading.add(name)
+                try:
+                    self.__spec__.loader.exec_module(self)
+                finally:
+                    _loading.discard(name)
+                self.__class__ = ModuleType
+        return getattr(self, attr)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Module object whose code runs on first attribute access."""
+    with _lock:
+        if name in sys.modules:
+            return sys.modules[name]
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise ImportError(f"No module named {name!r}", name=name)
+        module = importlib.util.module_from_spec(spec)
+        module.__class__ = _Deferred
+        sys.modules[name] = module
+        return module
@@ -0,0 +1,115 @@
+# src/normalize.py
+"""
+Two-pass auto-contrast for a whole shoot.
+
+Pass 1 decodes every input small (image_ops.load_reduced; JPEGs are scaled
+inside the decoder), takes a 256-bin histogram per image in parallel and
+merges them, each image weighted equally. levels_table() turns the merged
+histogram into one lookup table, clipping `cutoff` percent at each end.
+Pass 2 is the normal apply_pipeline with that table as a leading "levels"
+step (a point op in C), so every image of the shoot gets the same remap
+and no image is held or fully decoded twice.
+
+    outs = normalize.apply_pipeline_normalized(paths, "out", [("resize", {"width": 1600})])
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+import batch
+import image_ops
+
+BINS = 256
+
+
+def histogram(path: str, sample_side: int = 256, per_channel: bool = False) -> List[float]:
+    """
+    Normalised histogram of one image from a reduced decode: 256 luma bins,
+    or 768 (R, G, B) with per_channel. Sums to 1 per channel.
+    """
+    img = image_ops.load_reduced(path, sample_side, orient=False)
+    img = img.convert("RGB" if per_channel else "L")
+    counts = img.histogram()
+    n = img.width * img.height
+    return [c / n for c in counts]
+
+
+def _histogram_task(args) -> List[float]:
+    return histogram(*args)
+
+
+def merge(histograms: Iterable[Sequence[float]]) -> List[float]:
+    total: Optional[List[float]] = None
+    for h in histograms:
+        total = list(h) if total is None else [a + b for a, b in zip(total, h)]
+    if total is None:
+        raise ValueError("No histograms to merge")
+    return total
+
+
+def collect(paths: List[str], sample_side: int = 256, per_channel: bool = False,
+            workers: int = 0) -> List[float]:
+    """Pass 1: merged histogram of all inputs (workers > 0 uses a process pool)."""
+    tasks = [(p, sample_side, per_channel) for p in paths]
+    if workers <= 0 or len(paths) < 2:
+        return merge(map(_histogram_task, tasks))
+    with batch._process_pool(workers) as pool:
+        return merge(pool.map(_histogram_task, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+
+def _bounds(hist: Sequence[float], cutoff: float) -> tuple:
+    total = sum(hist)
+    cut = total * cutoff / 100
+    lo, acc = 0, 0.0
+    while lo < BINS - 1 and acc + hist[lo] <= cut:
+        acc += hist[lo]
+        lo += 1
+    hi, acc = BINS - 1, 0.0
+    while hi > 0 and acc + hist[hi] <= cut:
+        acc += hist[hi]
+        hi -= 1
+    return lo, hi
+
+
+def levels_table(hist: Sequence[float], cutoff: float = 0.5) -> List[int]:
+    """
+    Lookup table stretching [low, high] of `hist` to 0..255, where low and
+    high leave `cutoff` percent of pixels outside at each end. A 768-bin
+    histogram gives one stretch per channel (768 entries); 256 bins give one
+    table for all channels.
+    """
+    table: List[int] = []
+    for c in range(len(hist) // BINS):
+        lo, hi = _bounds(hist[c * BINS:(c + 1) * BINS], cutoff)
+        if hi <= lo:  # flat: leave the channel alone
+            table += list(range(BINS))
+            continue
+        scale = 255 / (hi - lo)
+        table += [min(255, max(0, round((v - lo) * scale))) for v in range(BINS)]
+    return table
+
+
+def apply_pipeline_normalized(
+    input_paths: Iterable[str],
+    output_folder: str,
+    steps: List[batch.Step],
+    cutoff: float = 0.5,
+    per_channel: bool = False,
+    sample_side: int = 256,
+    workers: Union[int, str] = 0,
+    summary: Optional[Dict[str, Any]] = None,
+    **kwargs,
+) -> List[str]:
+    """
+    Both passes: shoot-wide histogram, then apply_pipeline with
+    ("levels", {"table": ...}) ahead of `steps`. Other keyword arguments go
+    to apply_pipeline; summary also receives the table. workers="auto"
+    tunes pass 2; pass 1 uses one worker per CPU.
+    """
+    paths = list(input_paths)
+    hist_workers = workers if isinstance(workers, int) else (os.cpu_count() or 1)
+    hist = collect(paths, sample_side, per_channel, hist_workers)
+    table = levels_table(hist, cutoff)
+    if summary is not None:
+        summary["levels"] = table
+    pass2 = [("levels", {"table": table})] + list(steps)
+    return batch.apply_pipeline(paths, output_folder, pass2, workers=workers, summary=summary, **kwargs)
@@ -0,0 +1,174 @@
+# src/scheduler.py
+"""
+One set of worker threads shared by preview rendering, interactive edits
+and background batches, served in that order of priority.
+
+    PREVIEW      tiles the user is looking at
+    INTERACTIVE  full-resolution edits the user is waiting for
+    BATCH        background jobs, one task per image
+
+A worker always takes the highest-priority task that is ready. Batch work
+gives way at image boundaries: while any interactive work is queued or
+running (including edits on the GUI thread, declared with foreground()),
+no new batch image starts, and images already running finish. A running
+image is not interrupted, so an edit can still wait for up to one image
+time when every worker is busy with batch. To keep that wait under
+`latency_target_ms`, the scheduler tracks how long batch images take and,
+once they run longer than the target, keeps one worker free of batch work.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from gui_monitor import LatencyHistogram
+from lazy_import import lazy_import
+
+batch = lazy_import("batch")  # only batch jobs need it; keeps the GUI's startup light
+
+PREVIEW, INTERACTIVE, BATCH = 0, 1, 2
+CLASS_NAMES = ("preview", "interactive", "batch")
+
+
+class _Task:
+    __slots__ = ("priority", "fn", "args", "kwargs", "future", "queued")
+
+    def __init__(self, priority: int, fn: Callable, args: Tuple, kwargs: Dict[str, Any]):
+        self.priority, self.fn, self.args, self.kwargs = priority, fn, args, kwargs
+        self.future: Future = Future()
+        self.queued = time.perf_counter()
+
+
+class Scheduler:
+    """Priority-class thread pool; see the module docstring for the rules."""
+
+    def __init__(self, workers: int = 0, latency_target_ms: float = 100.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.latency_target_ms = latency_target_ms
+        self._queues: List[Deque[_Task]] = [deque() for _ in CLASS_NAMES]
+        self._running = [0] * len(CLASS_NAMES)
+        self._held = 0                         # foreground() blocks open on other threads
+        self._batch_ms: Optional[float] = None  # moving average of batch image time
+        self._cond = threading.Condition()
+        self._closed = False
+        self.waits = [LatencyHistogram() for _ in CLASS_NAMES]   # queue wait per class, ms
+        self._threads = [threading.Thread(target=self._work, name=f"sched-{i}", daemon=True)
+                         for i in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    # --- submitting ---
+    def submit(self, priority: int, fn: Callable, *args, **kwargs) -> Future:
+        task = _Task(priority, fn, args, kwargs)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is shut down")
+            self._queues[priority].append(task)
+            self._cond.notify_all()
+        return task.future
+
+    @contextmanager
+    def foreground(self) -> Iterator[None]:
+        """Mark interactive work done outside the pool (e.g. on the GUI thread)."""
+        with self._cond:
+            self._held += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._held -= 1
+                self._cond.notify_all()
+
+    def submit_batch(self, paths: List[str], output_folder: str, steps: List[batch.Step],
+                     ext: Optional[str] = None, save: Optional[Dict[str, Any]] = None) -> "BatchJob":
+        """Queue a batch at BATCH priority, one task per image."""
+        batch.ensure_dir(output_folder)
+        return BatchJob([self.submit(BATCH, batch.process_file, p, output_folder, steps, ext, save)
+                         for p in paths])
+
+    # --- dispatch ---
+    def batch_limit(self) -> int:
+        """How many batch images may run right now."""
+        if self._held or self._running[INTERACTIVE] or self._queues[PREVIEW] or self._queues[INTERACTIVE]:
+            return 0
+        slow = self._batch_ms is not None and self._batch_ms > self.latency_target_ms
+        return self.workers - 1 if slow and self.workers > 1 else self.workers
+
+    def _next(self) -> Optional[_Task]:
+        for prio in (PREVIEW, INTERACTIVE):
+            if self._queues[prio]:
+                return self._queues[prio].popleft()
+        if self._queues[BATCH] and self._running[BATCH] < self.batch_limit():
+            return self._queues[BATCH].popleft()
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                task = self._next()
+                while task is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    task = self._next()
+                self._running[task.priority] += 1
+                t0 = time.perf_counter()
+                self.waits[task.priority].record((t0 - task.queued) * 1000)
+            if task.future.set_running_or_notify_cancel():
+                try:
+                    task.future.set_result(task.fn(*task.args, **task.kwargs))
+                except BaseException as e:
+                    task.future.set_exception(e)
+            with self._cond:
+                self._running[task.priority] -= 1
+                if task.priority == BATCH and not task.future.cancelled():
+                    ms = (time.perf_counter() - t0) * 1000
+                    self._batch_ms = ms if self._batch_ms is None else 0.8 * self._batch_ms + 0.2 * ms
+                self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "latency_target_ms": self.latency_target_ms,
+                "batch_image_ms": round(self._batch_ms, 1) if self._batch_ms is not None else None,
+                "queued": {n: len(q) for n, q in zip(CLASS_NAMES, self._queues)},
+                "running": dict(zip(CLASS_NAMES, self._running)),
+                "wait": {n: h.as_dict() for n, h in zip(CLASS_NAMES, self.waits)},
+            }
+
+    def shutdown(self, cancel_pending: bool = True) -> None:
+        with self._cond:
+            self._closed = True
+            if cancel_pending:
+                for q in self._queues:
+                    while q:
+                        q.popleft().future.cancel()
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+
+class BatchJob:
+    """Handle for a submitted batch: progress, results and cancellation."""
+
+    def __init__(self, futures: List[Future]):
+        self.futures = futures
+
+    @property
+    def done(self) -> bool:
+        return all(f.done() for f in self.futures)
+
+    def progress(self) -> Tuple[int, int]:
+        return sum(f.done() for f in self.futures), len(self.futures)
+
+    def cancel(self) -> int:
+        """Drop images that have not started; returns how many were dropped."""
+        return sum(f.cancel() for f in self.futures)
+
+    def outputs(self) -> List[str]:
+        """Output paths in input order (waits; raises the first image error)."""
+        return [f.result() for f in self.futures if not f.cancelled()]
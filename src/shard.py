@@ -0,0 +1,223 @@
+# src/shard.py
+"""
+Coordinator-free sharded batches for several hosts sharing one filesystem.
+
+Every node runs run_node() against the same job folder. The first node to
+arrive publishes the manifest (inputs split into fixed work units); the
+others read it. Nodes then claim units through lease files:
+
+    job/manifest.json
+    job/leases/u000007/g3    # generation 3 of unit 7's lease, held by one node
+    job/done/u000007         # unit 7 committed
+
+A claim creates the next generation with O_CREAT|O_EXCL, so when two nodes
+race for the same unit exactly one wins. The holder touches its lease
+every lease_s/3 seconds. A lease whose mtime has not moved for lease_s (as
+seen by the observing node's own clock, so host clock skew does not
+matter) belongs to a dead node and may be taken over by claiming the next
+generation.
+
+Results are written to a private folder and moved into place only while
+the node still holds the newest generation. The done marker is also
+created with O_EXCL, so each unit is committed once. A node that lost its
+lease drops its work. Only a node that stalls for longer than lease_s
+can have its unit redone elsewhere; outputs are deterministic, so the
+files in place are the same whichever node commits last.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+import batch
+
+MANIFEST = "manifest.json"
+
+
+class Lease(NamedTuple):
+    unit: int
+    gen: int
+    path: str
+
+
+def _unit_name(unit: int) -> str:
+    return f"u{unit:06d}"
+
+
+def _create_exclusive(path: str, payload: Dict[str, Any]) -> bool:
+    """Atomically create `path`; False if it already exists."""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump(payload, f)
+    return True
+
+
+def publish_manifest(job_dir: str, input_paths: List[str], unit_size: int) -> List[List[str]]:
+    """Split inputs into units; the first node's split wins and is returned."""
+    os.makedirs(job_dir, exist_ok=True)
+    path = os.path.join(job_dir, MANIFEST)
+    if not os.path.exists(path):
+        paths = sorted(input_paths)
+        units = [paths[i:i + unit_size] for i in range(0, len(paths), unit_size)]
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"unit_size": unit_size, "units": units}, f)
+        try:
+            os.link(tmp, path)  # atomic create-if-absent, also over NFS
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp)
+    with open(path) as f:
+        return json.load(f)["units"]
+
+
+class ShardNode:
+    """One participant; claim(), renew() and commit() are safe across hosts."""
+
+    def __init__(self, job_dir: str, node_id: Optional[str] = None, lease_s: float = 30.0):
+        self.job_dir = job_dir
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_s = lease_s
+        self._leases = os.path.join(job_dir, "leases")
+        self._done = os.path.join(job_dir, "done")
+        os.makedirs(self._leases, exist_ok=True)
+        os.makedirs(self._done, exist_ok=True)
+        # lease path -> (mtime seen, local time it was first seen)
+        self._seen: Dict[str, tuple] = {}
+
+    def is_done(self, unit: int) -> bool:
+        return os.path.exists(os.path.join(self._done, _unit_name(unit)))
+
+    def _generations(self, unit: int) -> List[int]:
+        try:
+            names = os.listdir(os.path.join(self._leases, _unit_name(unit)))
+        except FileNotFoundError:
+            return []
+        return sorted(int(n[1:]) for n in names if n.startswith("g") and n[1:].isdigit())
+
+    def _lease_path(self, unit: int, gen: int) -> str:
+        return os.path.join(self._leases, _unit_name(unit), f"g{gen}")
+
+    def _expired(self, path: str) -> bool:
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return True
+        now = time.monotonic()
+        seen = self._seen.get(path)
+        if seen is None or seen[0] != mtime:
+            self._seen[path] = (mtime, now)
+            return False
+        return now - seen[1] >= self.lease_s
+
+    def claim(self, unit: int) -> Optional[Lease]:
+        """Take `unit` if it is free or its holder's lease expired."""
+        if self.is_done(unit):
+            return None
+        gens = self._generations(unit)
+        if gens and not self._expired(self._lease_path(unit, gens[-1])):
+            return None
+        gen = (gens[-1] if gens else 0) + 1
+        os.makedirs(os.path.join(self._leases, _unit_name(unit)), exist_ok=True)
+        path = self._lease_path(unit, gen)
+        if not _create_exclusive(path, {"node": self.node_id, "claimed": time.time()}):
+            return None
+        return Lease(unit, gen, path)
+
+    def holds(self, lease: Lease) -> bool:
+        gens = self._generations(lease.unit)
+        return bool(gens) and gens[-1] == lease.gen
+
+    def renew(self, lease: Lease) -> None:
+        os.utime(lease.path)
+
+    def commit(self, lease: Lease) -> bool:
+        """Mark the unit done if this node still holds it; False if it lost the lease."""
+        if not self.holds(lease):
+            return False
+        return _create_exclusive(os.path.join(self._done, _unit_name(lease.unit)),
+                                 {"node": self.node_id, "gen": lease.gen, "done": time.time()})
+
+
+class _Heartbeat:
+    """Touches a lease in the background while its unit is processed."""
+
+    def __init__(self, node: ShardNode, lease: Lease):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(node, lease), daemon=True)
+
+    def _run(self, node: ShardNode, lease: Lease) -> None:
+        while not self._stop.wait(node.lease_s / 3):
+            try:
+                node.renew(lease)
+            except FileNotFoundError:
+                return
+
+    def __enter__(self) -> "_Heartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def run_node(
+    job_dir: str,
+    input_paths: List[str],
+    output_folder: str,
+    steps: List[batch.Step],
+    node_id: Optional[str] = None,
+    unit_size: int = 16,
+    lease_s: float = 30.0,
+    poll_s: float = 1.0,
+    ext: Optional[str] = None,
+    workers: int = 0,
+    save: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Work on the shared job until every unit is done. Start one per host
+    (or several per host) with the same arguments; no coordinator is needed.
+    Returns {"node", "units", "images", "lost"} for this node.
+    """
+    units = publish_manifest(job_dir, list(input_paths), unit_size)
+    node = ShardNode(job_dir, node_id, lease_s)
+    batch.ensure_dir(output_folder)
+    stats: Dict[str, Any] = {"node": node.node_id, "units": [], "images": 0, "lost": 0}
+    # nodes start at different units so they rarely race for the same lease
+    offset = sum(node.node_id.encode()) % max(1, len(units))
+    order = list(range(offset, len(units))) + list(range(offset))
+    while True:
+        remaining = [u for u in order if not node.is_done(u)]
+        if not remaining:
+            return stats
+        lease = next((lease for lease in map(node.claim, remaining) if lease is not None), None)
+        if lease is None:  # everything left is held by live nodes
+            time.sleep(poll_s)
+            continue
+        staging = os.path.join(output_folder, f".shard-{node.node_id}-{_unit_name(lease.unit)}-g{lease.gen}")
+        try:
+            with _Heartbeat(node, lease):
+                outs = batch.apply_pipeline(units[lease.unit], staging, steps, ext=ext,
+                                            workers=workers, save=save)
+                if node.holds(lease):
+                    for p in outs:
+                        os.replace(p, os.path.join(output_folder, os.path.basename(p)))
+                    committed = node.commit(lease)
+                else:
+                    committed = False
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        if committed:
+            stats["units"].append(lease.unit)
+            stats["images"] += len(units[lease.unit])
+        else:
+            stats["lost"] += 1
@@ -0,0 +1,73 @@
+# src/shm_frames.py
+"""
+Hand decoded frames to worker processes through shared memory.
+
+Only a FrameDesc (segment name, mode, size, offset, plus the palette and
+transparency of palette images) crosses the process boundary; the pixels are written once into a segment and read once out of
+it. Whoever creates a segment owns it: the parent unlinks input segments
+when their task finishes and output segments after reading them back.
+"""
+from __future__ import annotations
+from multiprocessing import shared_memory
+from typing import Any, NamedTuple, Optional, Tuple
+from PIL import Image
+
+
+class FrameDesc(NamedTuple):
+    name: str                 # shared memory segment name
+    mode: str
+    size: Tuple[int, int]
+    offset: int               # byte offset of the pixels inside the segment
+    nbytes: int
+    palette: Optional[Tuple[str, bytes]] = None   # (raw mode, entries) of P/PA images
+    transparency: Any = None                      # info["transparency"], if any
+
+
+def put_image(img: Image.Image) -> Tuple[shared_memory.SharedMemory, FrameDesc]:
+    """Copy `img` into a new segment. The caller owns (and must unlink) it."""
+    data = img.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    shm.buf[:len(data)] = data
+    palette = None
+    if img.mode in ("P", "PA") and img.palette is not None:
+        rawmode = img.palette.mode
+        palette = (rawmode, bytes(img.getpalette(rawmode)))
+    return shm, FrameDesc(shm.name, img.mode, img.size, 0, len(data), palette, img.info.get("transparency"))
+
+
+def get_image(desc: FrameDesc, unlink: bool = False) -> Image.Image:
+    """Rebuild the image described by `desc`, optionally unlinking its segment."""
+    shm = shared_memory.SharedMemory(name=desc.name)
+    try:
+        view = shm.buf[desc.offset:desc.offset + desc.nbytes]
+        try:
+            img = Image.frombytes(desc.mode, desc.size, view)
+        finally:
+            view.release()
+    finally:
+        shm.close()
+        if unlink:
+            shm.unlink()
+    if desc.palette is not None:
+        img.putpalette(desc.palette[1], desc.palette[0])
+    if desc.transparency is not None:
+        img.info["transparency"] = desc.transparency
+    return img
+
+
+def release(shm: shared_memory.SharedMemory) -> None:
+    """Close and unlink a segment we created, tolerating a prior unlink."""
+    shm.close()
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def discard(desc: FrameDesc) -> None:
+    """Unlink a segment published by another process without reading it."""
+    try:
+        shm = shared_memory.SharedMemory(name=desc.name)
+    except FileNotFoundError:
+        return
+    release(shm)
@@ -0,0 +1,147 @@
+# src/stages.py
+"""
+Run items through a chain of stages connected by bounded queues.
+
+Each stage has its own thread count, so slow I/O and slow compute overlap
+instead of taking turns. Pillow releases the GIL while decoding, encoding
+and filtering, which is what makes threads pay off here.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+Stage = Tuple[str, Callable[[Any], Any], int]  # (name, fn(item) -> item, threads)
+
+_DONE = object()
+
+
+class StageStats:
+    """Counters for one stage; depth figures describe the stage's input queue."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_s = 0.0        # time spent inside the stage function
+        self.wait_in_s = 0.0     # starved: waiting for upstream
+        self.wait_out_s = 0.0    # blocked: downstream queue full
+        self.depth_max = 0
+        self._depth_sum = 0
+        self._lock = threading.Lock()
+
+    def record(self, busy: float, wait_in: float, wait_out: float, depth: int) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_s += busy
+            self.wait_in_s += wait_in
+            self.wait_out_s += wait_out
+            self._depth_sum += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def as_dict(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "items": self.items,
+            "busy_s": round(self.busy_s, 4),
+            "wait_in_s": round(self.wait_in_s, 4),
+            "wait_out_s": round(self.wait_out_s, 4),
+            "utilization": round(self.busy_s / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+            "queue_depth_mean": round(self._depth_sum / self.items, 2) if self.items else 0.0,
+            "queue_depth_max": self.depth_max,
+        }
+
+
+def run_stages(
+    items: Iterable[Any],
+    stages: List[Stage],
+    queue_size: int = 8,
+    metrics: Optional[Dict[str, Any]] = None,
+) -> List[Any]:
+    """
+    Push every item through `stages` in order and return the last stage's
+    results in input order. The first exception raised by any stage stops
+    the feed, lets in-flight items drain and is re-raised here.
+
+    metrics: optional dict filled with per-stage StageStats.as_dict() under
+    "stages", plus "elapsed_s" and "bottleneck" (the busiest stage).
+    """
+    if not stages:
+        raise ValueError("run_stages needs at least one stage")
+    queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    stats = [StageStats(name, max(1, n)) for name, _, n in stages]
+    results: Dict[int, Any] = {}
+    errors: List[BaseException] = []
+    abort = threading.Event()
+
+    remaining = [s.workers for s in stats]
+    remaining_lock = threading.Lock()
+
+    def put(i: int, item: Any) -> float:
+        t0 = time.perf_counter()
+        if i < len(queues):
+            queues[i].put(item)
+        elif item is not _DONE:
+            results[item[0]] = item[1]
+        return time.perf_counter() - t0
+
+    def worker(i: int) -> None:
+        _, fn, _ = stages[i]
+        q_in = queues[i]
+        while True:
+            t0 = time.perf_counter()
+            item = q_in.get()
+            wait_in = time.perf_counter() - t0
+            if item is _DONE:
+                break
+            depth = q_in.qsize()
+            idx, value = item
+            busy = wait_out = 0.0
+            if not abort.is_set():
+                t1 = time.perf_counter()
+                try:
+                    value = fn(value)
+                except BaseException as e:  # surfaced to the caller
+                    errors.append(e)
+                    abort.set()
+                busy = time.perf_counter() - t1
+                if not abort.is_set():
+                    wait_out = put(i + 1, (idx, value))
+            stats[i].record(busy, wait_in, wait_out, depth)
+        # last worker out tells every worker of the next stage to stop
+        with remaining_lock:
+            remaining[i] -= 1
+            last = remaining[i] == 0
+        if last and i + 1 < len(stages):
+            for _ in range(stats[i + 1].workers):
+                put(i + 1, _DONE)
+
+    threads = [
+        threading.Thread(target=worker, args=(i,), name=f"stage-{name}-{k}", daemon=True)
+        for i, (name, _, _) in enumerate(stages)
+        for k in range(stats[i].workers)
+    ]
+    t_start = time.perf_counter()
+    for th in threads:
+        th.start()
+    try:
+        for idx, item in enumerate(items):
+            if abort.is_set():
+                break
+            queues[0].put((idx, item))
+    finally:
+        for _ in range(stats[0].workers):
+            queues[0].put(_DONE)
+        for th in threads:
+            th.join()
+    elapsed = time.perf_counter() - t_start
+
+    if metrics is not None:
+        per_stage = {s.name: s.as_dict(elapsed) for s in stats}
+        metrics["elapsed_s"] = round(elapsed, 4)
+        metrics["stages"] = per_stage
+        metrics["bottleneck"] = max(per_stage, key=lambda n: per_stage[n]["utilization"])
+    if errors:
+        raise errors[0]
+    return [results[i] for i in sorted(results)]
@@ -0,0 +1,227 @@
+# src/tiles.py
+"""
+Tiled zoom/pan rendering for images too large to show as one PhotoImage.
+
+Only the tiles that cover the visible part of the canvas are rendered, at
+the current zoom. Each tile is sampled from the smallest level of a
+2x-reduction pyramid that still has enough pixels for that zoom, so
+zoomed-out views of a huge scan never touch the full-resolution image.
+Levels are built on first use, each in one pass. Rendered tiles are kept
+in an LRU cache; rendering runs on background threads (Pillow releases
+the GIL while resampling) and the caller collects finished tiles with
+poll().
+
+No Tk in here: the GUI turns tiles into PhotoImages and places them using
+Viewport, which is also what maps crop selections back to image pixels.
+"""
+from __future__ import annotations
+import math
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from PIL import Image
+
+TILE = 256
+MIN_SCALE, MAX_SCALE = 1 / 64, 32.0
+
+TileKey = Tuple[float, int, int]  # (scale, tx, ty); tx/ty count tiles in display pixels
+
+
+class Viewport:
+    """
+    Canvas <-> image mapping: image pixel (x, y) is drawn at
+    (offset_x + x * scale, offset_y + y * scale) on the canvas.
+    """
+
+    def __init__(self, img_size: Tuple[int, int], canvas_size: Tuple[int, int]):
+        self.img_size = img_size
+        self.canvas_size = canvas_size
+        self.scale = 1.0
+        self.offset_x = self.offset_y = 0.0
+
+    def fit(self, margin: int = 10, upscale: bool = False) -> None:
+        """Whole image centred in the canvas (never enlarged unless `upscale`)."""
+        (iw, ih), (cw, ch) = self.img_size, self.canvas_size
+        scale = min(max(cw - 2 * margin, 1) / iw, max(ch - 2 * margin, 1) / ih)
+        self.scale = max(MIN_SCALE, scale if upscale else min(scale, 1.0))
+        self.offset_x = round((cw - iw * self.scale) / 2)
+        self.offset_y = round((ch - ih * self.scale) / 2)
+
+    def to_image(self, cx: float, cy: float) -> Tuple[float, float]:
+        return (cx - self.offset_x) / self.scale, (cy - self.offset_y) / self.scale
+
+    def to_canvas(self, x: float, y: float) -> Tuple[float, float]:
+        return self.offset_x + x * self.scale, self.offset_y + y * self.scale
+
+    def zoom_at(self, factor: float, cx: float, cy: float) -> None:
+        """Multiply the zoom by `factor`, keeping the image point under (cx, cy) still."""
+        x, y = self.to_image(cx, cy)
+        self.set_scale(self.scale * factor, cx, cy, (x, y))
+
+    def set_scale(self, scale: float, cx: float, cy: float,
+                  anchor: Optional[Tuple[float, float]] = None) -> None:
+        x, y = anchor if anchor is not None else self.to_image(cx, cy)
+        self.scale = min(MAX_SCALE, max(MIN_SCALE, scale))
+        self.offset_x = round(cx - x * self.scale)
+        self.offset_y = round(cy - y * self.scale)
+
+    def pan(self, dx: float, dy: float) -> None:
+        self.offset_x += dx
+        self.offset_y += dy
+
+    def display_size(self) -> Tuple[int, int]:
+        iw, ih = self.img_size
+        return max(1, round(iw * self.scale)), max(1, round(ih * self.scale))
+
+    def image_box(self, p0: Tuple[float, float], p1: Tuple[float, float]) -> Tuple[int, int, int, int]:
+        """Any two opposite image-space corners -> integer box clamped to the image."""
+        (x0, y0), (x1, y1) = p0, p1
+        iw, ih = self.img_size
+        l, r = sorted((x0, x1))
+        t, b = sorted((y0, y1))
+        return (max(0, min(iw, int(l))), max(0, min(ih, int(t))),
+                max(0, min(iw, math.ceil(r))), max(0, min(ih, math.ceil(b))))
+
+    def visible_tiles(self, tile: int = TILE) -> List[Tuple[TileKey, int, int]]:
+        """(key, canvas_x, canvas_y) for every tile that intersects the canvas."""
+        dw, dh = self.display_size()
+        cw, ch = self.canvas_size
+        ox, oy = int(self.offset_x), int(self.offset_y)
+        # display-pixel range that lands on the canvas
+        x0, x1 = max(0, -ox), min(dw, cw - ox)
+        y0, y1 = max(0, -oy), min(dh, ch - oy)
+        if x1 <= x0 or y1 <= y0:
+            return []
+        s = self.scale
+        return [((s, tx, ty), ox + tx * tile, oy + ty * tile)
+                for ty in range(y0 // tile, (y1 - 1) // tile + 1)
+                for tx in range(x0 // tile, (x1 - 1) // tile + 1)]
+
+
+class Tile(NamedTuple):
+    key: TileKey
+    image: Image.Image
+
+
+class TilePyramid:
+    """
+    Source of display tiles for one image. tile(key) is thread-safe and
+    cached (LRU, `cache_tiles` entries); levels are built once, on demand.
+    """
+
+    def __init__(self, img: Image.Image, tile: int = TILE, cache_tiles: int = 256):
+        if img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGB")
+        self.size = img.size
+        self.tile_size = tile
+        self.cache_tiles = cache_tiles
+        self._levels: Dict[int, Image.Image] = {0: img}
+        self._max_level = max(0, int(math.log2(min(img.size))))
+        self._cache: "OrderedDict[TileKey, Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()         # cache and stats
+        self._level_lock = threading.Lock()   # held while a level is built, not while reading the cache
+        self.stats = {"rendered": 0, "hits": 0, "evicted": 0}
+
+    def level_for(self, scale: float) -> int:
+        """Coarsest level that still has at least one source pixel per display pixel."""
+        if scale >= 1.0:
+            return 0
+        return max(0, int(math.floor(math.log2(1.0 / scale) + 1e-9)))
+
+    def level(self, n: int) -> Image.Image:
+        """Image reduced by 2**n, made in one pass from the nearest finer level."""
+        with self._level_lock:
+            n = min(n, self._max_level)
+            if n not in self._levels:
+                src = max(k for k in self._levels if k < n)
+                self._levels[n] = self._levels[src].reduce(2 ** (n - src))
+            return self._levels[n]
+
+    def cached(self, key: TileKey) -> Optional[Image.Image]:
+        with self._lock:
+            img = self._cache.get(key)
+            if img is not None:
+                self._cache.move_to_end(key)
+                self.stats["hits"] += 1
+            return img
+
+    def tile(self, key: TileKey) -> Image.Image:
+        hit = self.cached(key)
+        if hit is not None:
+            return hit
+        img = self.render(key)
+        with self._lock:
+            self._cache[key] = img
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_tiles:
+                self._cache.popitem(last=False)
+                self.stats["evicted"] += 1
+        return img
+
+    def render(self, key: TileKey) -> Image.Image:
+        """Pixels of one display tile, sampled from the best pyramid level."""
+        scale, tx, ty = key
+        t = self.tile_size
+        iw, ih = self.size
+        dw, dh = max(1, round(iw * scale)), max(1, round(ih * scale))
+        dx0, dy0 = tx * t, ty * t
+        dx1, dy1 = min(dx0 + t, dw), min(dy0 + t, dh)
+        if dx1 <= dx0 or dy1 <= dy0:
+            raise ValueError(f"Tile outside the image: {key}")
+        src = self.level(self.level_for(scale))
+        # display px -> level px; both sizes are rounded, so map size to size per axis
+        fx, fy = src.width / dw, src.height / dh
+        box = (dx0 * fx, dy0 * fy, min(src.width, dx1 * fx), min(src.height, dy1 * fy))
+        resample = Image.Resampling.NEAREST if scale >= 1.0 else Image.Resampling.BILINEAR
+        with self._lock:
+            self.stats["rendered"] += 1
+        return src.resize((dx1 - dx0, dy1 - dy0), resample, box=box)
+
+
+class TileRenderer:
+    """
+    Renders tiles of a pyramid on background threads: its own pool, or a
+    shared one through `submit(fn, *args) -> Future` (scheduler.py).
+
+    request(keys) queues the missing ones, dropping queued work for tiles
+    no longer wanted (the user zoomed or panned away); poll() returns the
+    tiles finished since the last call.
+    """
+
+    def __init__(self, pyramid: TilePyramid, threads: int = 2,
+                 submit: Optional[Callable[..., Future]] = None):
+        self.pyramid = pyramid
+        self._pool = None if submit else ThreadPoolExecutor(max_workers=threads, thread_name_prefix="tiles")
+        self._submit = submit or self._pool.submit
+        self._pending: Dict[TileKey, Future] = {}
+
+    def request(self, keys: List[TileKey]) -> List[Tile]:
+        """Returns tiles already cached; the rest are rendered in the background."""
+        wanted = set(keys)
+        for key in [k for k in self._pending if k not in wanted]:
+            if self._pending[key].cancel():
+                del self._pending[key]
+        ready = []
+        for key in keys:
+            img = self.pyramid.cached(key)
+            if img is not None:
+                ready.append(Tile(key, img))
+            elif key not in self._pending:
+                self._pending[key] = self._submit(self.pyramid.tile, key)
+        return ready
+
+    def poll(self) -> List[Tile]:
+        done = [k for k, f in self._pending.items() if f.done()]
+        return [Tile(k, self._pending.pop(k).result()) for k in done]
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._pending)
+
+    def close(self) -> None:
+        for f in self._pending.values():
+            f.cancel()
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
@@ -0,0 +1,288 @@
+# src/watch.py
+"""
+Watch-folder mode: process files as they land instead of rescanning.
+
+Change detection uses inotify on Linux (through libc, no extra package) and
+falls back to polling: scandir snapshots of (size, mtime) compared every
+poll interval. A file is handed on only after its size and mtime have held
+still for `settle_s`, so half-written uploads are not decoded. Work goes to
+one process pool that lives as long as the watcher.
+
+    w = FolderWatcher("inbox", "outbox", [("resize", {"width": 800})])
+    w.run(stop_event)
+"""
+from __future__ import annotations
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from PIL import Image
+import batch
+import guard
+
+Sig = Tuple[int, int]  # (size, mtime_ns)
+
+
+def _sig(path: str) -> Optional[Sig]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def snapshot(folder: str) -> Dict[str, Sig]:
+    """(size, mtime_ns) of every image directly inside `folder`."""
+    snap: Dict[str, Sig] = {}
+    with os.scandir(folder) as it:
+        for entry in it:
+            if entry.is_file() and batch.is_image(entry.name):
+                st = entry.stat()
+                snap[entry.path] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+# --- Change sources: changes(timeout) -> paths that may have changed, or None (rescan) ---
+class _Inotify:
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_Q_OVERFLOW = 0x00004000
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then the name
+
+    def __init__(self, folder: str):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.folder = folder
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {folder}")
+
+    def changes(self, timeout: float) -> Optional[Set[str]]:
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        paths: Set[str] = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return paths
+            pos = 0
+            while pos < len(buf):
+                _, mask, _, n = self._EVENT.unpack_from(buf, pos)
+                pos += self._EVENT.size
+                name = buf[pos:pos + n].rstrip(b"\0").decode(errors="surrogateescape")
+                pos += n
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if name and batch.is_image(name):
+                    paths.add(os.path.join(self.folder, name))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class _Poller:
+    def __init__(self, folder: str, interval: float):
+        self.folder, self.interval = folder, interval
+        self._last = snapshot(folder)
+
+    def changes(self, timeout: float) -> Optional[Set[str]]:
+        time.sleep(max(0.0, min(timeout, self.interval)))
+        snap = snapshot(self.folder)
+        changed = {p for p, sig in snap.items() if self._last.get(p) != sig}
+        self._last = snap
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def open_source(folder: str, inotify: bool = True, poll_s: float = 0.5):
+    """inotify where the platform has it, else scandir polling."""
+    if inotify and hasattr(os, "O_CLOEXEC"):
+        try:
+            return _Inotify(folder)
+        except (OSError, AttributeError):  # no libc inotify (macOS, Windows) or out of watches
+            pass
+    return _Poller(folder, poll_s)
+
+
+class FolderWatcher:
+    """
+    Long-running processor for one input folder.
+
+    on_result(src, out_path, error) is called from the watcher's own thread
+    for every finished file. A file that changes after being processed is
+    processed again. Failed inputs go to `quarantine_dir` when given.
+
+    A worker that dies breaks the whole pool, failing every file in
+    flight. The pool is replaced once; those files are rerun one at a
+    time, so the one that takes a worker down alone is the one
+    quarantined ("crashed") and the others are processed as usual.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        output_folder: str,
+        steps: List[batch.Step],
+        ext: Optional[str] = None,
+        workers: int = 0,
+        settle_s: float = 0.2,
+        poll_s: float = 0.5,
+        inotify: bool = True,
+        process_existing: bool = True,
+        quarantine_dir: Optional[str] = None,
+        max_pixels: Optional[int] = None,
+        save: Optional[Dict[str, Any]] = None,
+        on_result: Optional[Callable[[str, Optional[str], Optional[BaseException]], None]] = None,
+    ):
+        batch.ensure_dir(output_folder)
+        self.folder, self.output_folder = folder, output_folder
+        self.steps, self.ext, self.save = steps, ext, save or {}
+        self.settle_s, self.poll_s = settle_s, poll_s
+        self.max_pixels = max_pixels or Image.MAX_IMAGE_PIXELS
+        self.on_result = on_result
+        self.quarantine = guard.Quarantine(quarantine_dir) if quarantine_dir else None
+        self.workers = workers or os.cpu_count() or 1
+        self.source = open_source(folder, inotify, poll_s)
+        self.pool = batch._process_pool(self.workers)
+        self._candidates: Dict[str, Tuple[Sig, float]] = {}  # path -> (signature, stable since)
+        self._done: Dict[str, Sig] = {}                      # path -> signature last submitted
+        self._running: Dict[Future, Tuple[str, float]] = {}  # future -> (path, last change seen)
+        self._queue: Deque[Tuple[str, float]] = deque()      # settled, not yet submitted
+        self._suspects: Deque[Tuple[str, float]] = deque()   # in flight when a worker died
+        self.stats = {"processed": 0, "failed": 0, "latency_s_max": 0.0}
+        self._closed = False
+        if process_existing:
+            now = time.monotonic()
+            for p in snapshot(folder):
+                self._note(p, now)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if isinstance(self.source, _Inotify) else "poll"
+
+    def _note(self, path: str, now: float) -> None:
+        sig = _sig(path)
+        if sig is None:
+            self._candidates.pop(path, None)
+        elif self._done.get(path) != sig:
+            prev = self._candidates.get(path)
+            if prev is None or prev[0] != sig:
+                self._candidates[path] = (sig, now)
+
+    def _promote(self, now: float) -> None:
+        for path, (sig, since) in list(self._candidates.items()):
+            if now - since < self.settle_s:
+                continue
+            cur = _sig(path)
+            if cur != sig:  # still being written (or gone)
+                self._note(path, now)
+                continue
+            del self._candidates[path]
+            self._done[path] = sig
+            self._queue.append((path, since))
+        self._submit()
+
+    def _start(self, path: str, since: float) -> None:
+        out = batch._output_path(self.output_folder, path, ext=self.ext)
+        fut = self.pool.submit(batch._guarded_task, path, self.steps, out, self.save, self.max_pixels)
+        self._running[fut] = (path, since)
+
+    def _submit(self) -> None:
+        if self._suspects:  # alone in the pool, so a second crash names its file
+            if not self._running:
+                self._start(*self._suspects.popleft())
+            return
+        while self._queue:
+            self._start(*self._queue.popleft())
+
+    def _restart(self) -> None:
+        """A worker died: replace the pool once and sort out the files that were in it."""
+        broken = [(f, v) for f, v in self._running.items()
+                  if not (f.done() and not f.cancelled() and f.exception() is None)]
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = batch._process_pool(self.workers)
+        for fut, _ in broken:
+            del self._running[fut]
+        if len(broken) == 1:
+            (_, (path, since)), = broken
+            self._finish(path, since, None, BrokenProcessPool(f"worker died processing {path}"))
+        else:
+            self._suspects.extend(v for _, v in broken)
+
+    def _finish(self, path: str, since: float, out: Optional[str], err: Optional[BaseException]) -> None:
+        if err is None:
+            self.stats["processed"] += 1
+            self.stats["latency_s_max"] = max(self.stats["latency_s_max"], time.monotonic() - since)
+        else:
+            self.stats["failed"] += 1
+            partial = batch._partial_path(batch._output_path(self.output_folder, path, ext=self.ext))
+            if os.path.exists(partial):  # left by a worker that died mid-save
+                os.remove(partial)
+            if self.quarantine is not None and os.path.exists(path):
+                reason = ("crashed", str(err)) if isinstance(err, BrokenProcessPool) else guard.classify(err)
+                self.quarantine.add(path, *reason)
+                self._done.pop(path, None)
+        if self.on_result is not None:
+            self.on_result(path, out, err)
+
+    def _reap(self) -> None:
+        if any(f.done() and not f.cancelled() and isinstance(f.exception(), BrokenProcessPool)
+               for f in self._running):
+            self._restart()
+        for fut in [f for f in self._running if f.done()]:
+            path, since = self._running.pop(fut)
+            err = fut.exception()
+            self._finish(path, since, fut.result() if err is None else None, err)
+        self._submit()
+
+    def _timeout(self, now: float) -> float:
+        wait = self.poll_s
+        for _, since in self._candidates.values():
+            wait = min(wait, max(0.0, since + self.settle_s - now))
+        if self._running or self._suspects:
+            wait = min(wait, 0.02)
+        return wait
+
+    def step(self) -> None:
+        """One round: wait for events, hand on settled files, collect results."""
+        changed = self.source.changes(self._timeout(time.monotonic()))
+        now = time.monotonic()
+        for path in snapshot(self.folder) if changed is None else changed:
+            self._note(path, now)
+        self._promote(now)
+        self._reap()
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Block until `stop` is set (or forever), then finish running work."""
+        try:
+            while stop is None or not stop.is_set():
+                self.step()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        while self._running or self._queue or self._suspects:
+            futures.wait(list(self._running), return_when=futures.FIRST_COMPLETED)
+            self._reap()
+        self.pool.shutdown(wait=True)
+        self.source.close()
@@ -0,0 +1,37 @@
+import os, sys, pytest
+
+# add src/ to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import array_backend
+import batch
+import corpus
+
+N, W, H = 32, 480, 270
+STEPS = {
+    # Pillow runs these in C already; the array path mostly saves call overhead
+    "native": [("grayscale", {}), ("flip_h", {}), ("rotate", {"degrees": 90}), ("crop", {"box": (20, 20, 250, 460)})],
+    # filter_sepia is a C colour-matrix convert; the array path is one call for the stack
+    "sepia": [("sepia", {}), ("flip_v", {})],
+}
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return [corpus.make_image(i, (W, H)) for i in range(N)]
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("kind", list(STEPS))
+def test_per_image_pillow(benchmark, frames, kind):
+    steps = STEPS[kind]
+    benchmark.pedantic(lambda: [batch.run_steps(f, steps) for f in frames], rounds=3, iterations=1)
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("kind", list(STEPS))
+@pytest.mark.skipif(not array_backend.available(), reason="numpy not installed")
+def test_grouped_array(benchmark, frames, kind):
+    steps = STEPS[kind]
+    pool = array_backend.BufferPool()
+    array_backend.apply_group(frames, steps, pool)  # allocate the pooled buffers once
+    benchmark.pedantic(lambda: array_backend.apply_group(frames, steps, pool), rounds=3, iterations=1)
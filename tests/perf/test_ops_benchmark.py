@@ -1,14 +1,14 @@
 # tests/perf/test_ops_benchmark.py
 import os, sys, pytest
-from PIL import Image
 
 # add src/ to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import corpus
 import image_ops
 
 
 def _img(w=1920, h=1080):
-    return Image.new("RGB", (w, h), "#7788aa")
+    return corpus.make_image(0, (w, h))
 
 
 @pytest.mark.perf
@@ -20,9 +20,10 @@ def test_resize_maintain_aspect(benchmark):
 
 
 @pytest.mark.perf
-@pytest.mark.parametrize("filter_name", ["grayscale", "blur", "sharpen", "sepia"])
+@pytest.mark.parametrize("filter_name", ["grayscale", "blur", "sharpen", "sepia", "lut"])
 def test_filters(benchmark, filter_name):
     img = _img()
+    lut = image_ops.matrix_lut(image_ops.SEPIA_MATRIX, size=33)
 
     def work():
         if filter_name == "grayscale":
@@ -33,6 +34,8 @@ def test_filters(benchmark, filter_name):
             image_ops.filter_sharpen(img)
         elif filter_name == "sepia":
             image_ops.filter_sepia(img)
+        elif filter_name == "lut":
+            image_ops.apply_lut(img, lut=lut)
 
     benchmark.pedantic(work, rounds=10, iterations=1)
 
@@ -0,0 +1,48 @@
+# tests/perf/test_preview_benchmark.py
+# Headless preview latency (src/preview.py); scripts/preview_latency.py has the full table.
+import os, sys, pytest
+
+# add src/ to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import corpus
+import preview
+
+CANVAS = (900, 600)
+
+
+@pytest.fixture(scope="module", params=[((1920, 1080), "RGB"), ((4000, 3000), "RGB"), ((4000, 3000), "RGBA")],
+                ids=["2mp-rgb", "12mp-rgb", "12mp-rgba"])
+def image(request):
+    size, mode = request.param
+    return corpus.make_image(0, size, mode)
+
+
+@pytest.mark.perf
+def test_time_to_first_preview(benchmark, image):
+    r = preview.PreviewRenderer(CANVAS)
+
+    def first():
+        r.set_image(image)
+        return r.render_sync()
+
+    try:
+        assert benchmark(first).size == CANVAS
+    finally:
+        r.close()
+
+
+@pytest.mark.perf
+def test_zoom_redraw(benchmark, image):
+    r = preview.PreviewRenderer(CANVAS)
+    r.set_image(image)
+
+    def zoom():
+        r.fit()  # every round renders the same 1.25x step from scratch
+        r.zoom_at(1.25, CANVAS[0] / 2, CANVAS[1] / 2)
+        r._renderer.pyramid._cache.clear()
+        return r.render_sync()
+
+    try:
+        benchmark(zoom)
+    finally:
+        r.close()
@@ -0,0 +1,16 @@
+# tests/perf/test_startup_budget.py
+# Cold-start budgets for the entry points (see scripts/startup_time.py).
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT / "scripts"))
+import startup_time  # noqa: E402
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("module", sorted(startup_time.BUDGET_MS))
+def test_import_time_within_budget(module):
+    import_ms, _ = startup_time.measure(module, runs=5)
+    assert import_ms <= startup_time.BUDGET_MS[module], f"{module}: {import_ms:.1f} ms"
@@ -0,0 +1,41 @@
+import os, sys, pytest
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+
+# add src/ to path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import batch
+import corpus
+import shm_frames
+
+# 4K RGB frame: ~25MB per hop when pickled
+W, H = 3840, 2160
+STEPS = [("flip_h", {})]
+
+
+@pytest.fixture(scope="module")
+def pool():
+    with ProcessPoolExecutor(max_workers=1) as ex:
+        ex.submit(batch.run_steps, Image.new("RGB", (8, 8)), []).result()  # warm up the worker
+        yield ex
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return corpus.make_image(0, (W, H))
+
+
+@pytest.mark.perf
+@pytest.mark.parametrize("transport", ["pickle", "shm"])
+def test_worker_roundtrip(benchmark, pool, frame, transport):
+    def work():
+        if transport == "pickle":
+            return pool.submit(batch.run_steps, frame, STEPS).result()
+        seg, desc = shm_frames.put_image(frame)
+        try:
+            return shm_frames.get_image(pool.submit(batch._shm_task, desc, STEPS).result(), unlink=True)
+        finally:
+            shm_frames.release(seg)
+
+    out = benchmark.pedantic(work, rounds=10, iterations=1)
+    assert out.size == (W, H)
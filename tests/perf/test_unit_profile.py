@@ -1,13 +1,13 @@
 # tests/perf/test_unit_profile.py
 import os, time, statistics
 import pytest
-from PIL import Image
 
 # Import the project code
 import sys
 from pathlib import Path
 ROOT = Path(__file__).resolve().parents[2]
 sys.path.append(str(ROOT / "src"))
+import corpus  # noqa: E402
 import image_ops  # noqa: E402
 
 # ---- Config ----
@@ -57,8 +57,8 @@ OPS = [
 
 @pytest.fixture(scope="module")
 def base_img():
-    # Synthetic, stable test image
-    return Image.new("RGB", (W, H), (120, 120, 160))
+    # Synthetic, seeded photo-like test image
+    return corpus.make_image(0, (W, H))
 
 # ---------- A) Benchmark (for nice pytest-benchmark tables) ----------
 @pytest.mark.perf
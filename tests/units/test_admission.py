@@ -0,0 +1,48 @@
+from PIL import Image
+import os, sys, threading, time
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import admission
+
+
+def test_probe_reads_header_and_swaps_for_orientation(tmp_path):
+    p = str(tmp_path / "tall.jpg")
+    img = Image.new("RGB", (300, 100))
+    exif = img.getexif()
+    exif[0x0112] = 6  # rotate 90 on display
+    img.save(p, exif=exif)
+    probe = admission.probe_image(p)
+    assert (probe.width, probe.height, probe.mode, probe.frames) == (100, 300, "RGB", 1)
+
+
+def test_estimate_tracks_largest_input_output_pair():
+    probe = admission.ImageProbe("x", 1000, 500, "RGB", 1)
+    full = 1000 * 500 * 4
+    assert admission.estimate_peak_bytes(probe, []) == full
+    # resize shrinks first, so grayscale never sees the full frame
+    steps = [("resize", {"width": 100}), ("grayscale", {})]
+    assert admission.estimate_peak_bytes(probe, steps) == full + 100 * 50 * 4
+    assert admission.estimate_peak_bytes(probe, [("grayscale", {})]) == full + 1000 * 500
+
+
+def test_budget_blocks_until_release_and_runs_oversized_alone():
+    budget = admission.MemoryBudget(100)
+    assert budget.acquire(60)
+    assert not budget.acquire(60, timeout=0.01)
+
+    order = []
+    def big():
+        budget.acquire(500)
+        order.append(("big", budget.used))
+        budget.release(500)
+
+    t = threading.Thread(target=big)
+    t.start()
+    time.sleep(0.05)
+    # a waiting oversized request holds back small ones that would fit
+    assert not budget.fits(10)
+    budget.release(60)
+    t.join(1)
+    assert order == [("big", 500)]
+    assert budget.used == 0 and budget.peak_used == 500
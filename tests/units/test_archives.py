@@ -0,0 +1,81 @@
+from PIL import Image
+import io, os, sys, tarfile, zipfile
+import pytest
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import archives
+
+
+def _png(size, color):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "PNG")
+    return buf.getvalue()
+
+
+def _make_archive(path, members):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path, "w") as zf:
+            for name, data in members:
+                zf.writestr(name, data)
+    else:
+        with tarfile.open(path, "w:gz") as tf:
+            for name, data in members:
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+
+
+@pytest.mark.parametrize("kind,processes", [(".zip", False), (".tar.gz", True)])
+def test_archive_to_zip_without_extraction(tmp_path, kind, processes):
+    src = str(tmp_path / f"in{kind}")
+    _make_archive(src, [("a.png", _png((40, 20), "red")), ("notes.txt", b"skip me"),
+                        ("sub/b.png", _png((10, 30), "blue"))])
+    out = str(tmp_path / "out.zip")
+    names = archives.apply_pipeline_archive([src], out, [("grayscale", {})], ext=".jpg",
+                                            workers=2, processes=processes)
+    assert names == ["in/processed_a.jpg", "in/sub/processed_b.jpg"]
+    with zipfile.ZipFile(out) as zf:
+        assert sorted(zf.namelist()) == sorted(names)
+        img = Image.open(io.BytesIO(zf.read("in/sub/processed_b.jpg")))
+        assert img.size == (10, 30) and img.mode == "L"
+        assert zf.getinfo("in/processed_a.jpg").compress_type == zipfile.ZIP_STORED
+    assert not any(p.suffix == ".png" for p in tmp_path.rglob("*"))
+
+
+def test_same_names_in_two_archives_do_not_collide(tmp_path):
+    one, two = str(tmp_path / "one.zip"), str(tmp_path / "two.tar.gz")
+    _make_archive(one, [("a.png", _png((8, 8), "red")), ("frame.ipraw", b"IPRF")])
+    _make_archive(two, [("a.png", _png((16, 16), "blue"))])
+    out = str(tmp_path / "out.zip")
+    names = archives.apply_pipeline_archive([one, two], out, [], workers=1)
+    assert names == ["one/processed_a.png", "two/processed_a.png"]
+    with zipfile.ZipFile(out) as zf:
+        assert Image.open(io.BytesIO(zf.read("two/processed_a.png"))).size == (16, 16)
+    with pytest.raises(ValueError):
+        archives.apply_pipeline_archive([one, str(tmp_path / "one.tar")], out, [])
+    with pytest.raises(ValueError):
+        archives.apply_pipeline_archive([one, one], out, [])
+
+
+def test_member_paths_stay_under_the_archive_folder():
+    def name(member):
+        return archives._output_name(archives.Member(member, b"", "pack"), None)
+    assert name("/x/a.png") == "pack/x/processed_a.png"
+    assert name("./a.png") == "pack/processed_a.png"
+    with pytest.raises(ValueError):
+        name("x/../../a.png")
+
+
+@pytest.mark.parametrize("ext", [None, ".webp"])
+def test_animated_members_keep_their_frames(tmp_path, ext):
+    buf = io.BytesIO()
+    imgs = [Image.new("RGB", (40, 30), (60 * i, 40, 200)) for i in range(3)]
+    imgs[0].save(buf, "GIF", save_all=True, append_images=imgs[1:], duration=[40, 50, 60], loop=0)
+    src = str(tmp_path / "anim.zip")
+    _make_archive(src, [("a.gif", buf.getvalue())])
+    out = str(tmp_path / "out.zip")
+    names = archives.apply_pipeline_archive([src], out, [("resize", {"width": 20})], ext=ext, workers=1)
+    with zipfile.ZipFile(out) as zf:
+        img = Image.open(io.BytesIO(zf.read(names[0])))
+        assert (img.n_frames, img.size) == (3, (20, 15))
@@ -0,0 +1,31 @@
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import autotune
+
+
+def _settle(tuner, ips_at, cpu_at=lambda w: 50.0, mem_ok_at=lambda w: True):
+    tried = []
+    while not tuner.settled and len(tried) < 20:
+        w = tuner.workers
+        tried.append(w)
+        tuner.observe(ips_at(w), cpu_at(w), mem_ok_at(w))
+    return tried
+
+
+def test_climbs_then_bisects_to_the_throughput_peak():
+    t = autotune.WorkerTuner(max_workers=16)
+    tried = _settle(t, lambda w: 10 * min(w, 6) - max(0, w - 6) * 4)
+    assert tried[:4] == [1, 2, 4, 8]
+    assert t.settled and t.workers == 6 and t.report()["workers"] == 6
+
+
+def test_stops_growing_on_cpu_saturation_and_memory_pressure():
+    t = autotune.WorkerTuner(max_workers=16)
+    _settle(t, lambda w: 10.0 * w, cpu_at=lambda w: 95.0 if w >= 4 else 50.0)
+    assert t.workers == 4
+
+    t = autotune.WorkerTuner(max_workers=16)
+    _settle(t, lambda w: 10.0 * w, mem_ok_at=lambda w: w < 3)
+    assert t.workers == 2
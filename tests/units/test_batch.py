@@ -0,0 +1,162 @@
+from PIL import Image
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import batch
+import image_ops
+
+
+def _write_input(folder, name="in.png", size=(400, 200)):
+    p = os.path.join(folder, name)
+    Image.new("RGB", size, "gray").save(p)
+    return p
+
+
+def test_fanout_decodes_once_and_writes_each_branch(tmp_path, monkeypatch):
+    src = _write_input(str(tmp_path))
+    calls = []
+    real_load = image_ops.load_image
+    monkeypatch.setattr(image_ops, "load_image", lambda p, **kw: calls.append(p) or real_load(p, **kw))
+
+    out = batch.apply_fanout(
+        [src], str(tmp_path / "out"),
+        shared_steps=[("sharpen", {})],
+        branches=[
+            {"name": "thumb", "steps": [("resize", {"width": 50})]},
+            {"name": "medium", "steps": [("resize", {"width": 200})], "suffix": "_200w"},
+            {"name": "gray", "steps": [("grayscale", {})], "ext": ".jpg", "save": {"quality": 80}},
+        ],
+    )
+    assert calls == [src]
+    assert Image.open(out["thumb"][0]).size == (50, 25)
+    assert out["medium"][0].endswith("processed_in_200w.png")
+    assert Image.open(out["medium"][0]).size == (200, 100)
+    assert Image.open(out["gray"][0]).mode == "L"
+
+
+def test_nearest_larger_picks_smallest_fitting_intermediate():
+    big = Image.new("RGB", (400, 200))
+    mid = Image.new("RGB", (200, 100))
+    small = Image.new("RGB", (50, 25))
+    assert batch._nearest_larger([big, mid, small], (100, 50)) is mid
+    assert batch._nearest_larger([mid, small], (300, 150)) is None
+
+
+def test_chained_passes_through_raw_intermediates(tmp_path):
+    src = _write_input(str(tmp_path))
+    mid = batch.apply_pipeline([src], str(tmp_path / "mid"), [("resize", {"width": 100})],
+                               ext=image_ops.RAW_EXT)
+    assert batch.list_images(str(tmp_path / "mid")) == mid
+    out = batch.apply_pipeline(mid, str(tmp_path / "out"), [("grayscale", {})], ext=".png")
+    assert Image.open(out[0]).size == (100, 50)
+
+
+def test_process_pool_transports_match_serial(tmp_path):
+    srcs = [_write_input(str(tmp_path), f"in{i}.png") for i in range(3)]
+    steps = [("resize", {"width": 80}), ("rotate", {"degrees": 90})]
+    serial = batch.apply_pipeline(srcs, str(tmp_path / "serial"), steps)
+    for transport in ("shm", "pickle"):
+        out = batch.apply_pipeline(srcs, str(tmp_path / transport), steps, workers=2, transport=transport)
+        assert [os.path.basename(p) for p in out] == [os.path.basename(p) for p in serial]
+        assert all(Image.open(a).tobytes() == Image.open(b).tobytes() for a, b in zip(out, serial))
+
+
+def test_staged_pipeline_matches_serial(tmp_path):
+    srcs = [_write_input(str(tmp_path), f"in{i}.png") for i in range(4)]
+    steps = [("blur", {"radius": 1.0}), ("flip_v", {})]
+    serial = batch.apply_pipeline(srcs, str(tmp_path / "serial"), steps)
+    metrics = {}
+    staged = batch.apply_pipeline_staged(srcs, str(tmp_path / "staged"), steps, compute=2, metrics=metrics)
+    assert all(Image.open(a).tobytes() == Image.open(b).tobytes() for a, b in zip(staged, serial))
+    assert set(metrics["stages"]) == {"read", "compute", "write"}
+
+
+def test_orientation_is_folded_into_leading_steps(tmp_path):
+    T = image_ops.Transpose
+    # orientation 6 plus a 90° rotate collapse into a single no-op
+    assert batch.plan_orientation([("rotate", {"degrees": 90}), ("blur", {})], T.ROTATE_270) == [("blur", {})]
+    # a leading resize runs on the unrotated pixels with swapped dimensions
+    assert batch.plan_orientation([("resize", {"width": 100})], T.ROTATE_270) == [
+        ("resize", {"width": None, "height": 100}), ("transpose", {"method": T.ROTATE_270})]
+
+    img = Image.new("RGB", (400, 200), "gray")
+    exif = img.getexif()
+    exif[image_ops.ORIENTATION_TAG] = 6
+    src = str(tmp_path / "phone.jpg")
+    img.save(src, exif=exif.tobytes())
+    out = batch.apply_pipeline([src], str(tmp_path / "out"), [("resize", {"width": 50})])
+    assert Image.open(out[0]).size == (50, 100)
+
+
+def test_memory_budget_keeps_results_and_order(tmp_path):
+    srcs = [_write_input(str(tmp_path), f"in{i}.png", size) for i, size in
+            enumerate([(400, 200), (1200, 800), (400, 200)])]
+    steps = [("grayscale", {})]
+    serial = batch.apply_pipeline(srcs, str(tmp_path / "serial"), steps)
+    # room for one small image at a time; the large one exceeds the budget
+    budget_mb = 400 * 200 * 5 * 2 / 2**20 * 1.5
+    pooled = batch.apply_pipeline(srcs, str(tmp_path / "pool"), steps, workers=2, memory_budget_mb=budget_mb)
+    staged = batch.apply_pipeline_staged(srcs, str(tmp_path / "staged"), steps, compute=2,
+                                         memory_budget_mb=budget_mb)
+    for out in (pooled, staged):
+        assert [os.path.basename(p) for p in out] == [os.path.basename(p) for p in serial]
+        assert all(Image.open(a).tobytes() == Image.open(b).tobytes() for a, b in zip(out, serial))
+
+
+def test_auto_workers_report_chosen_settings(tmp_path):
+    srcs = [_write_input(str(tmp_path), f"in{i}.png") for i in range(12)]
+    steps = [("grayscale", {})]
+    serial = batch.apply_pipeline(srcs, str(tmp_path / "serial"), steps)
+    summary = {}
+    out = batch.apply_pipeline(srcs, str(tmp_path / "auto"), steps, workers="auto", summary=summary)
+    assert all(Image.open(a).tobytes() == Image.open(b).tobytes() for a, b in zip(out, serial))
+    assert summary["images"] == 12 and summary["workers"] >= 1
+    assert summary["history"] and {"images_per_s", "cpu_percent", "rss_mb"} <= set(summary["history"][0])
+
+
+def test_palette_input_through_workers_matches_serial(tmp_path):
+    p = os.path.join(str(tmp_path), "pal.png")
+    Image.new("RGB", (120, 80), (255, 0, 0)).convert("P").save(p)
+    steps = [("flip_h", {})]
+    serial, = batch.apply_pipeline([p], str(tmp_path / "serial"), steps)
+    pooled, = batch.apply_pipeline([p], str(tmp_path / "pool"), steps, workers=2)
+    staged, = batch.apply_pipeline_staged([p], str(tmp_path / "staged"), steps, compute=1, compute_processes=True)
+    expected = Image.open(serial).convert("RGB")
+    assert expected.getpixel((5, 5)) == (255, 0, 0)
+    for out in (pooled, staged):
+        assert Image.open(out).convert("RGB").tobytes() == expected.tobytes()
+
+
+def test_tuner_level_is_the_real_concurrency(tmp_path, monkeypatch):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    class CountingPool(ThreadPoolExecutor):
+        active = peak = 0
+        lock = threading.Lock()
+
+        def submit(self, fn, *args):
+            with self.lock:
+                CountingPool.active += 1
+                CountingPool.peak = max(CountingPool.peak, CountingPool.active)
+            fut = super().submit(fn, *args)
+            fut.add_done_callback(lambda f: self._done())
+            return fut
+
+        def _done(self):
+            with self.lock:
+                CountingPool.active -= 1
+
+    class FixedTuner:
+        workers, max_workers = 1, 4
+
+        def record(self):
+            pass
+
+    monkeypatch.setattr(batch, "_process_pool", lambda n: CountingPool(max_workers=n))
+    srcs = [_write_input(str(tmp_path), f"in{i}.png") for i in range(8)]
+    (tmp_path / "out").mkdir()
+    out = batch._apply_parallel(srcs, str(tmp_path / "out"), [("blur", {"radius": 2})], None, 4,
+                                "shm", {}, tuner=FixedTuner())
+    assert len(out) == 8 and CountingPool.peak == 1
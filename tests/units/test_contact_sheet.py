@@ -0,0 +1,55 @@
+from PIL import Image
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import contact_sheet
+
+
+def _inputs(folder, n):
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i in range(n):
+        p = os.path.join(folder, f"img_{i:02d}_with_a_long_name.jpg")
+        Image.new("RGB", (400 + 10 * i, 300), (10 * i, 200, 255 - 10 * i)).save(p)
+        paths.append(p)
+    return paths
+
+
+def test_strip_writer_round_trips(tmp_path):
+    img = Image.linear_gradient("L").resize((300, 170)).convert("RGB")
+    path = str(tmp_path / "s.png")
+    with contact_sheet.PngStripWriter(path, img.size) as w:
+        for top in range(0, 170, 64):
+            w.write(img.crop((0, top, 300, min(170, top + 64))))
+    assert Image.open(path).tobytes() == img.tobytes()
+
+
+def test_sheet_in_strips_and_pages(tmp_path):
+    paths = _inputs(str(tmp_path / "in"), 11)
+    broken = str(tmp_path / "in" / "broken.jpg")
+    open(broken, "wb").write(b"not an image")
+    paths.insert(3, broken)
+
+    summary = {}
+    out = contact_sheet.make_contact_sheet(paths, str(tmp_path / "sheet.png"), columns=5, thumb=64,
+                                           rows_per_strip=2, summary=summary)
+    sheet = Image.open(out[0])
+    assert sheet.size == summary["sheet_size"] and sheet.width == 5 * 72 + 8
+    assert summary["unreadable"] == [broken]
+    # first thumbnail: 64x48, centred in its 64x64 cell at (8, 8)
+    assert sheet.getpixel((8 + 32, 8 + 32)) == sheet.getpixel((8 + 10, 8 + 20))
+    assert sheet.getpixel((8 + 32, 8 + 2)) == Image.new("RGB", (1, 1), contact_sheet.BACKGROUND).getpixel((0, 0))
+
+    pages = contact_sheet.make_contact_sheet(paths, str(tmp_path / "sheet.jpg"), columns=5, thumb=64,
+                                             rows_per_page=2, workers=2)
+    assert [os.path.basename(p) for p in pages] == ["sheet_001.jpg", "sheet_002.jpg"]
+    assert Image.open(pages[0]).width == sheet.width
+    assert Image.open(pages[1]).height < Image.open(pages[0]).height
+
+
+def test_auto_workers(tmp_path):
+    paths = _inputs(str(tmp_path / "in"), 3)
+    serial = contact_sheet.make_contact_sheet(paths, str(tmp_path / "a.png"), columns=3, thumb=64)
+    auto = contact_sheet.make_contact_sheet(paths, str(tmp_path / "b.png"), columns=3, thumb=64, workers="auto")
+    assert Image.open(serial[0]).tobytes() == Image.open(auto[0]).tobytes()
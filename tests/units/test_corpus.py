@@ -0,0 +1,31 @@
+from PIL import Image
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import corpus
+import image_ops
+
+
+def test_make_image_is_deterministic_and_not_flat():
+    a = corpus.make_image(7, (160, 90))
+    b = corpus.make_image(7, (160, 90))
+    assert a.tobytes() == b.tobytes()
+    assert a.tobytes() != corpus.make_image(8, (160, 90)).tobytes()
+    assert a.getcolors(maxcolors=1000) is None  # photo-like: many distinct colours
+    for mode in ("L", "RGBA", "P"):
+        assert corpus.make_image(1, (64, 48), mode).mode == mode
+
+
+def test_corpus_mixes_sizes_modes_and_orientation_and_is_cached(tmp_path):
+    spec = dict(seed=3, megapixels=(0.01, 0.05), modes=(("RGB", 1), ("RGBA", 1)), orientation_rate=1.0)
+    paths = corpus.corpus(12, cache_dir=str(tmp_path), **spec)
+    assert len(paths) == 12 and all(os.path.exists(p) for p in paths)
+    assert len({Image.open(p).size for p in paths}) > 1
+    assert {Image.open(p).mode for p in paths} == {"RGB", "RGBA"}
+    jpgs = [p for p in paths if p.endswith(".jpg")]
+    assert jpgs and all(Image.open(p).getexif().get(image_ops.ORIENTATION_TAG) for p in jpgs)
+
+    mtimes = [os.stat(p).st_mtime_ns for p in paths]
+    again = corpus.corpus(12, cache_dir=str(tmp_path), **spec)
+    assert again == paths and [os.stat(p).st_mtime_ns for p in again] == mtimes
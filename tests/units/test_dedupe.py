@@ -0,0 +1,75 @@
+from PIL import Image, ImageDraw
+import json
+import os, random, sys
+import pytest
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import dedupe
+
+
+def _scene(seed, size=(320, 240)):
+    rnd = random.Random(seed)
+    img = Image.new("RGB", size, tuple(rnd.randrange(256) for _ in range(3)))
+    d = ImageDraw.Draw(img)
+    for _ in range(12):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        d.ellipse((x, y, x + rnd.randrange(20, 120), y + rnd.randrange(20, 120)),
+                  fill=tuple(rnd.randrange(256) for _ in range(3)))
+    return img
+
+
+def test_hash_index_matches_linear_scan():
+    rnd = random.Random(3)
+    # clusters of near hashes plus uniform noise
+    centres = [rnd.getrandbits(64) for _ in range(50)]
+    hashes = [c ^ sum(1 << rnd.randrange(64) for _ in range(rnd.randrange(12))) for c in centres for _ in range(20)]
+    hashes += [rnd.getrandbits(64) for _ in range(1000)]
+    index = dedupe.HashIndex(radius=10)
+    for i, h in enumerate(hashes):
+        index.add(h, i)
+    for q in hashes[::37]:
+        expected = sorted((dedupe.hamming(q, h), i) for i, h in enumerate(hashes) if dedupe.hamming(q, h) <= 10)
+        assert sorted(index.search(q)) == expected
+    q = hashes[17] ^ 0b1011  # 3 bits away from entry 17
+    assert (3, 17) in index.search(q, 3)
+
+
+def test_near_duplicates_skipped_or_linked(tmp_path):
+    src = tmp_path / "in"
+    src.mkdir()
+    a, b = _scene(1), _scene(2)
+    paths = []
+    for name, img, q in [("a", a, 95), ("a_burst", a.resize((300, 225)), 70), ("b", b, 95),
+                         ("a_again", a, 50)]:
+        paths.append(str(src / f"{name}.jpg"))
+        img.save(paths[-1], quality=q)
+
+    canonical, dupes = dedupe.find_duplicates(paths)
+    assert canonical == [paths[0], paths[2]]
+    assert [(d["file"], d["duplicate_of"]) for d in dupes] == [(paths[1], paths[0]), (paths[3], paths[0])]
+
+    report = {}
+    outs = dedupe.apply_pipeline_deduped(paths, str(tmp_path / "skip"), [("grayscale", {})], report=report)
+    assert len(outs) == 2 and report["unique"] == 2 and len(report["duplicates"]) == 2
+
+    outs = dedupe.apply_pipeline_deduped(paths, str(tmp_path / "link"), [("grayscale", {})], mode="link",
+                                         report_path=str(tmp_path / "dupes.json"))
+    assert len(outs) == 4
+    assert os.path.samefile(outs[1], outs[0]) or open(outs[1], "rb").read() == open(outs[0], "rb").read()
+    assert json.load(open(tmp_path / "dupes.json"))["duplicates"][0]["duplicate_of"] == paths[0]
+
+
+def test_link_mode_refuses_output_name_collisions(tmp_path):
+    img = _scene(5)
+    paths = []
+    for sub in ("a", "b"):
+        (tmp_path / sub).mkdir()
+        paths.append(str(tmp_path / sub / "x.png"))
+        img.save(paths[-1])
+    out = tmp_path / "out"
+    with pytest.raises(ValueError, match="x.png"):
+        dedupe.apply_pipeline_deduped(paths, str(out), [], mode="link")
+    # the same file listed twice links to itself: kept, not deleted
+    outs = dedupe.apply_pipeline_deduped([paths[0], paths[0]], str(out), [], mode="link")
+    assert outs[0] == outs[1] and os.path.exists(outs[0])
@@ -0,0 +1,71 @@
+from PIL import Image, ImageDraw
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import batch
+import frames
+
+
+def _animation(path, n=6, size=(160, 120)):
+    imgs = []
+    for i in range(n):
+        im = Image.new("RGB", size, (20 * i, 40, 200))
+        ImageDraw.Draw(im).rectangle((10 * i, 20, 10 * i + 40, 60), fill="yellow")
+        imgs.append(im)
+    imgs[0].save(path, save_all=True, append_images=imgs[1:], loop=0,
+                 duration=[50 + 10 * i for i in range(n)], disposal=[1, 2] * (n // 2))
+    return path
+
+
+def _timing(path):
+    im = Image.open(path)
+    out = []
+    for i in range(im.n_frames):
+        im.seek(i)
+        im.load()
+        out.append((im.info.get("duration"), getattr(im, "disposal_method", None)))
+    return im.size, out
+
+
+def test_batch_keeps_every_frame_and_its_timing(tmp_path):
+    src = _animation(str(tmp_path / "anim.gif"))
+    size, timing = _timing(src)
+    assert len(timing) == 6
+    for workers in (0, 2):
+        out, = batch.apply_pipeline([src], str(tmp_path / f"out{workers}"), [("resize", {"width": 80})],
+                                    workers=workers)
+        assert _timing(out) == ((80, 60), timing)
+    # frame 3 went through the steps: the rectangle moved with the frame
+    im = Image.open(out)
+    im.seek(3)
+    assert im.convert("RGB").getpixel((20, 20))[:2] == (255, 255)
+
+
+def test_webp_and_tiff_frames_are_written_lazily(tmp_path):
+    src = _animation(str(tmp_path / "anim.gif"))
+    webp = frames.process_file(src, str(tmp_path / "a.webp"), [("grayscale", {})])
+    _, timing = _timing(webp)
+    assert [d for d, _ in timing] == [50 + 10 * i for i in range(6)]
+    tif = frames.process_file(webp, str(tmp_path / "a.tif"), [("flip_h", {})])
+    assert Image.open(tif).n_frames == 6
+    # a still output format keeps only the first frame, as before
+    out, = batch.apply_pipeline([src], str(tmp_path / "still"), [], ext=".png")
+    assert not getattr(Image.open(out), "is_animated", False)
+
+
+def test_every_batch_path_keeps_frames(tmp_path):
+    src = _animation(str(tmp_path / "anim.gif"))
+    steps = [("resize", {"width": 80})]
+    outs = [
+        batch.apply_pipeline([src], str(tmp_path / "array"), steps, backend="array")[0],
+        batch.apply_pipeline_staged([src], str(tmp_path / "staged"), steps, compute=1)[0],
+        batch.apply_pipeline_staged([src], str(tmp_path / "staged_p"), steps, compute=1, compute_processes=True)[0],
+        batch.apply_pipeline_guarded([src], str(tmp_path / "guarded"), steps, workers=1)[0],
+        batch.apply_fanout([src], str(tmp_path / "fan"), [], [{"name": "small", "steps": steps}])["small"][0],
+        # larger than the whole memory budget: the serial lane
+        batch.apply_pipeline([src], str(tmp_path / "big"), steps, workers=1, memory_budget_mb=0.01)[0],
+    ]
+    for out in outs:
+        im = Image.open(out)
+        assert (im.n_frames, im.size) == (6, (80, 60)), out
@@ -0,0 +1,74 @@
+from PIL import Image
+import os, sys, time
+import pytest
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import batch
+import guard
+
+
+def test_supervised_pool_survives_hangs_and_crashes():
+    tasks = [(time.sleep, (30,)), (abs, (-3,)), (os._exit, (3,)), (int, ("x",)), (abs, (-4,))]
+    t0 = time.monotonic()
+    with guard.SupervisedPool(2) as pool:
+        results = {i: (ok, value) for i, ok, value in pool.run(tasks, timeout=1.0)}
+        assert pool.replaced == 2
+    assert time.monotonic() - t0 < 10
+    assert results[0] == (False, ("timeout", "exceeded 1.0s"))
+    assert results[1] == (True, 3) and results[4] == (True, 4)
+    assert results[2][1][0] == "crashed"
+    assert results[3][1][0] == "error"
+
+
+def test_guarded_pipeline_quarantines_poison_files(tmp_path):
+    inbox = tmp_path / "in"
+    inbox.mkdir()
+    good = str(inbox / "good.png")
+    Image.new("RGB", (64, 32), "red").save(good)
+    bomb = str(inbox / "bomb.png")
+    Image.new("L", (2000, 2000)).save(bomb)
+    junk = str(inbox / "junk.png")
+    with open(junk, "wb") as f:
+        f.write(b"not an image")
+
+    failures = []
+    out = batch.apply_pipeline_guarded(
+        [good, bomb, junk], str(tmp_path / "out"), [("grayscale", {})],
+        workers=2, max_pixels=1_000_000, quarantine_dir=str(tmp_path / "q"), failures=failures,
+    )
+    assert [os.path.basename(p) for p in out] == ["processed_good.png"]
+    assert {f["reason"] for f in failures} == {"too_many_pixels", "unreadable"}
+    logged = guard.Quarantine(str(tmp_path / "q")).entries()
+    assert sorted(e["file"] for e in logged) == ["bomb.png", "junk.png"]
+    assert sorted(os.listdir(inbox)) == ["good.png"]
+
+
+def test_guarded_failure_keeps_outputs_from_earlier_runs(tmp_path):
+    junk = str(tmp_path / "junk.png")
+    with open(junk, "wb") as f:
+        f.write(b"not an image")
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "processed_junk.png").write_bytes(b"from last week")
+    failures = []
+    assert batch.apply_pipeline_guarded([junk], str(out), [], workers=1, failures=failures) == []
+    assert failures[0]["reason"] == "unreadable"
+    assert (out / "processed_junk.png").read_bytes() == b"from last week"
+
+
+def test_guarded_save_never_truncates_the_output(tmp_path, monkeypatch):
+    src = str(tmp_path / "a.png")
+    Image.new("RGB", (16, 16), "red").save(src)
+    out = tmp_path / "processed_a.png"
+    out.write_bytes(b"from last week")
+
+    def dies_mid_write(img, path, **kw):
+        with open(path, "wb") as f:
+            f.write(b"trunc")
+        raise MemoryError("killed mid-save")
+    monkeypatch.setattr(batch.image_ops, "save_image", dies_mid_write)
+    with pytest.raises(MemoryError):
+        batch._guarded_task(src, [], str(out), {}, None)
+    assert out.read_bytes() == b"from last week"
+    assert sorted(os.listdir(tmp_path)) == ["a.png", "processed_a.png"]
@@ -0,0 +1,52 @@
+import os, sys, time
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import gui_monitor
+
+
+def test_histogram_percentiles():
+    h = gui_monitor.LatencyHistogram()
+    for ms in [0.5] * 90 + [40] * 9 + [1500]:
+        h.record(ms)
+    d = h.as_dict()
+    assert d["count"] == 100 and d["p50_ms"] == 1 and d["p95_ms"] == 50 and d["max_ms"] == 1500
+
+
+def _slow_handler():
+    time.sleep(0.3)  # blocks the "main loop"
+
+
+def test_stall_is_sampled_while_it_happens():
+    logs = []
+    m = gui_monitor.Monitor(schedule=None, beat_ms=10, stall_ms=100, log=logs.append).start()
+    try:
+        m.beat()
+        m.timed("do_filter")(_slow_handler)()
+        m.beat()
+    finally:
+        m.stop()
+    stall = m.stalls[-1]
+    assert stall.command == "do_filter"
+    assert any("_slow_handler" in line for line in stall.stack)
+    assert stall.duration_ms >= 250 and logs and "do_filter" in logs[0]
+    report = m.report()
+    assert report["latency"]["do_filter"]["count"] == 1
+    assert report["latency"]["loop_lag"]["max_ms"] >= 250
+    assert "loop lag histogram" in m.format_report()
+
+
+def test_stall_names_the_handler_running_after_a_nested_one_returns():
+    m = gui_monitor.Monitor(schedule=None, beat_ms=10, stall_ms=100).start()
+
+    def outer():
+        m.timed("_redraw")(lambda: None)()
+        _slow_handler()
+    try:
+        m.beat()
+        m.timed("do_resize")(outer)()
+        m.beat()
+    finally:
+        m.stop()
+    assert m.stalls[-1].command == "do_resize"
+    assert sorted(m.report()["latency"]) == ["_redraw", "do_resize", "loop_lag"]
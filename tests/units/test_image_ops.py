@@ -29,3 +29,96 @@ def test_flip_horizontal_changes_pixels():
     img.putpixel((0, 0), (255, 0, 0))  # leftmost pixel red
     out = image_ops.flip_horizontal(img)
     assert out.getpixel((9, 0)) == (255, 0, 0)  # now red on right
+
+
+def test_raw_frame_roundtrip_is_mapped(tmp_path):
+    img = Image.new("RGB", (64, 32), (10, 20, 30))
+    img.putpixel((5, 7), (255, 0, 0))
+    p = str(tmp_path / ("frame" + image_ops.RAW_EXT))
+    image_ops.save_image(img, p)
+    out = image_ops.load_image(p)
+    assert out.mode == "RGB" and out.tobytes() == img.tobytes()  # padding dropped at load
+    rgba = img.convert("RGBA")
+    image_ops.save_image(rgba, p)
+    out = image_ops.load_image(p)
+    assert out.mode == "RGBA" and out.readonly  # zero-copy view of the mapping
+    assert out.tobytes() == rgba.tobytes()
+
+
+def test_load_image_applies_exif_orientation(tmp_path):
+    img = Image.new("RGB", (40, 20), "black")
+    img.putpixel((0, 0), (255, 0, 0))
+    exif = img.getexif()
+    exif[image_ops.ORIENTATION_TAG] = 6  # camera held rotated 90° clockwise
+    p = str(tmp_path / "phone.png")
+    img.save(p, exif=exif.tobytes())
+
+    out = image_ops.load_image(p)
+    assert out.size == (20, 40)
+    assert out.getpixel((19, 0)) == (255, 0, 0)
+    assert image_ops.ORIENTATION_TAG not in out.getexif()
+
+
+def test_compose_transpose_matches_sequential():
+    img = Image.new("L", (3, 2))
+    img.putdata([1, 2, 3, 4, 5, 6])
+    methods = [None] + list(image_ops.Transpose)
+    for a in methods:
+        for b in methods:
+            seq = image_ops.transpose(image_ops.transpose(img, a), b)
+            one = image_ops.transpose(img, image_ops.compose_transpose(a, b))
+            assert one.tobytes() == seq.tobytes() and one.size == seq.size
+
+
+def test_save_image_metadata_policies(tmp_path):
+    img = Image.new("RGB", (8, 8))
+    exif = img.getexif()
+    exif[0x010F] = "Camera"
+    img.info["exif"] = exif.tobytes()
+    img.info["icc_profile"] = b"fake-icc"
+    for policy, has_exif, has_icc in [("keep", True, True), ("icc", False, True), ("strip", False, False)]:
+        p = str(tmp_path / f"{policy}.png")
+        image_ops.save_image(img, p, metadata=policy)
+        out = Image.open(p)
+        assert (0x010F in out.getexif()) == has_exif
+        assert ("icc_profile" in out.info) == has_icc
+
+
+def test_sepia_matrix_and_cube_lut(tmp_path):
+    img = Image.merge("RGB", [Image.effect_noise((64, 48), 60 + 20 * c) for c in range(3)])
+    # sepia is now a matrix convert: same coefficients, rounded instead of truncated
+    r, g, b = img.getpixel((5, 7))
+    expect = tuple(min(255, round(k[0] * r + k[1] * g + k[2] * b))
+                   for k in ((0.393, 0.769, 0.189), (0.349, 0.686, 0.168), (0.272, 0.534, 0.131)))
+    assert image_ops.filter_sepia(img).getpixel((5, 7)) == expect
+
+    # baked into a .cube and read back, the preset grades (almost) like the matrix
+    cube = tmp_path / "sepia.cube"
+    image_ops.write_cube(str(cube), image_ops.matrix_lut(image_ops.SEPIA_MATRIX, size=33), "sepia")
+    graded = image_ops.apply_lut(img.convert("RGBA"), str(cube))
+    assert graded.mode == "RGBA"
+    diff = [abs(a - b) for a, b in zip(graded.convert("RGB").tobytes(), image_ops.filter_sepia(img).tobytes())]
+    assert max(diff) <= 3
+    assert image_ops.load_cube(str(cube)) is image_ops.load_cube(str(cube))  # parsed once
+
+    # DOMAIN_MAX 0.5: input 0.5 already maps to the top of an identity table
+    cube.write_text("LUT_3D_SIZE 2\nDOMAIN_MAX 0.5 0.5 0.5\n"
+                    + "".join(f"{r} {g} {b}\n" for b in (0, 1) for g in (0, 1) for r in (0, 1)))
+    assert image_ops.apply_lut(Image.new("L", (2, 2), 128), str(cube)).getpixel((0, 0)) == (255, 255, 255)
+
+
+def test_overlay_placement_opacity_and_per_size_cache(tmp_path):
+    logo = tmp_path / "logo.png"
+    Image.new("RGBA", (40, 20), (255, 0, 0, 255)).save(logo)
+    image_ops._scaled_overlay.cache_clear()
+    base = Image.new("RGB", (200, 100), (0, 0, 255))
+    out = image_ops.overlay(base, str(logo), "bottom-right", opacity=0.5, scale=0.2, margin=0)
+    # 40x20 logo scaled to 20% of 200 px wide -> 40x20, flush with the bottom-right corner
+    assert out.getpixel((199, 99)) == (128, 0, 127) and out.getpixel((159, 79)) == (0, 0, 255)
+    assert base.getpixel((199, 99)) == (0, 0, 255)  # input untouched
+
+    for _ in range(5):
+        image_ops.overlay(base, str(logo), scale=0.2)
+    image_ops.overlay(Image.new("RGBA", (400, 100)), str(logo), "top-left", scale=0.2, margin=0)
+    info = image_ops._scaled_overlay.cache_info()
+    assert info.misses == 3 and info.hits == 4  # one rescale per (size, opacity)
@@ -0,0 +1,61 @@
+from PIL import Image
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import batch
+import lazy
+
+
+def _noise(size=(301, 203)):
+    return Image.merge("RGB", [Image.effect_noise(size, 60 + 20 * i) for i in range(3)])
+
+
+def test_filter_then_crop_matches_eager_and_reads_only_halo():
+    img = _noise()
+    src = lazy.wrap(img)
+    node = src.blur(2).sharpen().crop((100, 50, 160, 90))
+    eager = batch.OPS["sharpen"](batch.OPS["blur"](img, radius=2)).crop((100, 50, 160, 90))
+    assert node.compute().tobytes() == eager.tobytes()
+    assert src.pixels_read < img.size[0] * img.size[1] // 4
+
+
+def test_region_of_transposed_chain_matches_eager():
+    img = _noise()
+    steps = [("rotate", {"degrees": 90}), ("flip_h", {}), ("grayscale", {}), ("blur", {"radius": 1.5})]
+    full = batch.OPS["blur"](batch.OPS["grayscale"](img.transpose(Image.Transpose.ROTATE_90)
+                                                   .transpose(Image.Transpose.FLIP_LEFT_RIGHT)), radius=1.5)
+    node = lazy.from_steps(lazy.wrap(img), steps)
+    box = (17, 40, 150, 260)
+    assert node.size == full.size
+    assert node.compute(box).tobytes() == full.crop(box).tobytes()
+
+
+def test_resize_region_within_rounding():
+    img = _noise()
+    full = img.resize((150, 101))
+    part = lazy.wrap(img).resize(width=150).compute((30, 20, 90, 70))
+    diff = [abs(a - b) for a, b in zip(part.tobytes(), full.crop((30, 20, 90, 70)).tobytes())]
+    assert max(diff) <= 1
+
+
+def test_crop_pads_like_crop_box_in_any_step_order(tmp_path):
+    img = _noise((100, 80))
+    box = (50, 40, 150, 120)  # runs past the right and bottom edges
+    eager = batch.run_steps(img, [("grayscale", {}), ("crop", {"box": box})])
+    assert eager.size == (100, 80)
+    assert batch.run_steps(img, [("crop", {"box": box}), ("grayscale", {})]).tobytes() == eager.tobytes()
+    lazy_out = batch.run_steps(img, batch.lazy_steps([("grayscale", {}), ("crop", {"box": box})]))
+    assert lazy_out.tobytes() == eager.tobytes()
+    outside = lazy.wrap(img).grayscale().crop((200, 200, 210, 205)).compute()
+    assert outside.size == (10, 5) and outside.getextrema() == (0, 0)
+
+
+def test_lazy_is_opt_in(tmp_path):
+    p = str(tmp_path / "in.png")
+    _noise((120, 90)).save(p)
+    steps = [("blur", {"radius": 2}), ("crop", {"box": (10, 10, 70, 60)})]
+    eager, = batch.apply_pipeline([p], str(tmp_path / "eager"), steps)
+    lazy_out, = batch.apply_pipeline([p], str(tmp_path / "lazy"), steps, lazy=True)
+    assert batch.lazy_steps(steps)[0][0] == "lazy"
+    assert Image.open(eager).tobytes() == Image.open(lazy_out).tobytes()
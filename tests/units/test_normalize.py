@@ -0,0 +1,48 @@
+from PIL import Image
+import os, sys
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import normalize
+
+
+def _shoot(folder, ranges):
+    """Dull gradients, each covering only part of 0..255."""
+    os.makedirs(folder, exist_ok=True)
+    paths = []
+    for i, (lo, hi) in enumerate(ranges):
+        g = Image.linear_gradient("L").resize((300, 200)).point(lambda v, lo=lo, hi=hi: lo + v * (hi - lo) // 255)
+        p = os.path.join(folder, f"s{i}.jpg")
+        Image.merge("RGB", (g, g, g)).save(p, quality=95)
+        paths.append(p)
+    return paths
+
+
+def test_levels_table_stretches_the_merged_range():
+    hist = [0.0] * 256
+    for v in range(50, 201):
+        hist[v] = 1.0
+    table = normalize.levels_table(hist, cutoff=0)
+    assert table[50] == 0 and table[200] == 255 and table[125] == 128
+    assert normalize.levels_table([1.0] + [0.0] * 255) == list(range(256))  # flat: untouched
+
+
+def test_two_pass_uses_one_table_for_the_whole_shoot(tmp_path):
+    paths = _shoot(str(tmp_path / "in"), [(60, 140), (100, 190)])
+    summary = {}
+    outs = normalize.apply_pipeline_normalized(paths, str(tmp_path / "out"), [("resize", {"width": 150})],
+                                               cutoff=0.5, summary=summary)
+    imgs = [Image.open(p).convert("L") for p in outs]
+    assert [im.size for im in imgs] == [(150, 100)] * 2
+    # shoot-wide stretch: darkest image reaches near black, brightest near white,
+    # and neither is stretched to the full range on its own
+    assert imgs[0].getextrema()[0] < 10 and imgs[1].getextrema()[1] > 245
+    assert imgs[0].getextrema()[1] < 220 and imgs[1].getextrema()[0] > 40
+    assert len(summary["levels"]) == 256 and summary["images"] == 2
+
+
+def test_auto_workers_run_both_passes(tmp_path):
+    paths = _shoot(str(tmp_path / "in"), [(60, 140), (100, 190)])
+    summary = {}
+    outs = normalize.apply_pipeline_normalized(paths, str(tmp_path / "out"), [], workers="auto", summary=summary)
+    assert len(outs) == 2 and len(summary["levels"]) == 256
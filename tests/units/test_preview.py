@@ -0,0 +1,43 @@
+from PIL import Image, ImageChops
+import os, sys, time
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import corpus
+import preview
+
+
+def test_flatten_modes():
+    rgba = Image.new("RGBA", (4, 4), (255, 0, 0, 0))
+    assert preview.flatten(rgba).getpixel((0, 0)) == (255, 255, 255)
+    p = Image.new("P", (4, 4), 3)
+    p.info["transparency"] = 3
+    assert preview.flatten(p).getpixel((0, 0)) == (255, 255, 255)
+    assert preview.flatten(Image.new("CMYK", (4, 4))).mode == "RGB"
+    gray = Image.new("L", (4, 4))
+    assert preview.flatten(gray) is gray
+
+
+def test_fit_render_and_async_frame_agree():
+    img = corpus.make_image(5, (1600, 900), "RGBA")
+    r = preview.PreviewRenderer((500, 400), tile=128)
+    try:
+        r.set_image(img)
+        l, t, rr, b = r.frame().border
+        assert (rr - l, b - t) == r.view.display_size() and r.view.scale < 1
+
+        placed = []
+        deadline = time.monotonic() + 10
+        while r.busy and time.monotonic() < deadline:
+            placed += r.poll()
+            time.sleep(0.01)
+        canvas = Image.new("RGB", r.canvas_size, preview.BACKGROUND)
+        for p in placed:
+            canvas.paste(p.image, (p.x, p.y))
+        assert ImageChops.difference(canvas, r.render_sync()).getbbox() is None
+
+        r.zoom_at(4, 250, 200)
+        r.resize_canvas((600, 400))
+        assert not r.fitted and r.view.scale > 1  # the user's zoom survives a canvas resize
+    finally:
+        r.close()
@@ -0,0 +1,66 @@
+from PIL import Image
+import os, sys, threading, time
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import scheduler
+
+
+def test_interactive_work_goes_before_queued_batch_images():
+    s = scheduler.Scheduler(workers=1)
+    order = []
+    gate = threading.Event()
+    try:
+        s.submit(scheduler.BATCH, gate.wait)  # occupies the only worker
+        batch = [s.submit(scheduler.BATCH, order.append, f"b{i}") for i in range(3)]
+        edit = s.submit(scheduler.INTERACTIVE, order.append, "edit")
+        tile = s.submit(scheduler.PREVIEW, order.append, "tile")
+        gate.set()
+        for f in batch + [edit, tile]:
+            f.result(timeout=5)
+    finally:
+        s.shutdown()
+    # the running image finishes; then the waiting user work, then the batch resumes
+    assert order == ["tile", "edit", "b0", "b1", "b2"]
+
+
+def test_foreground_pauses_batch_at_image_boundaries():
+    s = scheduler.Scheduler(workers=2)
+    started = []
+    try:
+        with s.foreground():
+            futs = [s.submit(scheduler.BATCH, started.append, i) for i in range(4)]
+            time.sleep(0.1)
+            assert started == [] and s.stats()["queued"]["batch"] == 4
+        for f in futs:
+            f.result(timeout=5)
+        assert sorted(started) == [0, 1, 2, 3]
+    finally:
+        s.shutdown()
+
+
+def test_slow_batch_images_leave_a_worker_for_interactive_work():
+    s = scheduler.Scheduler(workers=2, latency_target_ms=20)
+    try:
+        s.submit(scheduler.BATCH, time.sleep, 0.05).result(timeout=5)  # teaches it images take ~50 ms
+        assert s.batch_limit() == 1
+        s.latency_target_ms = 500
+        assert s.batch_limit() == 2
+    finally:
+        s.shutdown()
+
+
+def test_submit_batch_runs_the_pipeline(tmp_path):
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"in{i}.png"
+        Image.new("RGB", (40, 20), (i * 50, 0, 0)).save(p)
+        paths.append(str(p))
+    s = scheduler.Scheduler(workers=2)
+    try:
+        job = s.submit_batch(paths, str(tmp_path / "out"), [("resize", {"width": 20})])
+        outs = job.outputs()
+    finally:
+        s.shutdown()
+    assert job.done and job.progress() == (3, 3)
+    assert [Image.open(p).size for p in outs] == [(20, 10)] * 3
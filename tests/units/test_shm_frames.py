@@ -0,0 +1,28 @@
+from PIL import Image
+import os, sys
+import pytest
+from multiprocessing import shared_memory
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import shm_frames
+
+
+@pytest.mark.parametrize("mode", ["RGB", "L", "RGBA"])
+def test_put_get_roundtrip_unlinks(mode):
+    img = Image.new(mode, (33, 17), "red")
+    seg, desc = shm_frames.put_image(img)
+    seg.close()  # as a worker would; ownership passes with the descriptor
+    out = shm_frames.get_image(desc, unlink=True)
+    assert out.tobytes() == img.tobytes() and out.mode == mode
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=desc.name)
+
+
+def test_palette_and_transparency_survive():
+    img = Image.new("RGB", (8, 8), (255, 0, 0)).convert("P")
+    img.info["transparency"] = 0
+    seg, desc = shm_frames.put_image(img)
+    out = shm_frames.get_image(desc)
+    shm_frames.release(seg)
+    assert out.convert("RGB").getpixel((0, 0)) == (255, 0, 0) and out.info["transparency"] == 0
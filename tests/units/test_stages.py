@@ -0,0 +1,33 @@
+import os, sys, time
+import pytest
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import stages
+
+
+def test_results_keep_input_order_and_report_bottleneck():
+    def slow_square(x):
+        time.sleep(0.01 * (x % 3))
+        return x * x
+
+    metrics = {}
+    out = stages.run_stages(
+        range(20),
+        [("inc", lambda x: x + 1, 1), ("square", slow_square, 3), ("neg", lambda x: -x, 2)],
+        queue_size=2, metrics=metrics,
+    )
+    assert out == [-(x + 1) ** 2 for x in range(20)]
+    assert metrics["bottleneck"] == "square"
+    assert metrics["stages"]["square"]["items"] == 20
+    assert metrics["stages"]["inc"]["queue_depth_max"] <= 2
+
+
+def test_stage_error_is_reraised():
+    def boom(x):
+        if x == 5:
+            raise RuntimeError("bad item")
+        return x
+
+    with pytest.raises(RuntimeError, match="bad item"):
+        stages.run_stages(range(50), [("a", boom, 2), ("b", lambda x: x, 1)], queue_size=1)
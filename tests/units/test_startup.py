@@ -0,0 +1,58 @@
+import os, subprocess, sys
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+# add src/ to Python path
+sys.path.append(SRC)
+import lazy_import
+
+HEAVY = ("numpy", "concurrent.futures.process", "multiprocessing.shared_memory",
+         "PIL.ImageTk", "PIL.ImageDraw", "matplotlib")
+
+
+def _eagerly_loaded(module):
+    # a module whose code has run has __builtins__ in its namespace; reading
+    # the namespace through object.__getattribute__ does not trigger a lazy load
+    code = (f"import sys, {module}\n"
+            f"ran = lambda m: '__builtins__' in object.__getattribute__(m, '__dict__')\n"
+            f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules and ran(sys.modules[m])))")
+    res = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=SRC),
+                         capture_output=True, text=True, check=True)
+    return res.stdout.split()
+
+
+def test_entry_points_do_not_load_heavy_modules_at_import():
+    for module in ("batch", "gui"):
+        assert _eagerly_loaded(module) == [], module
+
+
+def test_lazy_import_loads_on_first_attribute(tmp_path, monkeypatch):
+    marker = tmp_path / "ran"
+    (tmp_path / "lazy_probe.py").write_text(f"open({str(marker)!r}, 'w').close()\nVALUE = 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setitem(sys.modules, "lazy_probe", None)  # so it is removed again after the test
+    monkeypatch.delitem(sys.modules, "lazy_probe")
+    mod = lazy_import.lazy_import("lazy_probe")
+    assert not marker.exists()  # found, but its code has not run
+    assert mod.VALUE == 42
+    assert marker.exists()
+    assert lazy_import.lazy_import("lazy_probe") is mod
+
+
+def test_lazy_module_first_touched_by_many_threads():
+    # fresh interpreters, so the module really is loaded by the racing threads
+    code = ("import threading, batch\n"
+            "gate, errors = threading.Barrier(8), []\n"
+            "def touch():\n"
+            "    gate.wait()\n"
+            "    try:\n"
+            "        batch.shm_frames.FrameDesc\n"
+            "    except Exception as e:\n"
+            "        errors.append(repr(e))\n"
+            "threads = [threading.Thread(target=touch) for _ in range(8)]\n"
+            "[t.start() for t in threads]\n"
+            "[t.join() for t in threads]\n"
+            "print(errors)")
+    for _ in range(5):
+        res = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=SRC),
+                             capture_output=True, text=True, check=True)
+        assert res.stdout.strip() == "[]"
@@ -0,0 +1,74 @@
+from PIL import Image, ImageChops, ImageStat
+import math, os, sys, time
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import corpus
+import tiles
+
+
+def _render_view(pyr, view):
+    """Paste the visible tiles into one canvas-sized image, like the GUI does."""
+    canvas = Image.new("RGB", view.canvas_size)
+    for key, x, y in view.visible_tiles(pyr.tile_size):
+        canvas.paste(pyr.tile(key), (x, y))
+    return canvas
+
+
+def test_tiles_at_100_percent_are_exact_pixels():
+    img = corpus.make_image(1, (700, 500))
+    pyr = tiles.TilePyramid(img, tile=128)
+    view = tiles.Viewport(img.size, (300, 200))
+    view.set_scale(1.0, 0, 0, anchor=(250, 120))  # image (250, 120) at the canvas corner
+    out = _render_view(pyr, view)
+    assert ImageChops.difference(out, img.crop((250, 120, 550, 320))).getbbox() is None
+
+
+def test_zoomed_out_tiles_use_a_reduced_level_and_stay_close():
+    img = corpus.make_image(2, (2000, 1200))
+    pyr = tiles.TilePyramid(img, tile=128)
+    view = tiles.Viewport(img.size, (420, 300))
+    view.fit(margin=0)
+    assert pyr.level_for(view.scale) >= 2
+    dw, dh = view.display_size()
+    ox, oy = int(view.offset_x), int(view.offset_y)
+    out = _render_view(pyr, view).crop((ox, oy, ox + dw, oy + dh))
+    ref = img.resize((dw, dh), Image.Resampling.BOX)
+    assert max(ImageStat.Stat(ImageChops.difference(out, ref)).mean) < 12
+    assert sorted(pyr._levels) == [0, pyr.level_for(view.scale)]  # intermediate levels are not built
+
+
+def test_zoom_keeps_anchor_and_selection_maps_at_any_zoom():
+    view = tiles.Viewport((4000, 3000), (800, 600))
+    view.fit()
+    before = view.to_image(300, 200)
+    for _ in range(5):
+        view.zoom_at(1.25, 300, 200)
+    after = view.to_image(300, 200)
+    assert abs(after[0] - before[0]) < 2 and abs(after[1] - before[1]) < 2
+    view.pan(-123, 45)
+    p0, p1 = view.to_image(100, 100), view.to_image(50, 400)
+    assert view.image_box(p0, p1) == (math.floor(p1[0]), math.floor(p0[1]), math.ceil(p0[0]), math.ceil(p1[1]))
+    assert view.image_box((-50, -50), (1e6, 1e6)) == (0, 0, 4000, 3000)
+
+
+def test_lru_eviction_and_async_renderer():
+    img = corpus.make_image(3, (1024, 512))
+    pyr = tiles.TilePyramid(img, tile=128, cache_tiles=4)
+    keys = [(1.0, tx, 0) for tx in range(8)]
+    for k in keys:
+        pyr.tile(k)
+    assert pyr.stats["evicted"] == 4 and pyr.cached(keys[0]) is None and pyr.cached(keys[-1]) is not None
+
+    renderer = tiles.TileRenderer(tiles.TilePyramid(img, tile=128))
+    try:
+        assert renderer.request(keys) == []  # nothing cached yet: all rendered in the background
+        got = []
+        deadline = time.monotonic() + 10
+        while renderer.busy and time.monotonic() < deadline:
+            got += renderer.poll()
+            time.sleep(0.01)
+        assert sorted(t.key for t in got) == keys
+        assert len(renderer.request(keys)) == len(keys)  # now all cached
+    finally:
+        renderer.close()
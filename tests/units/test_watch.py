@@ -0,0 +1,78 @@
+from PIL import Image
+import io, os, sys, threading, time
+import pytest
+
+# add src/ to Python path
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+import watch
+
+
+def _wait_for(cond, timeout=20.0):
+    end = time.monotonic() + timeout
+    while not cond() and time.monotonic() < end:
+        time.sleep(0.02)
+    return cond()
+
+
+@pytest.mark.parametrize("inotify", [True, False])
+def test_watcher_processes_new_and_changed_files(tmp_path, inotify):
+    inbox, outbox = tmp_path / "in", tmp_path / "out"
+    inbox.mkdir()
+    Image.new("RGB", (40, 20), "blue").save(inbox / "old.png")
+    results = []
+    w = watch.FolderWatcher(str(inbox), str(outbox), [("grayscale", {})], workers=1,
+                            poll_s=0.05, inotify=inotify,
+                            on_result=lambda src, out, err: results.append((os.path.basename(src), err)))
+    assert w.mode == ("inotify" if inotify else "poll")
+    stop = threading.Event()
+    t = threading.Thread(target=w.run, args=(stop,))
+    t.start()
+    try:
+        assert _wait_for(lambda: ("old.png", None) in results)
+        # a slow writer: the file must not be picked up half written
+        buf = io.BytesIO()
+        Image.new("RGB", (64, 64), "red").save(buf, "PNG")
+        data = buf.getvalue()
+        with open(inbox / "new.png", "wb") as f:
+            f.write(data[:20])
+            f.flush()
+            time.sleep(0.1)
+            f.write(data[20:])
+        assert _wait_for(lambda: ("new.png", None) in results)
+        Image.new("RGB", (8, 8)).save(inbox / "old.png")
+        assert _wait_for(lambda: results.count(("old.png", None)) == 2)
+    finally:
+        stop.set()
+        t.join()
+    assert all(err is None for _, err in results)
+    assert Image.open(outbox / "processed_old.png").size == (8, 8)
+    assert Image.open(outbox / "processed_new.png").mode == "L"
+
+
+def _crash_on_bad(path, steps, out_path, save, max_pixels):
+    """Stands in for batch._guarded_task in the workers: takes the process down for 'bad' files."""
+    import batch
+    if "bad" in os.path.basename(path):
+        os._exit(3)
+    time.sleep(0.2)  # keep the good files in flight when the bad one crashes
+    return batch._guarded_task(path, steps, out_path, save, max_pixels)
+
+
+def test_worker_crash_quarantines_only_the_culprit(tmp_path, monkeypatch):
+    inbox, outbox = tmp_path / "in", tmp_path / "out"
+    inbox.mkdir()
+    for name in ("a.png", "b.png", "bad.png", "c.png"):
+        Image.new("RGB", (16, 16), "blue").save(inbox / name)
+    monkeypatch.setattr(watch.batch, "_guarded_task", _crash_on_bad)
+    results = []
+    w = watch.FolderWatcher(str(inbox), str(outbox), [("grayscale", {})], workers=3, settle_s=0.0,
+                            poll_s=0.05, inotify=False, quarantine_dir=str(tmp_path / "q"),
+                            on_result=lambda src, out, err: results.append((os.path.basename(src), err)))
+    try:
+        assert _wait_for(lambda: (w.step(), len(results))[1] == 4)
+    finally:
+        w.close()
+    assert sorted(n for n, err in results if err is None) == ["a.png", "b.png", "c.png"]
+    assert [e["reason"] for e in watch.guard.Quarantine(str(tmp_path / "q")).entries()] == ["crashed"]
+    assert sorted(os.listdir(inbox)) == ["a.png", "b.png", "c.png"]
+    assert len(os.listdir(outbox)) == 3